@@ -1,8 +1,15 @@
-from fastapi import FastAPI, Request
-from starlette.responses import JSONResponse
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Query, Request
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse, StreamingResponse
+import json
+import uuid
 from pydantic import BaseModel
 from typing import List, Optional, Dict, Any
+from datetime import datetime
 from document_handler import DocumentHandler
+from general import gemini_call
+import settings
 from enum import Enum
 
 from slowapi import Limiter, _rate_limit_exceeded_handler
@@ -10,9 +17,17 @@ from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
 from slowapi.middleware import SlowAPIMiddleware
 
-app = FastAPI()
 handler = DocumentHandler()
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    gemini_call.configure()
+    await handler.start()
+    yield
+    await handler.close()
+
+app = FastAPI(lifespan=lifespan)
+
 # Rate Limiter Setup
 limiter = Limiter(key_func=get_remote_address)
 app.state.limiter = limiter
@@ -65,6 +80,13 @@ class ServiceType(str, Enum):
     staff = 'staff'
     qa = 'q/a'
 
+class RetrievalFilters(BaseModel):
+    kind: Optional[str] = None  # "chunk" | "product"
+    tags: Optional[List[str]] = None
+    price_min: Optional[float] = None
+    price_max: Optional[float] = None
+    updated_after: Optional[datetime] = None
+
 class AskQuestionRequest(BaseModel):
     project_id: str
     project_name: str
@@ -73,15 +95,28 @@ class AskQuestionRequest(BaseModel):
     lang: str
     company_data: Optional[str] = ""
     service_type: ServiceType
+    filters: Optional[RetrievalFilters] = None
 
 class DeleteProjectRequest(BaseModel):
     project_id: str
     languages: List[str]
 
+class BulkProductItem(BaseModel):
+    project_id: str
+    id: str
+    lang: Optional[str] = None
+    languages: List[str] = []
+    name: Optional[str] = None
+    details: Optional[Any] = None
+    tags: Optional[List[str]] = None
+    price: Optional[float] = None
+
 class DataUploadRequest(BaseModel):
     project_id: str
     row_data: str
     languages: List[str]
+    mode: Optional[str] = None
+    diff: bool = False
 
 # -----------------------------
 # Endpoints with Rate Limits
@@ -97,6 +132,82 @@ async def create_product(request: ProductCreateRequest):
     except Exception as e:
         return JSONResponse(status_code=500, content={"detail": str(e)})
 
+async def parse_bulk_items(request: Request, action: str):
+    """
+    Reads a JSON array or NDJSON body of BulkProductItem objects and expands each
+    over its languages. Returns (items, rejected): items for the handler carry the
+    position of their source line in "source"; rejected holds per-item errors.
+    """
+    text = (await request.body()).decode("utf-8").strip()
+    if text.startswith("[") and "ndjson" not in request.headers.get("content-type", ""):
+        raw = json.loads(text)
+    else:
+        raw = []
+        for line in text.splitlines():
+            if line.strip():
+                try:
+                    raw.append(json.loads(line))
+                except ValueError as e:
+                    raw.append(e)
+    if len(raw) > settings.BULK_MAX_ITEMS:
+        raise ValueError(f"At most {settings.BULK_MAX_ITEMS} items per request.")
+
+    items, rejected = [], []
+    for index, data in enumerate(raw):
+        try:
+            if isinstance(data, Exception):
+                raise data
+            item = BulkProductItem(**data)
+            try:
+                product_id = str(uuid.UUID(item.id))
+            except ValueError:
+                raise ValueError(f"'id' must be a UUID, got '{item.id}'") from None
+            languages = item.languages or ([item.lang] if item.lang else [])
+            if not languages:
+                raise ValueError("'lang' or 'languages' is required")
+            if action != "delete" and (item.name is None or item.details is None):
+                raise ValueError("'name' and 'details' are required")
+            for lang in languages:
+                items.append({"project_id": item.project_id, "lang": lang, "id": product_id,
+                              "name": item.name, "details": item.details, "tags": item.tags,
+                              "price": item.price, "source": index})
+        except Exception as e:
+            rejected.append({"index": index, "id": data.get("id") if isinstance(data, dict) else None,
+                             "status": "error", "error": str(e)})
+    return items, rejected
+
+async def run_bulk(request: Request, action: str):
+    try:
+        items, rejected = await parse_bulk_items(request, action)
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"detail": str(e)})
+    try:
+        result = await run_in_threadpool(handler.bulk_products, action, items)
+        for entry in result["results"]:
+            item = items[entry["index"]]
+            entry.update(index=item["source"], lang=item["lang"])
+        result["results"] = sorted(result["results"] + rejected, key=lambda entry: entry["index"])
+        result["failed"] += len(rejected)
+        return {"status": "success", **result}
+    except Exception as e:
+        return JSONResponse(status_code=500, content={"detail": str(e)})
+
+# /products/bulk (POST, PUT, DELETE) — registered before /products/{product_id}
+@limiter.limit("10/minute")
+@app.post("/products/bulk")
+async def bulk_create_products(request: Request):
+    return await run_bulk(request, "create")
+
+@limiter.limit("10/minute")
+@app.put("/products/bulk")
+async def bulk_update_products(request: Request):
+    return await run_bulk(request, "update")
+
+@limiter.limit("5/minute")
+@app.delete("/products/bulk")
+async def bulk_delete_products(request: Request):
+    return await run_bulk(request, "delete")
+
 # /products/{product_id} (GET)
 @limiter.limit("60/minute")
 @app.get("/products/{product_id}")
@@ -112,7 +223,29 @@ async def get_product(project_id: str, product_id: str, languages: List[str]):
 # /products (GET)
 @limiter.limit("60/minute")
 @app.get("/products")
-async def get_all_products(project_id: str, languages: List[str]):
+async def get_all_products(project_id: str, languages: List[str] = None, lang: Optional[str] = None,
+                           after: Optional[str] = None, limit: Optional[int] = Query(None, ge=1, le=1000),
+                           fields: Optional[str] = None, format: Optional[str] = None):
+    """
+    Without paging parameters, returns every product at once. With `lang`, returns a
+    page of `limit` products after the `after` cursor (the previous page's
+    next_cursor), or streams them all as NDJSON with format=ndjson. `fields` is a
+    comma-separated projection such as `name`.
+    """
+    field_list = [f.strip() for f in fields.split(",") if f.strip() and f.strip() != "id"] if fields else None
+    if lang and format == "ndjson":
+        lines = (json.dumps(product, ensure_ascii=False, default=str) + "\n"
+                 for product in handler.iter_products(project_id, lang, field_list))
+        return StreamingResponse(lines, media_type="application/x-ndjson")
+    if lang:
+        try:
+            page = await run_in_threadpool(
+                handler.list_products, project_id, lang, after, limit or 100, field_list
+            )
+            return {"status": "success", **page}
+        except Exception as e:
+            return JSONResponse(status_code=500, content={"detail": str(e)})
+
     try:
         products = handler.get_all_products(project_id, languages)
         if products == "No products found in any language.":
@@ -155,12 +288,38 @@ async def ask_question(request: AskQuestionRequest):
             "user_question": request.user_question,
             "lang": request.lang,
             "company_data": request.company_data,
-            "service_type": request.service_type
+            "service_type": request.service_type,
+            "filters": request.filters.model_dump(exclude_none=True) if request.filters else None,
         })
         return {"status": "success", "answer": answer}
     except Exception as e:
         return JSONResponse(status_code=500, content={"detail": str(e)})
 
+# /ask_question/stream (POST)
+@limiter.limit("15/minute")
+@app.post("/ask_question/stream")
+async def ask_question_stream(request: AskQuestionRequest):
+    question_details = {
+        "project_id": request.project_id,
+        "project_name": request.project_name,
+        "history": request.history,
+        "user_question": request.user_question,
+        "lang": request.lang,
+        "company_data": request.company_data,
+        "service_type": request.service_type,
+        "filters": request.filters.model_dump(exclude_none=True) if request.filters else None,
+    }
+
+    async def event_stream():
+        async for event in handler.ask_question_stream(question_details):
+            yield f"event: {event['event']}\ndata: {json.dumps(event['data'], ensure_ascii=False)}\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 # /delete_project (DELETE)
 @limiter.limit("2/minute")
 @app.delete("/delete_project")
@@ -176,11 +335,29 @@ async def delete_project(request: DeleteProjectRequest):
 @app.post("/data_upload")
 async def data_upload(request: DataUploadRequest):
     try:
-        await handler.data_upload(request.project_id, request.row_data, request.languages)
-        return {"status": "success", "message": "Data uploaded successfully."}
+        job_id = handler.submit_data_upload(
+            request.project_id, request.row_data, request.languages, mode=request.mode, diff=request.diff
+        )
+        return JSONResponse(status_code=202, content={"status": "accepted", "job_id": job_id})
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"detail": str(e)})
     except Exception as e:
         return JSONResponse(status_code=500, content={"detail": str(e)})
 
+# /jobs/{job_id} (GET)
+@limiter.limit("120/minute")
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = handler.get_job(job_id)
+    if job is None:
+        return JSONResponse(status_code=404, content={"detail": "Job not found."})
+    return {"status": "success", "job": job}
+
+# /metrics (GET)
+@app.get("/metrics")
+async def metrics():
+    return {"status": "success", "metrics": handler.metrics()}
+
 # /delete_all (POST)
 @limiter.limit("1/hour")
 @app.post("/delete_all")
@@ -0,0 +1,124 @@
+"""
+Requests/s of the async Gemini transport against a local fake Gemini server.
+
+    python -m benchmarks.gemini_transport [--requests 2000] [--latency 0.05] [--concurrency 10,100,1000]
+
+A fake GenerativeService (grpc.aio, in its own thread and event loop) answers
+every GenerateContent call after `--latency` seconds. Requests go through
+`batch_gemini_requests` and the app's ModelRegistry with a BatchScheduler that
+allows `concurrency` in flight and has no RPM/TPM budget, so the numbers show the
+transport's own ceiling.
+
+The SDK's async client only works over gRPC: with transport="rest" it wraps the
+synchronous REST transport and `generate_content_async` fails with "object
+GenerateContentResponse can't be used in 'await' expression" (google-generativeai
+0.8.4). Since the default gRPC transport always uses TLS, the benchmark installs
+an async client on a plaintext channel to the fake server as the SDK's default
+async client.
+"""
+import argparse
+import asyncio
+import os
+import threading
+import time
+
+import grpc
+from google.generativeai import client as genai_client
+from google.ai import generativelanguage_v1beta as glm
+from google.ai.generativelanguage_v1beta.services.generative_service.transports import (
+    GenerativeServiceGrpcAsyncIOTransport,
+)
+from google.auth.credentials import AnonymousCredentials
+
+FAKE_RESPONSE = glm.GenerateContentResponse(
+    candidates=[glm.Candidate(content=glm.Content(role="model", parts=[glm.Part(text="ok")]), finish_reason=1)]
+)
+
+
+def start_fake_server(port, latency):
+    """Serves GenerateContent on 127.0.0.1:`port` in a daemon thread; returns the request counter."""
+    counter = {"requests": 0}
+    started = threading.Event()
+
+    async def generate(request, context):
+        counter["requests"] += 1
+        if latency:
+            await asyncio.sleep(latency)
+        return FAKE_RESPONSE
+
+    handler = grpc.method_handlers_generic_handler("google.ai.generativelanguage.v1beta.GenerativeService", {
+        "GenerateContent": grpc.unary_unary_rpc_method_handler(
+            generate,
+            request_deserializer=glm.GenerateContentRequest.deserialize,
+            response_serializer=glm.GenerateContentResponse.serialize,
+        ),
+    })
+
+    async def serve():
+        server = grpc.aio.server(options=[("grpc.max_concurrent_streams", 10000)])
+        server.add_generic_rpc_handlers((handler,))
+        server.add_insecure_port(f"127.0.0.1:{port}")
+        await server.start()
+        started.set()
+        await server.wait_for_termination()
+
+    threading.Thread(target=lambda: asyncio.run(serve()), daemon=True).start()
+    started.wait()
+    return counter
+
+
+def use_fake_server(port):
+    """Makes the SDK's default async client talk plaintext gRPC to the fake server."""
+    transport = GenerativeServiceGrpcAsyncIOTransport(
+        credentials=AnonymousCredentials(),
+        channel=grpc.aio.insecure_channel(f"127.0.0.1:{port}"),
+    )
+    genai_client._client_manager.clients["generative_async"] = glm.GenerativeServiceAsyncClient(transport=transport)
+
+
+async def run(concurrency, requests):
+    """One run of `requests` calls with at most `concurrency` in flight; returns (seconds, errors)."""
+    from general import gemini_call
+    from general.batch_scheduler import BatchScheduler
+
+    scheduler = BatchScheduler(max_in_flight=concurrency, max_retries=0)
+    pairs = [(f"question {i}", "You are a benchmark.") for i in range(requests)]
+    started = time.perf_counter()
+    results = await gemini_call.batch_gemini_requests(pairs, use_cache=False, scheduler=scheduler)
+    seconds = time.perf_counter() - started
+    errors = [result for result in results if isinstance(result, dict)]
+    if errors:
+        print(f"first error: {errors[0]['error']}")
+    return seconds, len(errors)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--latency", type=float, default=0.05, help="fake server latency in seconds")
+    parser.add_argument("--concurrency", default="10,100,1000")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    os.environ.setdefault("GEMINI_API_KEY", "fake-key")
+    os.environ.update({"LLM_CACHE_BACKEND": "none", "GEMINI_CONTEXT_CACHE_ENABLED": "false"})
+    counter = start_fake_server(args.port, args.latency)
+    from general import gemini_call
+    gemini_call.configure()
+
+    print(f"{args.requests} requests per run, fake server latency {args.latency * 1000:.0f} ms")
+    print(f"{'concurrency':>11} {'seconds':>8} {'req/s':>8} {'errors':>6}")
+
+    async def run_all():
+        # one event loop for every run: the async channel is bound to the loop that created it
+        use_fake_server(args.port)
+        for concurrency in [int(c) for c in args.concurrency.split(",")]:
+            seconds, errors = await run(concurrency, args.requests)
+            print(f"{concurrency:>11} {seconds:>8.2f} {args.requests / seconds:>8.0f} {errors:>6}")
+
+    asyncio.run(run_all())
+    print(f"server saw {counter['requests']} requests")
+
+
+if __name__ == "__main__":
+    main()
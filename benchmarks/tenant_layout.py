@@ -0,0 +1,170 @@
+"""
+Query latency and server memory of the two storage layouts at 1k+ projects.
+
+    python -m benchmarks.tenant_layout [--projects 1000] [--chunks 20] [--queries 2000]
+        [--concurrency 16] [--layouts collections,tenants] [--metrics-url http://localhost:2112/metrics]
+
+Needs a running Weaviate (WEAVIATE_HOST/WEAVIATE_PORT/WEAVIATE_GRPC_PORT). For
+each layout it creates `--projects` projects with `--chunks` chunks each through
+AsyncWeaviateDatabase, as the app does, then reports setup time, registry load
+time and hybrid query latency over random projects. Vectors come from a
+deterministic hash embedder, so no embedding API is called. For the tenant layout
+it then deactivates every tenant with offload_idle_tenants and measures the first
+queries that reactivate them. With --metrics-url (Weaviate's Prometheus endpoint,
+PROMETHEUS_MONITORING_ENABLED=true) it also reports the server's Go heap in use
+after each step. Everything created is deleted at the end unless --keep is given.
+"""
+import argparse
+import asyncio
+import hashlib
+import random
+import re
+import time
+import urllib.request
+
+import numpy as np
+
+from database.async_vector_database import AsyncWeaviateDatabase
+from database.collection_registry import CollectionRegistry
+from database.tenancy import TenantLayout
+from database.vectorizer import Vectorizer
+
+LANG = "en"
+WORDS = ["price", "delivery", "warranty", "size", "colour", "stock", "order", "return", "payment", "discount"]
+
+
+class HashEmbedder:
+    """Deterministic pseudo-random unit vectors, so the benchmark needs no embedding API."""
+
+    def __init__(self, dim=256):
+        self.dim = dim
+
+    def embed_text(self, texts, input_type=None):
+        vectors = np.empty((len(texts), self.dim), dtype=np.float32)
+        for i, text in enumerate(texts):
+            seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+            vector = np.random.default_rng(seed).standard_normal(self.dim)
+            vectors[i] = vector / np.linalg.norm(vector)
+        return vectors
+
+    async def embed_text_async(self, texts, input_type=None):
+        return self.embed_text(texts, input_type)
+
+
+def heap_mb(metrics_url):
+    """Weaviate's Go heap in use, in MB, from its Prometheus endpoint; None without one."""
+    if not metrics_url:
+        return None
+    with urllib.request.urlopen(metrics_url, timeout=10) as response:
+        text = response.read().decode("utf-8")
+    match = re.search(r"^go_memstats_heap_inuse_bytes\s+(\S+)", text, re.MULTILINE)
+    return float(match.group(1)) / (1 << 20) if match else None
+
+
+def percentile(values, q):
+    return float(np.percentile(values, q)) * 1000 if values else float("nan")
+
+
+def sentence(rng):
+    return " ".join(rng.choices(WORDS, k=12)) + "."
+
+
+async def bounded(coroutines, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(coroutine):
+        async with semaphore:
+            return await coroutine
+
+    return await asyncio.gather(*(run(coroutine) for coroutine in coroutines))
+
+
+async def timed_queries(database, projects, count, concurrency, rng):
+    latencies = []
+
+    async def query(project_id, text):
+        started = time.perf_counter()
+        await database.hybrid_query(text, project_id, limit=3)
+        latencies.append(time.perf_counter() - started)
+
+    await bounded([query(rng.choice(projects), sentence(rng)) for _ in range(count)], concurrency)
+    return latencies
+
+
+def report(step, seconds=None, latencies=None, heap=None):
+    parts = [f"{step:<28}"]
+    if seconds is not None:
+        parts.append(f"{seconds:8.2f} s")
+    if latencies:
+        parts.append(f"p50 {percentile(latencies, 50):7.1f} ms  p95 {percentile(latencies, 95):7.1f} ms  "
+                     f"p99 {percentile(latencies, 99):7.1f} ms")
+    if heap is not None:
+        parts.append(f"heap {heap:8.1f} MB")
+    print("  ".join(parts))
+
+
+async def bench_layout(name, args):
+    layout = TenantLayout(args.prefix) if name == "tenants" else None
+    database = AsyncWeaviateDatabase(vectorizer=Vectorizer(HashEmbedder()), registry=CollectionRegistry(),
+                                     layout=layout)
+    projects = [f"bench{i}_{LANG}" for i in range(args.projects)]
+    rng = random.Random(0)
+    print(f"\n{name}: {args.projects} projects x {args.chunks} chunks")
+    report("before setup", heap=heap_mb(args.metrics_url))
+    try:
+        started = time.perf_counter()
+
+        async def create(project_id):
+            await database.ensure_collection(project_id)
+            await database.insert_chunks(project_id, [
+                {"title": f"{project_id} {n}", "text": sentence(rng), "number": n} for n in range(args.chunks)
+            ])
+
+        await bounded([create(project_id) for project_id in projects], args.concurrency)
+        report("setup", time.perf_counter() - started, heap=heap_mb(args.metrics_url))
+
+        started = time.perf_counter()
+        await database.warm()
+        report("registry load", time.perf_counter() - started)
+
+        latencies = await timed_queries(database, projects, args.queries, args.concurrency, rng)
+        report("hybrid queries", latencies=latencies, heap=heap_mb(args.metrics_url))
+
+        if layout is not None:
+            started = time.perf_counter()
+            changed = await database.offload_idle_tenants(0, args.offload_status)
+            report(f"offload {changed} tenants", time.perf_counter() - started, heap=heap_mb(args.metrics_url))
+            cold = rng.sample(projects, min(len(projects), args.queries))
+            latencies = await timed_queries(database, cold, len(cold), args.concurrency, rng)
+            report("first queries after offload", latencies=latencies, heap=heap_mb(args.metrics_url))
+    finally:
+        if not args.keep:
+            client = await database._get_client()
+            names = [f"{args.prefix}_{LANG}"] if layout is not None else projects
+            for collection in names:
+                await client.collections.delete(collection)
+        await database.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--projects", type=int, default=1000)
+    parser.add_argument("--chunks", type=int, default=20, help="chunks per project")
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--layouts", default="collections,tenants")
+    parser.add_argument("--prefix", default="BenchTenants", help="shared collection prefix for the tenant layout")
+    parser.add_argument("--offload-status", default="inactive", choices=["inactive", "offloaded"])
+    parser.add_argument("--metrics-url", default=None, help="Weaviate Prometheus endpoint for heap readings")
+    parser.add_argument("--keep", action="store_true", help="keep the benchmark collections")
+    args = parser.parse_args()
+
+    async def run_all():
+        for layout in args.layouts.split(","):
+            await bench_layout(layout.strip(), args)
+
+    asyncio.run(run_all())
+
+
+if __name__ == "__main__":
+    main()
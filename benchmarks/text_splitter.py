@@ -0,0 +1,89 @@
+"""
+Throughput and memory of the text splitter on 1-100 MB inputs.
+
+    python -m benchmarks.text_splitter [--sizes 1,10,100] [--chunk-size 1000]
+
+Two input shapes are generated: "paragraphs" (short paragraphs of sentences, like
+a typical upload) and "long" (a single paragraph with no newlines, the case the old
+per-separator `find` loop made quadratic). Each is split from an in-memory string
+with `split_text` and streamed from a file with `iter_split_text`; the streamed
+run is timed on its own and then repeated under tracemalloc to report its peak
+allocation.
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+from data_prep.text_splitter import iter_split_text, split_text
+
+MB = 1 << 20
+
+
+def generate(shape, size, seed=0):
+    """About `size` characters of text in the given shape."""
+    rng = random.Random(seed)
+    words = ["alpha", "beta", "gamma", "delta", "narx", "mahsulot", "product", "price", "1000", "so'm"]
+    parts, length = [], 0
+    while length < size:
+        sentence = " ".join(rng.choices(words, k=rng.randint(5, 25))) + ". "
+        if shape == "paragraphs" and rng.random() < 0.15:
+            sentence += "\n\n"
+        parts.append(sentence)
+        length += len(sentence)
+    return "".join(parts)[:size]
+
+
+def bench_string(text, chunk_size):
+    started = time.perf_counter()
+    chunks = split_text(text, chunk_size)
+    return time.perf_counter() - started, len(chunks)
+
+
+def stream(path, chunk_size):
+    count = 0
+    with open(path, encoding="utf-8") as source:
+        for _ in iter_split_text(source, chunk_size):
+            count += 1
+    return count
+
+
+def bench_stream(path, chunk_size):
+    started = time.perf_counter()
+    count = stream(path, chunk_size)
+    seconds = time.perf_counter() - started
+    tracemalloc.start()
+    stream(path, chunk_size)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return seconds, count, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default="1,10,100", help="input sizes in MB")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    print(f"{'shape':>10} {'MB':>5} {'mode':>6} {'seconds':>8} {'MB/s':>7} {'chunks':>8} {'peak MB':>8}")
+    for shape in ("paragraphs", "long"):
+        for size in [int(s) for s in args.sizes.split(",")]:
+            text = generate(shape, size * MB)
+            seconds, chunks = bench_string(text, args.chunk_size)
+            print(f"{shape:>10} {size:>5} {'string':>6} {seconds:>8.2f} {size / seconds:>7.1f} {chunks:>8} {'':>8}")
+
+            with tempfile.NamedTemporaryFile("w", encoding="utf-8", suffix=".txt", delete=False) as f:
+                f.write(text)
+            del text
+            try:
+                seconds, chunks, peak = bench_stream(f.name, args.chunk_size)
+            finally:
+                os.remove(f.name)
+            print(f"{shape:>10} {size:>5} {'stream':>6} {seconds:>8.2f} {size / seconds:>7.1f} {chunks:>8} "
+                  f"{peak / MB:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
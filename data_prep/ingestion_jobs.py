@@ -0,0 +1,337 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+STAGES = ("split", "normalize", "insert")
+
+
+class JobProgress:
+    """Per-stage progress of one ingestion job: counts, errors, timings and throughput."""
+
+    def __init__(self, stages=None, on_change=None):
+        self.stages = stages or {name: self._new_stage() for name in STAGES}
+        self.on_change = on_change
+
+    @staticmethod
+    def _new_stage():
+        return {"status": "pending", "done": 0, "total": 0, "failed": 0, "errors": [],
+                "started_at": None, "finished_at": None}
+
+    def start(self, stage, total=0):
+        state = self.stages.setdefault(stage, self._new_stage())
+        state.update(status="running", total=total, started_at=state["started_at"] or time.time())
+        self._changed()
+
+    def add_total(self, stage, count):
+        self.stages[stage]["total"] += count
+        self._changed()
+
+    def advance(self, stage, done=1, failed=0, error=None):
+        state = self.stages[stage]
+        state["done"] += done
+        state["failed"] += failed
+        if error and len(state["errors"]) < 20:
+            state["errors"].append(error)
+        self._changed()
+
+    def finish(self, stage):
+        state = self.stages[stage]
+        state.update(status="done", finished_at=time.time())
+        self._changed(force=True)
+
+    def snapshot(self):
+        now = time.time()
+        stages = {}
+        for name, state in self.stages.items():
+            elapsed = ((state["finished_at"] or now) - state["started_at"]) if state["started_at"] else 0.0
+            stages[name] = {
+                **state,
+                "elapsed_seconds": round(elapsed, 3),
+                "items_per_second": round(state["done"] / elapsed, 3) if elapsed > 0 else None,
+            }
+        return stages
+
+    def _changed(self, force=False):
+        if self.on_change:
+            self.on_change(force)
+
+
+class JobStore:
+    """
+    SQLite-backed queue of ingestion jobs, so queued and interrupted jobs survive
+    restarts. Several processes may share one store: claims are atomic and running
+    jobs carry a heartbeat, so only jobs whose owner stopped beating are requeued.
+    """
+
+    def __init__(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, project_id TEXT NOT NULL, languages TEXT NOT NULL, row_data TEXT NOT NULL, "
+            "status TEXT NOT NULL, stages TEXT, error TEXT, attempts INTEGER NOT NULL DEFAULT 0, "
+            "created_at REAL NOT NULL, started_at REAL, finished_at REAL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs(status, created_at)")
+        columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        for column, kind in (("result", "TEXT"), ("options", "TEXT"), ("heartbeat_at", "REAL")):
+            if column not in columns:
+                self._conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {kind}")
+        self._conn.commit()
+
+    def create(self, project_id, row_data, languages, options=None):
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, project_id, languages, row_data, options, status, created_at) "
+                "VALUES (?, ?, ?, ?, ?, 'queued', ?)",
+                (job_id, project_id, json.dumps(languages), row_data, json.dumps(options or {}), time.time()),
+            )
+            self._conn.commit()
+        return job_id
+
+    def get(self, job_id, include_data=False):
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_dict(row, include_data) if row else None
+
+    def claim_next(self):
+        """
+        Marks the oldest queued job as running and returns it, or None. The update
+        only applies while the job is still queued, so when another process claims
+        it first this one moves on to the next job.
+        """
+        with self._lock:
+            while True:
+                row = self._conn.execute(
+                    "SELECT id FROM jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1"
+                ).fetchone()
+                if row is None:
+                    return None
+                now = time.time()
+                claimed = self._conn.execute(
+                    "UPDATE jobs SET status = 'running', started_at = ?, heartbeat_at = ?, attempts = attempts + 1 "
+                    "WHERE id = ? AND status = 'queued'",
+                    (now, now, row["id"]),
+                ).rowcount
+                self._conn.commit()
+                if claimed:
+                    break
+        return self.get(row["id"], include_data=True)
+
+    def heartbeat(self, job_ids):
+        """Marks running jobs as still owned by a live worker."""
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE jobs SET heartbeat_at = ? WHERE id = ? AND status = 'running'",
+                [(time.time(), job_id) for job_id in job_ids],
+            )
+            self._conn.commit()
+
+    def finish(self, job_id, status, **fields):
+        """Moves a job to a final state and drops its row_data, which is no longer needed."""
+        self.update(job_id, status=status, row_data="", finished_at=time.time(), **fields)
+
+    def update(self, job_id, **fields):
+        for name in ("stages", "result"):
+            if name in fields:
+                fields[name] = json.dumps(fields[name])
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock:
+            self._conn.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+            self._conn.commit()
+
+    def requeue_interrupted(self, max_attempts=None, stale_after=0):
+        """
+        Puts 'running' jobs without a heartbeat for `stale_after` seconds (their
+        process died or was stopped) back on the queue; jobs other processes are
+        still running keep beating and are left alone. Jobs that have already been
+        started `max_attempts` times are failed instead, so a job that kills its
+        worker is not retried on every restart. Returns (requeued, failed).
+        """
+        now = time.time()
+        stale = "status = 'running' AND COALESCE(heartbeat_at, started_at, 0) <= ?"
+        with self._lock:
+            failed = 0
+            if max_attempts:
+                failed = self._conn.execute(
+                    "UPDATE jobs SET status = 'failed', row_data = '', finished_at = ?, "
+                    "error = 'Interrupted ' || attempts || ' time(s); not retried again' "
+                    f"WHERE {stale} AND attempts >= ?",
+                    (now, now - stale_after, max_attempts),
+                ).rowcount
+            requeued = self._conn.execute(
+                f"UPDATE jobs SET status = 'queued' WHERE {stale}", (now - stale_after,)
+            ).rowcount
+            self._conn.commit()
+        return requeued, failed
+
+    def purge_finished(self, older_than):
+        """Deletes succeeded and failed jobs that finished more than `older_than` seconds ago."""
+        with self._lock:
+            count = self._conn.execute(
+                "DELETE FROM jobs WHERE status IN ('succeeded', 'failed') AND finished_at < ?",
+                (time.time() - older_than,),
+            ).rowcount
+            self._conn.commit()
+        return count
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    @staticmethod
+    def _to_dict(row, include_data=False):
+        job = {
+            "id": row["id"],
+            "project_id": row["project_id"],
+            "languages": json.loads(row["languages"]),
+            "options": json.loads(row["options"]) if row["options"] else {},
+            "status": row["status"],
+            "stages": json.loads(row["stages"]) if row["stages"] else None,
+            "result": json.loads(row["result"]) if row["result"] else None,
+            "error": row["error"],
+            "attempts": row["attempts"],
+            "created_at": row["created_at"],
+            "started_at": row["started_at"],
+            "finished_at": row["finished_at"],
+        }
+        if include_data:
+            job["row_data"] = row["row_data"]
+        return job
+
+
+class IngestionJobManager:
+    """
+    Runs queued ingestion jobs on a pool of asyncio workers.
+
+    `run_job(project_id, row_data, languages, progress, **options)` does the actual
+    work and reports into the JobProgress it is given; progress is persisted to the store at
+    most once per `persist_interval` seconds and the job's return value is stored
+    as its `result`. A job interrupted `max_attempts` times is failed instead of
+    requeued, and finished jobs are deleted after `retention` seconds.
+
+    Running jobs are heartbeated every `lease / 4` seconds. Jobs whose heartbeat is
+    older than `lease` seconds, left by a stopped or crashed process, are requeued
+    by whichever manager notices first, so several processes can share one store.
+    """
+
+    def __init__(self, run_job, store, workers=2, persist_interval=1.0, max_attempts=3, retention=7 * 86400,
+                 purge_interval=3600, lease=60.0):
+        self.run_job = run_job
+        self.store = store
+        self.workers = workers
+        self.persist_interval = persist_interval
+        self.max_attempts = max_attempts
+        self.retention = retention
+        self.purge_interval = purge_interval
+        self.lease = lease
+
+        self._last_purge = 0.0
+        self._tasks = []
+        self._wakeup = None
+        self._live = {}  # job_id -> JobProgress
+
+    async def start(self):
+        self._recover()
+        self._purge()
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._heartbeat()))
+
+    async def stop(self):
+        """Cancels the workers; jobs they were running stay 'running' and are requeued once their lease expires."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self.store.close()
+
+    def submit(self, project_id, row_data, languages, **options):
+        job_id = self.store.create(project_id, row_data, languages, options)
+        if self._wakeup:
+            self._wakeup.set()
+        return job_id
+
+    def get(self, job_id):
+        job = self.store.get(job_id)
+        if job and job_id in self._live:
+            job["stages"] = self._live[job_id].snapshot()
+        return job
+
+    def _recover(self):
+        requeued, failed = self.store.requeue_interrupted(self.max_attempts, stale_after=self.lease)
+        if requeued:
+            print(f"Requeued {requeued} interrupted ingestion job(s).")
+        if failed:
+            print(f"Failed {failed} ingestion job(s) interrupted {self.max_attempts} times.")
+        if requeued and self._wakeup:
+            self._wakeup.set()
+
+    async def _heartbeat(self):
+        """Keeps this process's running jobs leased and requeues jobs whose lease expired."""
+        last_recover = time.monotonic()
+        while True:
+            await asyncio.sleep(self.lease / 4)
+            if self._live:
+                self.store.heartbeat(list(self._live))
+            if time.monotonic() - last_recover >= self.lease:
+                last_recover = time.monotonic()
+                self._recover()
+
+    def _purge(self):
+        if self.retention is None:
+            return
+        self._last_purge = time.monotonic()
+        purged = self.store.purge_finished(self.retention)
+        if purged:
+            print(f"Deleted {purged} finished ingestion job(s) older than {self.retention}s.")
+
+    async def _worker(self):
+        while True:
+            job = self.store.claim_next()
+            if job is None:
+                if time.monotonic() - self._last_purge >= self.purge_interval:
+                    self._purge()
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=5)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self._run(job)
+
+    async def _run(self, job):
+        job_id = job["id"]
+        last_persist = 0.0
+
+        def persist(force=False):
+            nonlocal last_persist
+            now = time.monotonic()
+            if force or now - last_persist >= self.persist_interval:
+                last_persist = now
+                self.store.update(job_id, stages=progress.snapshot())
+
+        progress = JobProgress(on_change=persist)
+        self._live[job_id] = progress
+        try:
+            result = await self.run_job(job["project_id"], job["row_data"], job["languages"], progress,
+                                      **job["options"])
+            self.store.finish(job_id, "succeeded", stages=progress.snapshot(), result=result)
+        except asyncio.CancelledError:
+            self.store.update(job_id, stages=progress.snapshot())
+            raise
+        except Exception as e:
+            print(f"Ingestion job {job_id} failed: {e}")
+            self.store.finish(job_id, "failed", error=str(e), stages=progress.snapshot())
+        finally:
+            self._live.pop(job_id, None)
@@ -0,0 +1,78 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import uuid
+
+
+def chunk_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def chunk_uuid(collection, text_hash):
+    """Deterministic object uuid for a chunk, so re-inserting the same chunk overwrites it."""
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"chunk://{collection}/{text_hash}"))
+
+
+class ChunkManifest:
+    """SQLite record of which raw-chunk hashes are stored in each `{project_id}_{lang}` collection."""
+
+    def __init__(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS chunks ("
+            "collection TEXT NOT NULL, chunk_hash TEXT NOT NULL, uuid TEXT NOT NULL, "
+            "PRIMARY KEY (collection, chunk_hash))"
+        )
+        self._conn.commit()
+
+    def known(self, collection):
+        """Returns {chunk_hash: uuid} for every chunk stored in `collection`."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT chunk_hash, uuid FROM chunks WHERE collection = ?", (collection,)
+            ).fetchall()
+        return dict(rows)
+
+    def add(self, collection, entries):
+        """Records `(chunk_hash, uuid)` pairs as stored in `collection`."""
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO chunks (collection, chunk_hash, uuid) VALUES (?, ?, ?)",
+                [(collection, text_hash, object_uuid) for text_hash, object_uuid in entries],
+            )
+            self._conn.commit()
+
+    def remove(self, collection, hashes):
+        with self._lock:
+            self._conn.executemany(
+                "DELETE FROM chunks WHERE collection = ? AND chunk_hash = ?",
+                [(collection, text_hash) for text_hash in hashes],
+            )
+            self._conn.commit()
+
+    def drop(self, collection=None, prefix=None):
+        """
+        Forgets one collection, every `{prefix}{lang}` collection, or everything. The
+        language suffix has no "_", so prefix "a_" does not match project "a_b".
+        """
+        with self._lock:
+            if collection is not None:
+                self._conn.execute("DELETE FROM chunks WHERE collection = ?", (collection,))
+            elif prefix is not None:
+                self._conn.execute(
+                    "DELETE FROM chunks WHERE substr(collection, 1, ?) = ? AND instr(substr(collection, ?), '_') = 0",
+                    (len(prefix), prefix, len(prefix) + 1),
+                )
+            else:
+                self._conn.execute("DELETE FROM chunks")
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,224 @@
+import asyncio
+import json
+import time
+
+from data_prep.data_preparation import parse_chunk_response
+from data_prep.manifest import chunk_hash, chunk_uuid
+from general.agent_prompts import get_sys_prompt, get_translation_prompt
+from general.gemini_call import batch_scheduler, estimate_request_tokens, generate_gemini
+
+_DONE = object()
+
+
+MODES = ("per_language", "translate")
+
+
+def validate_upload(languages, mode):
+    """Raises ValueError for an upload that ingest_stream cannot run."""
+    if not languages:
+        raise ValueError("At least one language is required.")
+    if mode not in MODES:
+        raise ValueError(f"Unknown ingestion mode: {mode}")
+
+
+async def ingest_stream(chunks, languages, project_id, db, progress=None, workers=16, queue_size=64,
+                        insert_batch_size=50, insert_linger=0.5, scheduler=None, mode="per_language",
+                        manifest=None, diff=False):
+    """
+    Streams raw chunks through LLM normalization straight into the vector store.
+
+    split -> normalize -> insert run as concurrent stages joined by bounded queues,
+    so a slow stage applies backpressure to the one before it and nothing holds the
+    whole document. `chunks` may be any (lazy) iterable of strings. Normalized
+    chunks are inserted per collection in batches of `insert_batch_size`, or sooner
+    once `insert_linger` seconds pass without new results.
+
+    Every (chunk, language) pair goes through the same worker pool and scheduler,
+    so all languages progress together under one concurrency budget. In
+    "per_language" mode each language normalizes the raw chunk; in "translate" mode
+    the raw chunk is normalized once into the first language and the result is
+    translated into the others.
+
+    Stored objects get a uuid derived from the hash of their raw chunk. With a
+    `manifest`, chunks a collection already holds are skipped before any LLM call,
+    and with `diff=True` stored chunks that are no longer in the document are
+    deleted afterwards (kept if any chunk of that language failed). A collection the
+    store has to create (its data was lost, or STORAGE_BACKEND/STORAGE_LAYOUT now
+    point elsewhere) holds nothing, so its manifest entries are dropped first.
+
+    Returns per-language counts of normalized, skipped, failed, inserted and
+    deleted chunks with the wall-clock `seconds` spent on the language and the
+    summed `llm_seconds`.
+    """
+    validate_upload(languages, mode)
+    scheduler = scheduler or batch_scheduler
+    pivot, targets = languages[0], languages[1:]
+    collections = {lang: f"{project_id}_{lang}" for lang in languages}
+    sys_prompts = {lang: get_sys_prompt(lang) for lang in languages}
+    translation_prompts = {lang: get_translation_prompt(lang) for lang in targets} if mode == "translate" else {}
+    known = {}
+    seen = set()
+    stats = {
+        lang: {"normalized": 0, "skipped": 0, "failed": 0, "inserted": 0, "insert_failed": 0, "deleted": 0,
+               "seconds": 0.0, "llm_seconds": 0.0}
+        for lang in languages
+    }
+    started = {}
+    work = asyncio.Queue(maxsize=queue_size)
+    results = asyncio.Queue(maxsize=queue_size)
+
+    for lang in languages:
+        if await db.ensure_collection(collections[lang]) and manifest:
+            manifest.drop(collection=collections[lang])
+        known[lang] = manifest.known(collections[lang]) if manifest else {}
+    if progress:
+        for stage in ("split", "normalize", "insert"):
+            progress.start(stage)
+
+    async def split_stage():
+        for idx, text in enumerate(chunks):
+            text_hash = chunk_hash(text)
+            seen.add(text_hash)
+            needed = [lang for lang in languages if text_hash not in known[lang]]
+            for lang in languages:
+                if lang not in needed:
+                    stats[lang]["skipped"] += 1
+            if progress:
+                progress.add_total("split", 1)
+                progress.advance("split")
+                progress.add_total("normalize", len(needed))
+            if needed:
+                await work.put((idx, text, text_hash, needed))
+        if progress:
+            progress.finish("split")
+        for _ in range(workers):
+            await work.put(_DONE)
+
+    def fail(lang, idx, error):
+        stats[lang]["failed"] += 1
+        print(f"Skipping chunk {idx} for '{lang}': {error}")
+        if progress:
+            progress.advance("normalize", failed=1, error=f"{lang} chunk {idx}: {error}")
+
+    async def generate(lang, idx, text, prompt, text_hash, store=True):
+        """Runs one LLM call and, if `store`, queues the result for insert; returns the parsed chunk or None."""
+        call_start = time.monotonic()
+        started.setdefault(lang, call_start)
+        try:
+            response = await scheduler.submit(
+                generate_gemini, text, prompt, tokens=estimate_request_tokens(text, prompt)
+            )
+            chunk = parse_chunk_response(response)
+            error = None if chunk else "invalid JSON"
+        except Exception as e:
+            chunk, error = None, str(e)
+        finished = time.monotonic()
+        stats[lang]["llm_seconds"] += finished - call_start
+        stats[lang]["seconds"] = finished - started[lang]
+
+        if not store:
+            return chunk
+        if chunk is None:
+            fail(lang, idx, error)
+            return None
+
+        stats[lang]["normalized"] += 1
+        if progress:
+            progress.advance("normalize")
+            progress.add_total("insert", 1)
+        await results.put((lang, {
+            **chunk, "number": idx, "hash": text_hash, "uuid": chunk_uuid(collections[lang], text_hash),
+        }))
+        return chunk
+
+    async def normalize_worker():
+        while True:
+            item = await work.get()
+            if item is _DONE:
+                return
+            idx, text, text_hash, needed = item
+            if mode == "per_language":
+                await asyncio.gather(*(
+                    generate(lang, idx, text, sys_prompts[lang], text_hash) for lang in needed
+                ))
+                continue
+
+            # the pivot is normalized whenever any language needs the chunk, but only stored if it needs it too
+            chunk = await generate(pivot, idx, text, sys_prompts[pivot], text_hash, store=pivot in needed)
+            needed_targets = [lang for lang in needed if lang != pivot]
+            if chunk is None:
+                for target in needed_targets:
+                    fail(target, idx, "source chunk failed")
+                continue
+            normalized = json.dumps(chunk, ensure_ascii=False)
+            await asyncio.gather(*(
+                generate(target, idx, normalized, translation_prompts[target], text_hash)
+                for target in needed_targets
+            ))
+
+    async def normalize_stage():
+        async with asyncio.TaskGroup() as group:
+            for _ in range(workers):
+                group.create_task(normalize_worker())
+        if progress:
+            progress.finish("normalize")
+        await results.put(_DONE)
+
+    async def insert_stage():
+        pending = {lang: [] for lang in languages}
+
+        async def flush(lang):
+            batch, pending[lang] = pending[lang], []
+            if not batch:
+                return
+            failed = set(await db.insert_chunks(collections[lang], batch))
+            if manifest:
+                manifest.add(collections[lang], [
+                    (chunk["hash"], chunk["uuid"]) for i, chunk in enumerate(batch) if i not in failed
+                ])
+            stats[lang]["inserted"] += len(batch) - len(failed)
+            stats[lang]["insert_failed"] += len(failed)
+            if progress:
+                progress.advance("insert", done=len(batch) - len(failed), failed=len(failed))
+
+        while True:
+            try:
+                item = await asyncio.wait_for(results.get(), timeout=insert_linger)
+            except asyncio.TimeoutError:
+                for lang in languages:
+                    await flush(lang)
+                continue
+            if item is _DONE:
+                break
+            lang, chunk = item
+            pending[lang].append(chunk)
+            if len(pending[lang]) >= insert_batch_size:
+                await flush(lang)
+
+        for lang in languages:
+            await flush(lang)
+        if progress:
+            progress.finish("insert")
+
+    async with asyncio.TaskGroup() as group:
+        group.create_task(split_stage())
+        group.create_task(normalize_stage())
+        group.create_task(insert_stage())
+
+    if diff:
+        for lang in languages:
+            vanished = [text_hash for text_hash in known[lang] if text_hash not in seen]
+            if not vanished:
+                continue
+            if stats[lang]["failed"] or stats[lang]["insert_failed"]:
+                print(f"Keeping {len(vanished)} stale chunk(s) in '{collections[lang]}' because this run had failures.")
+                continue
+            stats[lang]["deleted"] = await db.delete_chunks(
+                collections[lang], [known[lang][text_hash] for text_hash in vanished]
+            )
+            manifest.remove(collections[lang], vanished)
+
+    for lang, lang_stats in stats.items():
+        if lang_stats["failed"] and not lang_stats["normalized"]:
+            raise RuntimeError(f"All {lang_stats['failed']} chunks failed to process for language '{lang}'.")
+    return stats
@@ -1,4 +1,118 @@
-def split_text(text, chunk_size=1000, overlap_sentences=1, separators=['\n\n', '.\n', ':\n', '\n', '.']):
+import re
+from functools import lru_cache
+
+READ_SIZE = 1 << 16
+
+
+@lru_cache(maxsize=16)
+def _separator_pattern(separators):
+    # Alternatives are tried in list order at the leftmost match position, which is the
+    # same tie-break as picking the first separator with the smallest index.
+    return re.compile("|".join(re.escape(sep) for sep in separators))
+
+
+def _pieces(source):
+    """Yields the text of `source` (a string, a readable file or an iterable of strings) in pieces."""
+    if isinstance(source, str):
+        yield source
+    elif hasattr(source, "read"):
+        yield from iter(lambda: source.read(READ_SIZE), "")
+    else:
+        yield from source
+
+
+def _paragraphs(source):
+    """Same paragraphs as `text.split('\\n\\n')`, produced without holding the whole text."""
+    pending = []
+    ends_with_newline = False
+    for piece in _pieces(source):
+        if not piece:
+            continue
+        if ends_with_newline and piece[0] == "\n":
+            # the separator straddles two pieces
+            pending[-1] = pending[-1][:-1]
+            yield "".join(pending)
+            pending = []
+            piece = piece[1:]
+        start = 0
+        while (idx := piece.find("\n\n", start)) != -1:
+            pending.append(piece[start:idx])
+            yield "".join(pending)
+            pending = []
+            start = idx + 2
+        if start < len(piece):
+            pending.append(piece[start:])
+        ends_with_newline = bool(pending) and pending[-1].endswith("\n")
+    yield "".join(pending)
+
+
+def _split_paragraph(paragraph, chunk_size, overlap_sentences, pattern, token_counter=None, overlap_tokens=None):
+    sentences = []
+    start = 0
+    for match in pattern.finditer(paragraph):
+        sentences.append(paragraph[start:match.end()])
+        start = match.end()
+    if start < len(paragraph):
+        sentences.append(paragraph[start:])
+    sizes = [token_counter(sentence) for sentence in sentences] if token_counter else [len(s) for s in sentences]
+
+    i = 0
+    while i < len(sentences):
+        chunk = []
+        total_len = 0
+        j = i
+        while j < len(sentences) and total_len + sizes[j] <= chunk_size:
+            chunk.append(sentences[j])
+            total_len += sizes[j]
+            j += 1
+
+        if chunk:
+            yield ''.join(chunk)
+
+        if j == i:
+            yield sentences[j]
+            j += 1
+
+        if overlap_tokens is None:
+            i = max(j - overlap_sentences, i + 1)
+            continue
+        # step back over as many trailing sentences as fit in the token overlap
+        k, overlap = j, 0
+        while k - 1 > i and overlap + sizes[k - 1] <= overlap_tokens:
+            k -= 1
+            overlap += sizes[k]
+        i = max(k, i + 1)
+
+
+def iter_split_text(source, chunk_size=1000, overlap_sentences=1, separators=('\n\n', '.\n', ':\n', '\n', '.'),
+                    token_counter=None, overlap_tokens=None):
+    """
+    Lazily yields the chunks `split_text` would return for the text of `source`.
+
+    `source` may be a string, a readable text file or an iterable of strings; only
+    the current paragraph is held in memory. Each long paragraph is scanned once
+    with a compiled alternation of the separators.
+
+    With a `token_counter` (e.g. data_prep.tokenizer.approx_token_count) chunk_size
+    is measured in tokens instead of characters, and `overlap_tokens`, if given,
+    replaces overlap_sentences with the number of tokens repeated between chunks.
+    """
+    pattern = _separator_pattern(tuple(separators))
+    for paragraph in _paragraphs(source):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+
+        size = token_counter(paragraph) if token_counter else len(paragraph)
+        if size <= chunk_size:
+            yield paragraph
+            continue
+
+        yield from _split_paragraph(paragraph, chunk_size, overlap_sentences, pattern, token_counter, overlap_tokens)
+
+
+def split_text(text, chunk_size=1000, overlap_sentences=1, separators=['\n\n', '.\n', ':\n', '\n', '.'],
+               token_counter=None, overlap_tokens=None):
     """
     Split text into chunks of size less than chunk_size, ensuring that each chunk is meaningful and retains context.
     If a paragraph is smaller than chunk_size, it is treated as a single chunk.
@@ -6,60 +120,13 @@ def split_text(text, chunk_size=1000, overlap_sentences=1, separators=['\n\n', '
 
     Args:
         text (str): The input text to split.
-        chunk_size (int): The maximum size of each chunk.
+        chunk_size (int): The maximum size of each chunk, in characters or, with token_counter, in tokens.
         overlap_sentences (int): The number of overlapping sentences between successive chunks.
         separators (list): A list of separators to use for splitting.
+        token_counter (callable): Optional function returning the token count of a string.
+        overlap_tokens (int): Optional overlap between successive chunks in tokens, instead of sentences.
 
     Returns:
         list: A list of text chunks.
     """
-    chunks = []
-    paragraphs = text.split('\n\n')
-
-    for paragraph in paragraphs:
-        paragraph = paragraph.strip()
-        if not paragraph:
-            continue
-
-        if len(paragraph) <= chunk_size:
-            chunks.append(paragraph)
-            continue
-
-        sentences = []
-        start = 0
-        text_len = len(paragraph)
-        while start < text_len:
-            split_idx = -1
-            split_sep = None
-            for sep in separators:
-                idx = paragraph.find(sep, start)
-                if idx != -1 and (split_idx == -1 or idx < split_idx):
-                    split_idx = idx
-                    split_sep = sep
-            if split_idx == -1:
-                sentences.append(paragraph[start:])
-                break
-            end = split_idx + len(split_sep)
-            sentences.append(paragraph[start:end])
-            start = end
-
-        i = 0
-        while i < len(sentences):
-            chunk = []
-            total_len = 0
-            j = i
-            while j < len(sentences) and total_len + len(sentences[j]) <= chunk_size:
-                chunk.append(sentences[j])
-                total_len += len(sentences[j])
-                j += 1
-
-            if chunk:
-                chunks.append(''.join(chunk))
-
-            if j == i:
-                chunks.append(sentences[j])
-                j += 1
-
-            i = max(j - overlap_sentences, i + 1)
-
-    return chunks
+    return list(iter_split_text(text, chunk_size, overlap_sentences, separators, token_counter, overlap_tokens))
@@ -0,0 +1,54 @@
+import math
+import re
+
+# Rough characters per token for the Gemini / voyage-3 tokenizers: Latin-script words
+# average about four characters per token, Cyrillic and other scripts closer to 2.5.
+ASCII_CHARS_PER_TOKEN = 4.0
+OTHER_CHARS_PER_TOKEN = 2.5
+
+_WORD = re.compile(r"\w+|[^\w\s]")
+
+
+def approx_token_count(text):
+    """Fast local estimate of the token count of `text`; no model or network access."""
+    count = 0
+    for match in _WORD.finditer(text):
+        word = match.group()
+        per_token = ASCII_CHARS_PER_TOKEN if word.isascii() else OTHER_CHARS_PER_TOKEN
+        count += math.ceil(len(word) / per_token)
+    return count
+
+
+class ChunkStats:
+    """Collects the token size of every chunk passing through `track` for tuning chunk sizes."""
+
+    def __init__(self, token_counter=approx_token_count, bin_size=64):
+        self.token_counter = token_counter
+        self.bin_size = bin_size
+        self.sizes = []
+
+    def track(self, chunks):
+        for chunk in chunks:
+            self.sizes.append(self.token_counter(chunk))
+            yield chunk
+
+    def summary(self):
+        if not self.sizes:
+            return {"chunks": 0, "tokens": 0, "histogram": []}
+        sizes = sorted(self.sizes)
+        bins = {}
+        for size in sizes:
+            bins[size // self.bin_size] = bins.get(size // self.bin_size, 0) + 1
+        return {
+            "chunks": len(sizes),
+            "tokens": sum(sizes),
+            "min": sizes[0],
+            "max": sizes[-1],
+            "mean": round(sum(sizes) / len(sizes), 1),
+            "p50": sizes[len(sizes) // 2],
+            "p95": sizes[min(len(sizes) - 1, int(len(sizes) * 0.95))],
+            "histogram": [
+                {"tokens": f"{b * self.bin_size}-{(b + 1) * self.bin_size - 1}", "chunks": bins[b]}
+                for b in sorted(bins)
+            ],
+        }
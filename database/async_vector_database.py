@@ -0,0 +1,354 @@
+import asyncio
+import time
+
+import weaviate
+from weaviate.classes.data import DataObject
+from weaviate.classes.query import Filter
+from weaviate.classes.tenants import Tenant, TenantActivityStatus
+import api_keys
+import settings
+from database.backend import AsyncVectorBackend
+from database.client_pool import CONNECTION_ERRORS
+from database.collection_registry import CollectionRegistry, is_not_found, normalize_name
+from database.schema import chunk_properties
+from database.vector_database import (
+    build_filter, collection_config, format_hits, keep_kind, kind_fallback, reciprocal_rank_fusion,
+)
+
+
+class AsyncWeaviateDatabase(AsyncVectorBackend):
+    """
+    Async counterpart of WeaviateDatabase built on WeaviateAsyncClient, used for
+    retrieval and streamed ingestion.
+
+    A single async client is shared by all coroutines on the event loop, so
+    concurrent queries overlap their I/O instead of blocking the loop. The client
+    is connected lazily, health-checked after `health_check_interval` seconds and
+    reconnected when a call fails with a connection error. With a TenantLayout,
+    names address tenants of shared per-language collections.
+    """
+
+    def __init__(self, host=settings.WEAVIATE_HOST, port=settings.WEAVIATE_PORT,
+                 health_check_interval=settings.WEAVIATE_HEALTH_CHECK_INTERVAL, vectorizer=None, registry=None,
+                 layout=None):
+        self.host = host
+        self.vectorizer = vectorizer
+        self.registry = registry or CollectionRegistry(settings.COLLECTION_REGISTRY_TTL)
+        self.layout = layout
+        self._has_kind = {}  # collection -> whether its schema has `kind`
+        self.port = port
+        self.headers = {"X-VoyageAI-Api-Key": api_keys.VOYAGE_API_KEY}
+        self.health_check_interval = health_check_interval
+
+        self._client = None
+        self._lock = None
+        self._last_checked = 0.0
+        self._stats = {"connects": 0, "reconnects": 0, "health_check_failures": 0, "queries": 0}
+
+    async def _get_client(self):
+        client = self._client
+        if client is not None and client.is_connected() \
+                and time.monotonic() - self._last_checked < self.health_check_interval:
+            return client
+
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            client = self._client
+            if client is not None and client.is_connected():
+                try:
+                    if await client.is_ready():
+                        self._last_checked = time.monotonic()
+                        return client
+                except Exception:
+                    pass
+                self._stats["health_check_failures"] += 1
+
+            if client is not None:
+                self._stats["reconnects"] += 1
+                await self._safe_close(client)
+
+            client = weaviate.use_async_with_local(
+                host=self.host, port=self.port, grpc_port=settings.WEAVIATE_GRPC_PORT, headers=self.headers
+            )
+            await client.connect()
+            self._stats["connects"] += 1
+            self._client = client
+            self._last_checked = time.monotonic()
+            return client
+
+    async def _discard(self, client):
+        """Drops a client that failed with a connection error so the next call reconnects."""
+        if self._client is client:
+            self._client = None
+            self._stats["reconnects"] += 1
+            await self._safe_close(client)
+
+    @staticmethod
+    async def _safe_close(client):
+        try:
+            await client.close()
+        except Exception as e:
+            print(f"Error closing async Weaviate client: {e}")
+
+    def metrics(self):
+        return {**self._stats, "connected": bool(self._client and self._client.is_connected()),
+                "collections": self.registry.metrics(),
+                "tenants": self.layout.metrics() if self.layout else None}
+
+    async def warm(self):
+        """Loads the collection registry so the first requests need no existence checks."""
+        await self._refresh_collections(await self._get_client())
+
+    async def _refresh_collections(self, client):
+        names = (await client.collections.list_all(simple=True)).keys()
+        if self.layout is not None:
+            names = [
+                self.layout.name(shared, tenant)
+                for shared in names if self.layout.is_shared(shared)
+                for tenant in await client.collections.get(shared).tenants.get()
+            ]
+        self.registry.load(names)
+
+    async def _collection_exists(self, client, name):
+        if self.registry.needs_refresh():
+            await self._refresh_collections(client)
+        if self.registry.contains(name):
+            return True
+        if await self._exists(client, name):
+            self.registry.add(name)
+            return True
+        return False
+
+    async def _exists(self, client, name):
+        if self.layout is None:
+            return await client.collections.exists(name)
+        shared, tenant = self.layout.split(name)
+        if not await client.collections.exists(shared):
+            return False
+        return await client.collections.get(shared).tenants.exists(tenant)
+
+    def _collection(self, client, name):
+        if self.layout is None:
+            return client.collections.get(name)
+        shared, tenant = self.layout.split(name)
+        self.layout.touch(name)
+        return client.collections.get(shared).with_tenant(tenant)
+
+    async def _query_filters(self, collection, name, filters):
+        """(filters for Weaviate, kind to check on the hits); see WeaviateDatabase._query_filters."""
+        if not (filters and filters.get("kind")):
+            return filters, None
+        key = normalize_name(self.layout.split(name)[0] if self.layout else name)
+        if key not in self._has_kind:
+            properties = (await collection.config.get(simple=True)).properties
+            self._has_kind[key] = any(prop.name == "kind" for prop in properties)
+            if not self._has_kind[key]:
+                print(f"Collection '{key}' has no 'kind' property; filtering kind on the hits.")
+        return (filters, None) if self._has_kind[key] else kind_fallback(filters)
+
+    async def offload_idle_tenants(self, idle_seconds, status="inactive"):
+        """
+        Sets tenants this process used and that have been unused for `idle_seconds`
+        to INACTIVE, or to OFFLOADED (needs an offload module on the server). Each
+        collection's tenants are updated in one call; if that fails they are retried
+        one by one so a single bad tenant (e.g. deleted elsewhere) does not hold back
+        the rest. Returns how many changed.
+        """
+        if self.layout is None:
+            return 0
+        client = await self._get_client()
+        if self.registry.needs_refresh():
+            await self._refresh_collections(client)
+        idle = self.layout.idle(self.registry.names(), idle_seconds)
+        activity = TenantActivityStatus.OFFLOADED if status == "offloaded" else TenantActivityStatus.INACTIVE
+        by_collection = {}
+        for name in idle:
+            shared, tenant = self.layout.split(name)
+            by_collection.setdefault(shared, {})[tenant] = name
+        changed = []
+        for shared, tenants in by_collection.items():
+            tenant_api = client.collections.get(shared).tenants
+            try:
+                await tenant_api.update([Tenant(name=tenant, activity_status=activity) for tenant in tenants])
+                changed.extend(tenants.values())
+                continue
+            except Exception as e:
+                print(f"Updating {len(tenants)} tenant(s) of '{shared}' failed ({e}); retrying one by one.")
+            for tenant, name in tenants.items():
+                try:
+                    await tenant_api.update(Tenant(name=tenant, activity_status=activity))
+                    changed.append(name)
+                except Exception as e:
+                    # stop tracking it so a deleted tenant is not retried every round
+                    print(f"Could not set tenant '{tenant}' of '{shared}' to {status}: {e}")
+                    self.layout.forget(name)
+        self.layout.mark_inactive(changed)
+        return len(changed)
+
+    async def close(self):
+        client, self._client = self._client, None
+        if client is not None:
+            await self._safe_close(client)
+
+    async def _query_vectors(self, queries):
+        """Query embeddings when vectorizing client-side (one batched, cached request), else Nones."""
+        if self.vectorizer is None:
+            return [None] * len(queries)
+        return await self.vectorizer.embed_queries(queries)
+
+    async def ensure_collection(self, project_id):
+        client = await self._get_client()
+        if not await self._collection_exists(client, project_id):
+            if self.layout is None:
+                await client.collections.create(project_id, **collection_config(self.vectorizer is not None))
+            else:
+                shared, tenant = self.layout.split(project_id)
+                if not await client.collections.exists(shared):
+                    await client.collections.create(
+                        shared, **collection_config(self.vectorizer is not None, multi_tenant=True)
+                    )
+                await client.collections.get(shared).tenants.create([Tenant(name=tenant)])
+            self.registry.add(project_id)
+            print(f"Collection '{project_id}' created.")
+            return True
+        return False
+
+    async def insert_chunks(self, project_id, chunks):
+        """
+        Inserts a batch of chunk dicts ({"title", "text", "number"}, optionally "uuid")
+        in one insert_many request; objects with an existing uuid are overwritten.
+        Returns the positions in `chunks` of the objects that failed.
+        """
+        vectors = [None] * len(chunks)
+        if self.vectorizer is not None:
+            embeddings = await self.vectorizer.embed_documents([self.vectorizer.document_text(c) for c in chunks])
+            vectors = [self.vectorizer.named(vector) for vector in embeddings]
+        client = await self._get_client()
+        collection = self._collection(client, project_id)
+        objects = [
+            DataObject(
+                properties=chunk_properties(chunk),
+                uuid=chunk.get("uuid"),
+                vector=vector,
+            )
+            for chunk, vector in zip(chunks, vectors)
+        ]
+        try:
+            response = await collection.data.insert_many(objects)
+        except CONNECTION_ERRORS:
+            await self._discard(client)
+            raise
+        for index, error in response.errors.items():
+            print(f"Failed to insert chunk {chunks[index]['number']} into '{project_id}': {error.message}")
+        return sorted(response.errors)
+
+    async def delete_chunks(self, project_id, uuids, batch_size=1000):
+        """Deletes objects by uuid; returns how many were deleted."""
+        client = await self._get_client()
+        collection = self._collection(client, project_id)
+        deleted = 0
+        for start in range(0, len(uuids), batch_size):
+            result = await collection.data.delete_many(
+                where=Filter.by_id().contains_any(uuids[start:start + batch_size])
+            )
+            deleted += result.successful
+        return deleted
+
+    async def hybrid_query(self, query: str, project_id, limit=3, filters=None):
+        """Hybrid search; `filters` (see build_filter) is applied by Weaviate before ranking."""
+        client = None
+        try:
+            client = await self._get_client()
+            if not await self._collection_exists(client, project_id):
+                print(f"Collection '{project_id}' not found.")
+                return []
+
+            collection = self._collection(client, project_id)
+            if isinstance(query, list):
+                query = ' '.join(query)
+
+            filters, kind = await self._query_filters(collection, project_id, filters)
+            vector = (await self._query_vectors([query]))[0]
+            self._stats["queries"] += 1
+            response = await collection.query.hybrid(
+                query=query,
+                vector=vector,
+                # over-fetch when the kind is checked here rather than by Weaviate
+                limit=limit * 4 if kind else limit,
+                alpha=0.7,
+                filters=build_filter(filters),
+            )
+            return keep_kind(format_hits(response.objects), kind, limit)
+
+        except CONNECTION_ERRORS as e:
+            print(f"Connection error during query: {e}")
+            if client is not None:
+                await self._discard(client)
+            return []
+        except Exception as e:
+            print(f"Error during query: {e}")
+            if is_not_found(e):
+                self.registry.discard(project_id)
+            return []
+
+    async def multi_hybrid_query(self, queries, project_id, limit=5, per_query_limit=3,
+                                 concurrency=4, timeout=None, filters=None):
+        """
+        Runs one hybrid query per reformulation concurrently (at most `concurrency` at a
+        time, each bounded by `timeout` seconds) and fuses the results with
+        reciprocal-rank fusion. Failed or timed-out queries are reported in the stats
+        and the remaining results are kept. `filters` is pushed down to every query.
+        """
+        client = None
+        try:
+            client = await self._get_client()
+            if not await self._collection_exists(client, project_id):
+                print(f"Collection '{project_id}' not found.")
+                return [], []
+            collection = self._collection(client, project_id)
+            filters, kind = await self._query_filters(collection, project_id, filters)
+        except CONNECTION_ERRORS as e:
+            print(f"Connection error during query: {e}")
+            if client is not None:
+                await self._discard(client)
+            return [], []
+        except Exception as e:
+            print(f"Error during multi query: {e}")
+            return [], []
+
+        semaphore = asyncio.Semaphore(concurrency)
+        where = build_filter(filters)
+        alpha = 0.7
+        try:
+            vectors = await self._query_vectors(queries)
+        except Exception as e:
+            # Keyword search still answers the question; alpha=0 skips the vector half.
+            print(f"Error embedding queries, falling back to keyword search: {e}")
+            vectors, alpha = [None] * len(queries), 0.0
+
+        async def run(query, vector):
+            async with semaphore:
+                try:
+                    self._stats["queries"] += 1
+                    response = await asyncio.wait_for(
+                        collection.query.hybrid(
+                            query=query, vector=vector, limit=per_query_limit * 4 if kind else per_query_limit,
+                            alpha=alpha, filters=where,
+                        ),
+                        timeout=timeout,
+                    )
+                    return keep_kind(format_hits(response.objects), kind, per_query_limit)
+                except asyncio.TimeoutError:
+                    print(f"Query timed out after {timeout}s: {query}")
+                except CONNECTION_ERRORS as e:
+                    print(f"Connection error during query '{query}': {e}")
+                    await self._discard(client)
+                except Exception as e:
+                    print(f"Error during query '{query}': {e}")
+                    if is_not_found(e):
+                        self.registry.discard(project_id)
+                return None
+
+        result_lists = await asyncio.gather(*(run(q, v) for q, v in zip(queries, vectors)))
+        return reciprocal_rank_fusion(queries, result_lists, limit=limit)
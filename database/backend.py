@@ -0,0 +1,105 @@
+from abc import ABC, abstractmethod
+
+
+class VectorBackend(ABC):
+    """
+    Synchronous storage operations the DocumentHandler needs from a vector store.
+    Collections are named `{project_id}_{lang}`; products and chunks are plain
+    property dicts and hits are the dicts produced by `format_hits`.
+    """
+
+    @abstractmethod
+    def add_product(self, project_id: str, details: dict): ...
+
+    @abstractmethod
+    def get_product(self, project_id: str, product_id: str): ...
+
+    @abstractmethod
+    def get_all_product(self, project_id: str): ...
+
+    @abstractmethod
+    def list_products(self, project_id: str, after: str = None, limit: int = 100, fields: list = None):
+        """
+        One page of objects ordered by uuid, starting after the `after` uuid. Each
+        object is {"id", **properties} limited to `fields` (all properties if None).
+        Returns (objects, next_cursor); next_cursor is None on the last page.
+        """
+
+    def iter_products(self, project_id: str, fields: list = None, page_size: int = 500):
+        """Yields every object of a collection page by page, holding one page at a time."""
+        after = None
+        while True:
+            page, after = self.list_products(project_id, after=after, limit=page_size, fields=fields)
+            yield from page
+            if after is None:
+                return
+
+    @abstractmethod
+    def update_product(self, project_id: str, details: dict): ...
+
+    @abstractmethod
+    def delete_product(self, project_id: str, product_id: str): ...
+
+    @abstractmethod
+    def bulk_upsert_products(self, project_id: str, products: list, update: bool = False):
+        """
+        Writes many products to one collection in a single batch. With `update`,
+        products that do not exist yet are rejected. Returns {position: error}.
+        """
+
+    @abstractmethod
+    def bulk_delete_products(self, project_id: str, product_ids: list):
+        """Deletes many products from one collection; returns {position: error}."""
+
+    @abstractmethod
+    def delete_project(self, project_id: str, language: str = None): ...
+
+    @abstractmethod
+    def delete_all_collections(self): ...
+
+    @abstractmethod
+    def hybrid_query(self, query: str, project_id, limit=3, filters=None):
+        """
+        Hybrid search restricted by `filters`, a dict with any of kind, tags,
+        price_min, price_max and updated_after (see database.schema.matches).
+        """
+
+    @abstractmethod
+    def pool_metrics(self): ...
+
+    @abstractmethod
+    def close(self): ...
+
+
+class AsyncVectorBackend(ABC):
+    """Async operations used by retrieval and streamed ingestion."""
+
+    @abstractmethod
+    async def ensure_collection(self, project_id):
+        """Creates the collection if it is missing; returns True if it had to be created."""
+
+    @abstractmethod
+    async def insert_chunks(self, project_id, chunks): ...
+
+    @abstractmethod
+    async def delete_chunks(self, project_id, uuids): ...
+
+    @abstractmethod
+    async def hybrid_query(self, query: str, project_id, limit=3, filters=None): ...
+
+    @abstractmethod
+    async def multi_hybrid_query(self, queries, project_id, limit=5, per_query_limit=3,
+                                 concurrency=4, timeout=None, filters=None): ...
+
+    @abstractmethod
+    def metrics(self): ...
+
+    async def warm(self):
+        """Preloads metadata at startup; nothing to do by default."""
+
+    async def offload_idle_tenants(self, idle_seconds, status="inactive"):
+        """Deactivates tenants idle for `idle_seconds`; only multi-tenant layouts have any."""
+        return 0
+
+    @abstractmethod
+    async def close(self): ...
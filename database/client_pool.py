@@ -0,0 +1,152 @@
+import threading
+import time
+from contextlib import contextmanager
+
+from weaviate.exceptions import (
+    WeaviateClosedClientError,
+    WeaviateConnectionError,
+    WeaviateGRPCUnavailableError,
+)
+
+CONNECTION_ERRORS = (WeaviateConnectionError, WeaviateClosedClientError, WeaviateGRPCUnavailableError)
+
+
+class WeaviateClientPool:
+    """
+    Bounded pool of long-lived Weaviate clients.
+
+    Clients are created lazily up to `max_size` and reused across calls. An idle
+    client that has not been checked for `health_check_interval` seconds is pinged
+    with `is_ready()` before being handed out; unhealthy or broken clients are
+    closed and replaced with a fresh connection.
+    """
+
+    def __init__(self, connect, max_size=4, acquire_timeout=10.0, health_check_interval=30.0):
+        self._connect = connect
+        self.max_size = max_size
+        self.acquire_timeout = acquire_timeout
+        self.health_check_interval = health_check_interval
+
+        self._cond = threading.Condition()
+        self._idle = []  # [(client, last_checked)]
+        self._size = 0
+        self._closed = False
+        self._stats = {
+            "in_use": 0,
+            "acquired": 0,
+            "waits": 0,
+            "wait_seconds": 0.0,
+            "created": 0,
+            "reconnects": 0,
+            "health_check_failures": 0,
+        }
+
+    @contextmanager
+    def connection(self):
+        """Check a client out of the pool for the duration of the block."""
+        client = self._acquire()
+        broken = False
+        try:
+            yield client
+        except CONNECTION_ERRORS:
+            broken = True
+            raise
+        finally:
+            self._release(client, broken)
+
+    def _acquire(self):
+        deadline = time.monotonic() + self.acquire_timeout
+        client, last_checked = None, None
+
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise RuntimeError("Weaviate client pool is closed.")
+                if self._idle:
+                    client, last_checked = self._idle.pop()
+                    break
+                if self._size < self.max_size:
+                    self._size += 1
+                    break
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError(f"Timed out waiting for a Weaviate client ({self.max_size} in use).")
+                self._stats["waits"] += 1
+                wait_start = time.monotonic()
+                self._cond.wait(remaining)
+                self._stats["wait_seconds"] += time.monotonic() - wait_start
+
+            self._stats["in_use"] += 1
+            self._stats["acquired"] += 1
+
+        try:
+            if client is None:
+                client = self._new_client()
+            elif not self._is_healthy(client, last_checked):
+                with self._cond:
+                    self._stats["health_check_failures"] += 1
+                    self._stats["reconnects"] += 1
+                self._safe_close(client)
+                client = self._new_client()
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._stats["in_use"] -= 1
+                self._cond.notify()
+            raise
+        return client
+
+    def _release(self, client, broken=False):
+        with self._cond:
+            self._stats["in_use"] -= 1
+            if broken or self._closed:
+                self._size -= 1
+                if broken:
+                    self._stats["reconnects"] += 1
+                self._safe_close(client)
+            else:
+                self._idle.append((client, time.monotonic()))
+            self._cond.notify()
+
+    def _new_client(self):
+        client = self._connect()
+        with self._cond:
+            self._stats["created"] += 1
+        return client
+
+    def _is_healthy(self, client, last_checked):
+        if not client.is_connected():
+            return False
+        if time.monotonic() - last_checked < self.health_check_interval:
+            return True
+        try:
+            return client.is_ready()
+        except Exception:
+            return False
+
+    @staticmethod
+    def _safe_close(client):
+        try:
+            client.close()
+        except Exception as e:
+            print(f"Error closing Weaviate client: {e}")
+
+    def metrics(self):
+        with self._cond:
+            return {
+                **self._stats,
+                "size": self._size,
+                "idle": len(self._idle),
+                "max_size": self.max_size,
+            }
+
+    def close(self):
+        """Close all idle clients; clients still checked out are closed on release."""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._size -= len(idle)
+            self._cond.notify_all()
+        for client, _ in idle:
+            self._safe_close(client)
@@ -0,0 +1,67 @@
+import threading
+import time
+
+
+def normalize_name(name):
+    """Weaviate capitalizes the first letter of collection names, so `list_all` reports "Example_en"."""
+    return name[:1].upper() + name[1:]
+
+
+def is_not_found(error):
+    """True for Weaviate errors caused by a collection that no longer exists."""
+    if getattr(error, "status_code", None) == 404:
+        return True
+    message = str(error).lower()
+    return "could not find class" in message or "class not found" in message or "no such class" in message
+
+
+class CollectionRegistry:
+    """
+    In-process set of existing collection names, shared by the sync and async clients.
+
+    It is loaded with one `list_all` call and reloaded after `ttl` seconds. Create
+    and delete update it directly, and callers `discard` a name when an operation
+    fails with a not-found error. A known name needs no round-trip; an unknown name
+    is still confirmed with `exists`, since another process may have created it.
+    Names are stored normalized, as Weaviate reports them.
+    """
+
+    def __init__(self, ttl=300):
+        self.ttl = ttl
+        self._names = set()
+        self._loaded_at = None
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "refreshes": 0, "invalidations": 0}
+
+    def needs_refresh(self):
+        return self._loaded_at is None or time.monotonic() - self._loaded_at >= self.ttl
+
+    def load(self, names):
+        with self._lock:
+            self._names = {normalize_name(name) for name in names}
+            self._loaded_at = time.monotonic()
+            self._stats["refreshes"] += 1
+
+    def contains(self, name):
+        with self._lock:
+            found = normalize_name(name) in self._names
+            self._stats["hits" if found else "misses"] += 1
+            return found
+
+    def names(self):
+        with self._lock:
+            return sorted(self._names)
+
+    def add(self, name):
+        with self._lock:
+            self._names.add(normalize_name(name))
+
+    def discard(self, name):
+        with self._lock:
+            self._names.discard(normalize_name(name))
+            self._stats["invalidations"] += 1
+
+    def metrics(self):
+        with self._lock:
+            return {**self._stats, "collections": len(self._names),
+                    "age_seconds": round(time.monotonic() - self._loaded_at, 1) if self._loaded_at else None}
@@ -0,0 +1,251 @@
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+
+class EmbeddingCache:
+    """
+    Disk-backed cache of embeddings keyed by the hash of (input_type, text).
+
+    Vectors live in a memory-mapped float32 matrix (`vectors.f32`) and a SQLite
+    index maps each hash to its row and last use. Once `max_entries` rows are in
+    use the least recently used rows are reused. Rows are allocated and written
+    under SQLite's write lock (BEGIN IMMEDIATE), so processes sharing the directory
+    never hand out the same row. The cache is tied to one model: opening it with a
+    different model name (or getting vectors of a different dimension) wipes it, so
+    a model upgrade never serves stale vectors.
+    """
+
+    def __init__(self, directory, model, max_entries=200_000, initial_rows=1024):
+        os.makedirs(directory, exist_ok=True)
+        self.model = model
+        self.max_entries = max_entries
+        self.initial_rows = initial_rows
+        self._path = os.path.join(directory, "vectors.f32")
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(os.path.join(directory, "index.sqlite"), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries (hash TEXT PRIMARY KEY, row INTEGER NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS entries_last_used ON entries(last_used)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS free_rows (row INTEGER PRIMARY KEY)")
+        self._stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0, "bytes_saved": 0}
+
+        meta = dict(self._conn.execute("SELECT key, value FROM meta").fetchall())
+        self.dim = int(meta["dim"]) if "dim" in meta else None
+        if meta.get("model") != model:
+            self._reset()
+        elif "next_row" not in meta:
+            # caches written before the counter existed
+            self._conn.execute(
+                "INSERT OR IGNORE INTO meta (key, value) SELECT 'next_row', COALESCE(MAX(row) + 1, 0) "
+                "FROM (SELECT row FROM entries UNION ALL SELECT row FROM free_rows)"
+            )
+            self._conn.commit()
+        self._matrix = None
+        if self.dim:
+            self._open(max(self.initial_rows, self._rows_on_disk()))
+
+    @staticmethod
+    def key(text, input_type=None):
+        return hashlib.sha256(f"{input_type or ''}\0{text}".encode("utf-8")).hexdigest()
+
+    def get_many(self, keys):
+        """Returns {key: vector} for the cached keys and marks them as recently used."""
+        if not keys or self._matrix is None:
+            self._stats["misses"] += len(keys)
+            return {}
+        found = {}
+        with self._lock:
+            for start in range(0, len(keys), 500):
+                batch = keys[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                found.update(self._conn.execute(
+                    f"SELECT hash, row FROM entries WHERE hash IN ({placeholders})", batch
+                ).fetchall())
+            if found:
+                now = time.time()
+                self._conn.executemany("UPDATE entries SET last_used = ? WHERE hash = ?",
+                                       [(now, key) for key in found])
+                self._conn.commit()
+                if max(found.values()) >= self._matrix.shape[0]:
+                    # another process grew the file past the rows this one mapped
+                    self._open(self._rows_on_disk())
+            vectors = {key: np.array(self._matrix[row]) for key, row in found.items()}
+        self._stats["hits"] += len(vectors)
+        self._stats["misses"] += len(keys) - len(vectors)
+        return vectors
+
+    def put_many(self, keys, vectors):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if not len(keys):
+            return
+        with self._lock:
+            if self.dim != vectors.shape[1]:
+                stored = self._conn.execute("SELECT value FROM meta WHERE key = 'dim'").fetchone()
+                if self.dim is None and stored and int(stored[0]) == vectors.shape[1]:
+                    # another process sharing the directory stored the first vectors
+                    self.dim = vectors.shape[1]
+                    self._open(max(self.initial_rows, self._rows_on_disk()))
+                else:
+                    if self.dim is not None:
+                        print(f"Embedding dimension changed from {self.dim} to {vectors.shape[1]}; clearing cache.")
+                    self._reset(dim=vectors.shape[1])
+                    self._open(self.initial_rows)
+            now = time.time()
+            protected = set(keys)
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = []
+                for key in keys:
+                    existing = self._conn.execute("SELECT row FROM entries WHERE hash = ?", (key,)).fetchone()
+                    row = existing[0] if existing else self._allocate_row(protected)
+                    self._conn.execute("INSERT OR REPLACE INTO entries (hash, row, last_used) VALUES (?, ?, ?)",
+                                       (key, row, now))
+                    rows.append(row)
+                self._ensure_capacity(max(rows) + 1)
+                for row, vector in zip(rows, vectors):
+                    self._matrix[row] = vector
+                self._matrix.flush()
+                self._conn.commit()
+            except BaseException:
+                self._conn.rollback()
+                raise
+        self._stats["stores"] += len(keys)
+
+    def record_saved(self, text_bytes):
+        """Counts request bytes that did not have to be sent because of cache hits."""
+        self._stats["bytes_saved"] += text_bytes
+
+    def _allocate_row(self, protected):
+        """
+        Picks a row inside put_many's transaction: a freed row, the next never-used
+        row (counted in meta, so no table scan), or an evicted one.
+        """
+        free = self._conn.execute("SELECT row FROM free_rows LIMIT 1").fetchone()
+        if free:
+            self._conn.execute("DELETE FROM free_rows WHERE row = ?", free)
+            return free[0]
+        counter = self._conn.execute("SELECT value FROM meta WHERE key = 'next_row'").fetchone()
+        next_row = int(counter[0]) if counter else 0
+        if next_row < self.max_entries:
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('next_row', ?)", (str(next_row + 1),))
+            return next_row
+        # full: reuse the least recently used rows, a batch at a time, never those being written now
+        batch = max(1, self.max_entries // 100)
+        victims = [
+            (key, row) for key, row in self._conn.execute(
+                "SELECT hash, row FROM entries ORDER BY last_used LIMIT ?", (batch + len(protected),)
+            ).fetchall()
+            if key not in protected
+        ][:batch]
+        self._conn.executemany("DELETE FROM entries WHERE hash = ?", [(key,) for key, _ in victims])
+        self._conn.executemany("INSERT INTO free_rows (row) VALUES (?)", [(row,) for _, row in victims])
+        self._stats["evictions"] += len(victims)
+        return self._allocate_row(protected)
+
+    def _rows_on_disk(self):
+        if not os.path.exists(self._path) or not self.dim:
+            return 0
+        return os.path.getsize(self._path) // (self.dim * 4)
+
+    def _open(self, rows):
+        rows = min(max(rows, 1), self.max_entries)
+        if self._rows_on_disk() < rows:
+            with open(self._path, "ab") as f:
+                f.truncate(rows * self.dim * 4)
+        self._matrix = np.memmap(self._path, dtype=np.float32, mode="r+", shape=(rows, self.dim))
+
+    def _ensure_capacity(self, rows):
+        if rows > self._matrix.shape[0]:
+            self._matrix.flush()
+            self._open(max(rows, self._matrix.shape[0] * 2))
+
+    def _reset(self, dim=None):
+        self._conn.execute("DELETE FROM entries")
+        self._conn.execute("DELETE FROM free_rows")
+        self._conn.execute("DELETE FROM meta")
+        self._conn.execute("INSERT INTO meta (key, value) VALUES ('model', ?)", (self.model,))
+        if dim:
+            self._conn.execute("INSERT INTO meta (key, value) VALUES ('dim', ?)", (str(dim),))
+        self._conn.commit()
+        self._matrix = None
+        if os.path.exists(self._path):
+            os.remove(self._path)
+        self.dim = dim
+
+    def metrics(self):
+        lookups = self._stats["hits"] + self._stats["misses"]
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        return {
+            **self._stats,
+            "hit_rate": self._stats["hits"] / lookups if lookups else 0.0,
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "model": self.model,
+            "dim": self.dim,
+        }
+
+    def close(self):
+        with self._lock:
+            if self._matrix is not None:
+                self._matrix.flush()
+                self._matrix = None
+            self._conn.close()
+
+
+class CachedEmbeddings:
+    """
+    Wraps an embedder (e.g. VoyageEmbeddings) with an EmbeddingCache; only texts
+    that are not cached are sent to the underlying embedder.
+    """
+
+    def __init__(self, embedder, cache):
+        self.embedder = embedder
+        self.cache = cache
+
+    def _split(self, texts, input_type):
+        keys = [self.cache.key(text, input_type) for text in texts]
+        cached = self.cache.get_many(list(dict.fromkeys(keys)))
+        missing = {}
+        for text, key in zip(texts, keys):
+            if key not in cached and key not in missing:
+                missing[key] = text
+        self.cache.record_saved(sum(len(t.encode("utf-8")) for t, k in zip(texts, keys) if k in cached))
+        return keys, cached, missing
+
+    def _merge(self, keys, cached, missing, vectors):
+        if missing:
+            self.cache.put_many(list(missing), vectors)
+            cached.update(zip(missing, np.asarray(vectors, dtype=np.float32)))
+        if not keys:
+            return np.empty((0, 0), dtype=np.float32)
+        return np.ascontiguousarray(np.stack([cached[key] for key in keys]), dtype=np.float32)
+
+    async def embed_text_async(self, texts, input_type=None):
+        # SQLite and memmap work runs in a thread so it does not stall the event loop
+        texts = list(texts)
+        keys, cached, missing = await asyncio.to_thread(self._split, texts, input_type)
+        vectors = await self.embedder.embed_text_async(list(missing.values()), input_type=input_type) if missing else None
+        return await asyncio.to_thread(self._merge, keys, cached, missing, vectors)
+
+    def embed_text(self, texts, input_type=None):
+        texts = list(texts)
+        keys, cached, missing = self._split(texts, input_type)
+        vectors = self.embedder.embed_text(list(missing.values()), input_type=input_type) if missing else None
+        return self._merge(keys, cached, missing, vectors)
+
+    def metrics(self):
+        return {**self.embedder.metrics(), "cache": self.cache.metrics()}
+
+    async def close(self):
+        await self.embedder.close()
+        self.cache.close()
@@ -0,0 +1,547 @@
+import asyncio
+import bisect
+import json
+import math
+import os
+import re
+import shutil
+import threading
+import uuid
+from collections import Counter, namedtuple
+
+import numpy as np
+
+from database.backend import AsyncVectorBackend, VectorBackend
+from database.schema import chunk_properties, matches, product_properties
+from database.vector_database import format_hits, reciprocal_rank_fusion
+
+_Object = namedtuple("_Object", "uuid properties")
+_TOKEN = re.compile(r"\w+")
+_NAME = re.compile(r"[A-Za-z0-9_-]+")
+SEARCHABLE_PROPERTIES = ("title", "text", "name", "details_text")
+
+
+def _tokenize(text):
+    return _TOKEN.findall(text.lower())
+
+
+def _searchable_text(properties):
+    text = " ".join(str(properties.get(key) or "") for key in SEARCHABLE_PROPERTIES)
+    if "details_text" not in properties and properties.get("details"):
+        text += " " + str(properties["details"])  # products stored before details_text existed
+    return text
+
+
+def _normalize(scores):
+    """Min-max normalizes a {row: score} dict to [0, 1], as Weaviate's relative score fusion does."""
+    if not scores:
+        return {}
+    low, high = min(scores.values()), max(scores.values())
+    if high == low:
+        return {row: 1.0 for row in scores}
+    return {row: (score - low) / (high - low) for row, score in scores.items()}
+
+
+class _Collection:
+    """
+    One collection: properties, an optional dense matrix and a lazily built BM25 index.
+
+    On disk a snapshot (objects.json) names a vectors file and an append-only log of
+    upserts written since. Saving an upsert writes only the changed vector rows in
+    place and appends their properties to the log, so ingesting in batches costs
+    I/O proportional to each batch. Deletes, and a log that outgrows the snapshot,
+    rewrite everything into a new generation of files; the snapshot is replaced
+    last, so a crash leaves the previous generation readable.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.uuids = []
+        self.properties = []
+        self.vectors = None  # (n, dim) float32, rows aligned with uuids
+        self.dim = None
+        self._rows = {}
+        self._index = None
+        self._generation = 0
+        self._vectors_file = "vectors.f32"
+        self._log_file = None
+        self._log_records = 0
+        self._pending_log = []  # upserts not yet appended to the log
+        self._pending_vectors = {}  # row -> vector not yet written
+        self._rewrite = False
+        self._load()
+
+    def _file(self, name):
+        return os.path.join(self.directory, name)
+
+    def _load(self):
+        if not os.path.exists(self._file("objects.json")):
+            return
+        with open(self._file("objects.json"), encoding="utf-8") as f:
+            data = json.load(f)
+        self.uuids = data["uuids"]
+        self.properties = data["properties"]
+        self.dim = data.get("dim")
+        self._generation = data.get("generation", 0)
+        self._vectors_file = data.get("vectors", "vectors.f32")
+        self._log_file = data.get("log")
+        self._rows = {object_uuid: row for row, object_uuid in enumerate(self.uuids)}
+        if self._log_file and os.path.exists(self._file(self._log_file)):
+            with open(self._file(self._log_file), encoding="utf-8") as f:
+                for line in f:
+                    if not line.endswith("\n"):
+                        break  # torn last line of an interrupted append
+                    record = json.loads(line)
+                    self._log_records += 1
+                    if "dim" in record:
+                        self.dim = record["dim"]
+                    else:
+                        self._set_properties(record["uuid"], record["properties"])
+        if self.dim:
+            self.vectors = self._map()
+
+    def _set_properties(self, object_uuid, properties):
+        row = self._rows.get(object_uuid)
+        if row is None:
+            row = self._rows[object_uuid] = len(self.uuids)
+            self.uuids.append(object_uuid)
+            self.properties.append(properties)
+        else:
+            self.properties[row] = properties
+        return row
+
+    def save(self):
+        os.makedirs(self.directory, exist_ok=True)
+        if self._rewrite or self._log_file is None or self._log_records + len(self._pending_log) > len(self.uuids):
+            self._compact()
+            return
+        if self.dim:
+            # vectors first: a log record must never point at a row that is not on disk
+            mode = "r+b" if os.path.exists(self._file(self._vectors_file)) else "wb"
+            with open(self._file(self._vectors_file), mode) as f:
+                for row, vector in sorted(self._pending_vectors.items()):
+                    f.seek(row * self.dim * 4)
+                    f.write(np.asarray(vector, dtype=np.float32).tobytes())
+                if f.seek(0, os.SEEK_END) < len(self.uuids) * self.dim * 4:
+                    f.truncate(len(self.uuids) * self.dim * 4)  # rows without a vector stay zero
+        with open(self._file(self._log_file), "a", encoding="utf-8") as f:
+            f.writelines(json.dumps(record, ensure_ascii=False) + "\n" for record in self._pending_log)
+        self._log_records += len(self._pending_log)
+        self._pending_log, self._pending_vectors = [], {}
+        if self.dim:
+            self.vectors = self._map()
+
+    def _compact(self):
+        """Writes the whole collection as a new generation of snapshot, vectors and log."""
+        old_files = {self._vectors_file, self._log_file} - {None}
+        self._generation += 1
+        vectors_file = f"vectors.{self._generation}.f32"
+        log_file = f"objects.{self._generation}.log"
+        if self.dim:
+            matrix = np.zeros((len(self.uuids), self.dim), dtype=np.float32)
+            if self.vectors is not None:
+                matrix[:len(self.vectors)] = self.vectors[:len(self.uuids)]
+            for row, vector in self._pending_vectors.items():
+                matrix[row] = vector
+            matrix.tofile(self._file(vectors_file))
+        open(self._file(log_file), "w").close()
+        tmp = self._file("objects.json.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"uuids": self.uuids, "properties": self.properties, "dim": self.dim,
+                       "generation": self._generation, "vectors": vectors_file, "log": log_file},
+                      f, ensure_ascii=False)
+        os.replace(tmp, self._file("objects.json"))
+        for name in old_files - {vectors_file, log_file}:
+            if os.path.exists(self._file(name)):
+                os.remove(self._file(name))
+        self._vectors_file, self._log_file, self._log_records = vectors_file, log_file, 0
+        self._pending_log, self._pending_vectors, self._rewrite = [], {}, False
+        if self.dim:
+            self.vectors = self._map()
+
+    def _map(self):
+        """Memory-maps the saved vectors; an empty file cannot be mapped, so no rows stay in memory."""
+        if not self.uuids:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        return np.memmap(self._file(self._vectors_file), dtype=np.float32,
+                         mode="r", shape=(len(self.uuids), self.dim))
+
+    def upsert(self, objects):
+        """`objects` is a list of (uuid, properties, vector or None); `save` writes them."""
+        for object_uuid, properties, vector in objects:
+            object_uuid = str(object_uuid or uuid.uuid4())
+            row = self._set_properties(object_uuid, properties)
+            self._pending_log.append({"uuid": object_uuid, "properties": properties})
+            if vector is not None:
+                if self.dim is None:
+                    self.dim = len(vector)
+                    self._pending_log.insert(0, {"dim": self.dim})
+                self._pending_vectors[row] = vector
+        self._index = None
+
+    def delete(self, uuids):
+        doomed = {self._rows[str(object_uuid)] for object_uuid in uuids if str(object_uuid) in self._rows}
+        if not doomed:
+            return 0
+        keep = [row for row in range(len(self.uuids)) if row not in doomed]
+        self.uuids = [self.uuids[row] for row in keep]
+        self.properties = [self.properties[row] for row in keep]
+        if self.vectors is not None:
+            self.vectors = np.array(self.vectors[keep], dtype=np.float32)
+        self._rewrite = True
+        self._rows = {object_uuid: row for row, object_uuid in enumerate(self.uuids)}
+        self._index = None
+        return len(doomed)
+
+    def get(self, object_uuid):
+        row = self._rows.get(str(object_uuid))
+        return None if row is None else self.properties[row]
+
+    def _bm25_index(self):
+        if self._index is None:
+            postings = {}
+            lengths = []
+            for row, properties in enumerate(self.properties):
+                tokens = _tokenize(_searchable_text(properties))
+                lengths.append(len(tokens))
+                for term, tf in Counter(tokens).items():
+                    postings.setdefault(term, []).append((row, tf))
+            self._index = (postings, lengths, (sum(lengths) / len(lengths)) if lengths else 0.0)
+        return self._index
+
+    def bm25(self, query, k1=1.2, b=0.75, rows=None):
+        """BM25 scores by row, only for `rows` (a set) if given; idf stays collection-wide."""
+        postings, lengths, avg_length = self._bm25_index()
+        scores = {}
+        n = len(lengths)
+        for term in set(_tokenize(query)):
+            postings_list = postings.get(term)
+            if not postings_list:
+                continue
+            idf = math.log(1 + (n - len(postings_list) + 0.5) / (len(postings_list) + 0.5))
+            for row, tf in postings_list:
+                if rows is not None and row not in rows:
+                    continue
+                norm = k1 * (1 - b + b * lengths[row] / avg_length) if avg_length else k1
+                scores[row] = scores.get(row, 0.0) + idf * tf * (k1 + 1) / (tf + norm)
+        return scores
+
+    def dense(self, vector, rows=None):
+        """Cosine similarities by row, only for `rows` if given."""
+        if vector is None or self.vectors is None or not len(self.uuids):
+            return {}
+        query = np.asarray(vector, dtype=np.float32)
+        if rows is None:
+            rows = range(len(self.uuids))
+            matrix = self.vectors
+        else:
+            rows = sorted(rows)
+            matrix = self.vectors[rows]
+        norms = np.linalg.norm(matrix, axis=1) * (np.linalg.norm(query) or 1.0)
+        similarities = (matrix @ query) / np.where(norms == 0, 1.0, norms)
+        return dict(zip(rows, similarities.tolist()))
+
+    def hybrid(self, query, vector, limit, alpha=0.7, candidates=100, filters=None):
+        """
+        Relative score fusion like `collection.query.hybrid(alpha=...)`: the top
+        candidates of each search are min-max normalized and combined as
+        alpha * vector + (1 - alpha) * bm25. Without a query vector it is pure BM25.
+        With `filters`, both searches only score the objects that pass them.
+        """
+        candidates = max(candidates, limit)
+        rows = None
+        if filters:
+            rows = {row for row, properties in enumerate(self.properties) if matches(properties, filters)}
+            if not rows:
+                return []
+        keyword = dict(sorted(self.bm25(query, rows=rows).items(), key=lambda item: item[1], reverse=True)[:candidates])
+        dense = dict(sorted(self.dense(vector, rows).items(), key=lambda item: item[1], reverse=True)[:candidates])
+        if not dense:
+            alpha = 0.0
+        keyword, dense = _normalize(keyword), _normalize(dense)
+        fused = {row: alpha * dense.get(row, 0.0) + (1 - alpha) * keyword.get(row, 0.0)
+                 for row in keyword.keys() | dense.keys()}
+        ranked = sorted(fused, key=lambda row: fused[row], reverse=True)[:limit]
+        return [_Object(self.uuids[row], self.properties[row]) for row in ranked]
+
+
+class LocalVectorStore:
+    """
+    In-process store of `{project_id}_{lang}` collections under `directory`, one
+    sub-directory per collection with its properties (objects.json) and dense
+    vectors (vectors.f32, memory-mapped on load). Writes are saved immediately.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._collections = {}
+        self.lock = threading.RLock()
+        self._stats = {"queries": 0, "inserts": 0, "deletes": 0}
+
+    def _path(self, name):
+        """Directory of a collection; names come from requests, so anything but a plain name is refused."""
+        if not isinstance(name, str) or not _NAME.fullmatch(name):
+            raise ValueError(f"Invalid collection name: {name!r}")
+        return os.path.join(self.directory, name)
+
+    def exists(self, name):
+        with self.lock:
+            return os.path.isdir(self._path(name)) or name in self._collections
+
+    def collection(self, name, create=False):
+        with self.lock:
+            path = self._path(name)
+            collection = self._collections.get(name)
+            if collection is None and (create or os.path.isdir(path)):
+                collection = self._collections[name] = _Collection(path)
+                if create:
+                    os.makedirs(path, exist_ok=True)
+            return collection
+
+    def names(self):
+        with self.lock:
+            return sorted(set(self._collections) | {
+                name for name in os.listdir(self.directory)
+                if _NAME.fullmatch(name) and os.path.isdir(self._path(name))
+            })
+
+    def upsert(self, name, objects):
+        with self.lock:
+            collection = self.collection(name, create=True)
+            collection.upsert(objects)
+            collection.save()
+            self._stats["inserts"] += len(objects)
+
+    def delete_objects(self, name, uuids):
+        with self.lock:
+            collection = self.collection(name)
+            if collection is None:
+                return 0
+            deleted = collection.delete(uuids)
+            if deleted:
+                collection.save()
+            self._stats["deletes"] += deleted
+            return deleted
+
+    def drop(self, name):
+        with self.lock:
+            path = self._path(name)
+            self._collections.pop(name, None)
+            if os.path.isdir(path):
+                shutil.rmtree(path)
+                return True
+            return False
+
+    def hybrid(self, name, query, vector, limit, alpha=0.7, filters=None):
+        with self.lock:
+            collection = self.collection(name)
+            self._stats["queries"] += 1
+            return collection.hybrid(query, vector, limit, alpha, filters=filters) if collection else []
+
+    def metrics(self):
+        with self.lock:
+            return {"backend": "local", "directory": self.directory, "collections": len(self._collections),
+                    "objects": sum(len(c.uuids) for c in self._collections.values()), **self._stats}
+
+
+class LocalVectorDatabase(VectorBackend):
+    """WeaviateDatabase replacement backed by a LocalVectorStore; for dev, CI and small tenants."""
+
+    def __init__(self, store, vectorizer=None):
+        self.store = store
+        self.vectorizer = vectorizer
+
+    def _vectors(self, objects):
+        if self.vectorizer is None:
+            return [None] * len(objects)
+        return self.vectorizer.embed_documents_sync([self.vectorizer.document_text(p) for p in objects])
+
+    def _query_vectors(self, queries):
+        if self.vectorizer is None:
+            return [None] * len(queries)
+        return self.vectorizer.embed_queries_sync(queries)
+
+    def add_product(self, project_id: str, details: dict):
+        if not self.store.exists(project_id):
+            print(f"Collection '{project_id}' does not exist.")
+            return False
+        properties = product_properties(details)
+        self.store.upsert(project_id, [(details["id"], properties, self._vectors([properties])[0])])
+        print(f"Product added to collection '{project_id}'.")
+        return True
+
+    def get_product(self, project_id: str, product_id: str):
+        collection = self.store.collection(project_id)
+        if collection is None:
+            print(f"Collection '{project_id}' does not exist.")
+            return None
+        product = collection.get(product_id)
+        if product is None:
+            print(f"Product with ID '{product_id}' not found in collection '{project_id}'.")
+        return product
+
+    def get_all_product(self, project_id: str):
+        collection = self.store.collection(project_id)
+        if collection is None:
+            print(f"Collection '{project_id}' does not exist.")
+            return None
+        return list(collection.properties)
+
+    def list_products(self, project_id: str, after: str = None, limit: int = 100, fields: list = None):
+        collection = self.store.collection(project_id)
+        if collection is None:
+            print(f"Collection '{project_id}' does not exist.")
+            return [], None
+        with self.store.lock:
+            uuids = sorted(collection.uuids)
+            start = bisect.bisect_right(uuids, after) if after else 0
+            page = []
+            for object_uuid in uuids[start:start + limit]:
+                properties = collection.get(object_uuid)
+                if fields is not None:
+                    properties = {key: properties[key] for key in fields if key in properties}
+                page.append({"id": object_uuid, **properties})
+        next_cursor = page[-1]["id"] if len(page) == limit else None
+        return page, next_cursor
+
+    def update_product(self, project_id: str, details: dict):
+        collection = self.store.collection(project_id)
+        if collection is None or collection.get(details["id"]) is None:
+            print(f"Product with ID '{details['id']}' not found in collection '{project_id}'.")
+            return False
+        properties = product_properties(details)
+        self.store.upsert(project_id, [(details["id"], properties, self._vectors([properties])[0])])
+        print(f"Product with ID '{details['id']}' updated in collection '{project_id}'.")
+        return True
+
+    def delete_product(self, project_id: str, product_id: str):
+        if not self.store.delete_objects(project_id, [product_id]):
+            print(f"Product with ID '{product_id}' not found in collection '{project_id}'.")
+            return False
+        print(f"Product with ID '{product_id}' deleted from collection '{project_id}'.")
+        return True
+
+    def bulk_upsert_products(self, project_id: str, products: list, update: bool = False):
+        collection = self.store.collection(project_id)
+        if collection is None:
+            return {i: f"Collection '{project_id}' does not exist." for i in range(len(products))}
+        errors = {}
+        if update:
+            errors = {i: f"Product with ID '{p['id']}' not found." for i, p in enumerate(products)
+                      if collection.get(p["id"]) is None}
+        positions = [i for i in range(len(products)) if i not in errors]
+        properties = [product_properties(products[i]) for i in positions]
+        self.store.upsert(project_id, [
+            (products[i]["id"], props, vector)
+            for i, props, vector in zip(positions, properties, self._vectors(properties))
+        ])
+        return errors
+
+    def bulk_delete_products(self, project_id: str, product_ids: list):
+        collection = self.store.collection(project_id)
+        if collection is None:
+            return {i: f"Collection '{project_id}' does not exist." for i in range(len(product_ids))}
+        errors = {i: f"Product with ID '{product_id}' not found." for i, product_id in enumerate(product_ids)
+                  if collection.get(product_id) is None}
+        self.store.delete_objects(project_id, product_ids)
+        return errors
+
+    def delete_project(self, project_id: str, language: str = None):
+        if language:
+            return self.store.drop(f"{project_id}_{language}")
+        prefix = f"{project_id}_"
+        deleted = False
+        for name in self.store.names():
+            # the language suffix has no "_", so project "a" does not match "a_b_en"
+            if name.startswith(prefix) and "_" not in name[len(prefix):]:
+                deleted = self.store.drop(name) or deleted
+        return deleted
+
+    def delete_all_collections(self):
+        for name in self.store.names():
+            self.store.drop(name)
+
+    def hybrid_query(self, query: str, project_id, limit=3, filters=None):
+        if isinstance(query, list):
+            query = ' '.join(query)
+        vector = self._query_vectors([query])[0]
+        return format_hits(self.store.hybrid(project_id, query, vector, limit, filters=filters))
+
+    def pool_metrics(self):
+        return self.store.metrics()
+
+    def close(self):
+        pass
+
+
+class AsyncLocalVectorDatabase(AsyncVectorBackend):
+    """
+    Async facade over the same LocalVectorStore. Store calls run in a worker thread
+    (asyncio.to_thread): they do file I/O and take the store lock, which a
+    concurrent write may hold, so they must not run on the event loop.
+    """
+
+    def __init__(self, store, vectorizer=None):
+        self.store = store
+        self.vectorizer = vectorizer
+
+    async def ensure_collection(self, project_id):
+        def ensure():
+            with self.store.lock:
+                created = not self.store.exists(project_id)
+                self.store.collection(project_id, create=True)
+                return created
+
+        return await asyncio.to_thread(ensure)
+
+    async def insert_chunks(self, project_id, chunks):
+        vectors = [None] * len(chunks)
+        if self.vectorizer is not None:
+            vectors = await self.vectorizer.embed_documents([self.vectorizer.document_text(c) for c in chunks])
+        await asyncio.to_thread(self.store.upsert, project_id, [
+            (chunk.get("uuid"), chunk_properties(chunk), vector)
+            for chunk, vector in zip(chunks, vectors)
+        ])
+        return []
+
+    async def delete_chunks(self, project_id, uuids):
+        return await asyncio.to_thread(self.store.delete_objects, project_id, uuids)
+
+    async def _query_vectors(self, queries):
+        if self.vectorizer is None:
+            return [None] * len(queries)
+        return await self.vectorizer.embed_queries(queries)
+
+    async def hybrid_query(self, query: str, project_id, limit=3, filters=None):
+        if isinstance(query, list):
+            query = ' '.join(query)
+        vector = (await self._query_vectors([query]))[0]
+        return format_hits(await asyncio.to_thread(self.store.hybrid, project_id, query, vector, limit,
+                                                   filters=filters))
+
+    async def multi_hybrid_query(self, queries, project_id, limit=5, per_query_limit=3,
+                                 concurrency=4, timeout=None, filters=None):
+        if not await asyncio.to_thread(self.store.exists, project_id):
+            print(f"Collection '{project_id}' not found.")
+            return [], []
+        try:
+            vectors = await self._query_vectors(queries)
+        except Exception as e:
+            print(f"Error embedding queries, falling back to keyword search: {e}")
+            vectors = [None] * len(queries)
+
+        def search():
+            return [
+                format_hits(self.store.hybrid(project_id, query, vector, per_query_limit, filters=filters))
+                for query, vector in zip(queries, vectors)
+            ]
+
+        result_lists = await asyncio.to_thread(search)
+        return reciprocal_rank_fusion(queries, result_lists, limit=limit)
+
+    def metrics(self):
+        return self.store.metrics()
+
+    async def close(self):
+        pass
@@ -0,0 +1,100 @@
+"""
+Copies per-project collections (`{project_id}_{lang}`) into the multi-tenant layout:
+one shared `{TENANT_COLLECTION_PREFIX}_{lang}` collection per language, one tenant
+per project.
+
+    python -m database.migrate_tenants [--projects a,b] [--dry-run] [--delete-source]
+
+Objects keep their uuids, properties and vectors, so nothing is re-embedded and the
+chunk manifest stays valid. A source collection is only deleted with
+--delete-source, and only once its tenant holds as many objects as it does. Run it
+before switching the app to STORAGE_LAYOUT=tenants; re-running it is safe.
+"""
+import argparse
+
+from weaviate.classes.tenants import Tenant
+
+import settings
+from database.collection_registry import normalize_name
+from database.tenancy import TenantLayout
+from database.vector_database import collection_config, get_shared_pool
+
+
+def source_collections(client, layout, projects=None):
+    """Names of the per-project collections, optionally limited to `projects`."""
+    wanted = {normalize_name(project) for project in projects} if projects else None
+    names = []
+    for name in sorted(client.collections.list_all(simple=True)):
+        if layout.is_shared(name) or "_" not in name:
+            continue
+        if wanted is None or layout.split(name)[1] in wanted:
+            names.append(name)
+    return names
+
+
+def migrate_collection(client, layout, name, client_vectors=False, delete_source=False):
+    """Copies one collection into its tenant; returns {"copied", "failed", "source", "target", "deleted"}."""
+    shared, tenant = layout.split(name)
+    if not client.collections.exists(shared):
+        client.collections.create(shared, **collection_config(client_vectors, multi_tenant=True))
+        print(f"Collection '{shared}' created.")
+    tenants = client.collections.get(shared).tenants
+    if not tenants.exists(tenant):
+        tenants.create([Tenant(name=tenant)])
+
+    source = client.collections.get(name)
+    target = client.collections.get(shared).with_tenant(tenant)
+    copied = 0
+    with target.batch.dynamic() as batch:
+        for obj in source.iterator(include_vector=True):
+            batch.add_object(properties=obj.properties, uuid=obj.uuid, vector=obj.vector or None)
+            copied += 1
+    failed = len(target.batch.failed_objects)
+    for failed_object in target.batch.failed_objects[:5]:
+        print(f"  failed {failed_object.object_.uuid}: {failed_object.message}")
+
+    source_count = source.aggregate.over_all(total_count=True).total_count
+    target_count = target.aggregate.over_all(total_count=True).total_count
+    deleted = False
+    if delete_source and not failed and target_count >= source_count:
+        client.collections.delete(name)
+        deleted = True
+    return {"copied": copied, "failed": failed, "source": source_count, "target": target_count, "deleted": deleted}
+
+
+def migrate(projects=None, dry_run=False, delete_source=False, prefix=settings.TENANT_COLLECTION_PREFIX):
+    layout = TenantLayout(prefix)
+    client_vectors = settings.VECTORIZE_MODE == "client"
+    pool = get_shared_pool()
+    results = {}
+    try:
+        with pool.connection() as client:
+            for name in source_collections(client, layout, projects):
+                shared, tenant = layout.split(name)
+                if dry_run:
+                    count = client.collections.get(name).aggregate.over_all(total_count=True).total_count
+                    print(f"{name} -> {shared}/{tenant} ({count} objects)")
+                    continue
+                try:
+                    results[name] = migrate_collection(client, layout, name, client_vectors, delete_source)
+                    print(f"{name} -> {shared}/{tenant}: {results[name]}")
+                except Exception as e:
+                    results[name] = {"error": str(e)}
+                    print(f"{name} -> {shared}/{tenant} failed: {e}")
+    finally:
+        pool.close()
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Move per-project collections into per-language tenants.")
+    parser.add_argument("--projects", help="comma-separated project ids to migrate (default: all)")
+    parser.add_argument("--dry-run", action="store_true", help="only list what would be migrated")
+    parser.add_argument("--delete-source", action="store_true",
+                        help="delete each source collection after a complete copy")
+    args = parser.parse_args()
+    migrate(
+        projects=[p.strip() for p in args.projects.split(",") if p.strip()] if args.projects else None,
+        dry_run=args.dry_run,
+        delete_source=args.delete_source,
+    )
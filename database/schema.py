@@ -0,0 +1,107 @@
+import re
+from datetime import datetime, timezone
+
+CHUNK = "chunk"
+PRODUCT = "product"
+
+_PRICE = re.compile(r"\d+(?:[.,]\d+)*")
+_MARK = re.compile(r"[.,]")
+
+
+def now():
+    return datetime.now(timezone.utc).isoformat()
+
+
+def parse_time(value):
+    """datetime for an ISO-8601 string or datetime; naive values are taken as UTC."""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def _parse_number(token):
+    """
+    Float for digits grouped by "." and ",". A mark that repeats ("1.000.000") or
+    appears once before exactly three digits ("1,500") separates thousands; otherwise
+    the last mark is the decimal point ("1,5", "12.50", "1.234,56").
+    """
+    marks = _MARK.findall(token)
+    if not marks:
+        return float(token)
+    decimal = marks[-1]
+    integer, fraction = token.rsplit(decimal, 1)
+    if marks.count(decimal) > 1 or (len(set(marks)) == 1 and len(fraction) == 3 and integer != "0"):
+        return float(_MARK.sub("", token))
+    return float(f"{_MARK.sub('', integer)}.{fraction}")
+
+
+def parse_price(value):
+    """Numeric price from a number or a string such as "1 000 000 sum" or "1.000.000 so'm"; None if there is none."""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    if isinstance(value, str):
+        match = _PRICE.search(re.sub(r"(?<=\d)[\s'](?=\d)", "", value))
+        if match:
+            return _parse_number(match.group())
+    return None
+
+
+def details_text(details):
+    """Flattens product details into "key: value" lines, the text that is vectorized and keyword-searched."""
+    if isinstance(details, dict):
+        return "\n".join(f"{key}: {details_text(value)}" for key, value in details.items() if value not in (None, ""))
+    if isinstance(details, (list, tuple)):
+        return ", ".join(details_text(value) for value in details)
+    return "" if details is None else str(details)
+
+
+def chunk_properties(chunk):
+    return {"kind": CHUNK, "title": chunk["title"], "text": chunk["text"], "number": chunk["number"],
+            "updated_at": now()}
+
+
+def product_properties(product):
+    """
+    Typed properties of a product. `details` is stored as given; its flattened text
+    is what gets vectorized. `tags` and `price` are taken from the product or, for
+    price, from its details, so they can be filtered on.
+    """
+    details = product["details"]
+    properties = {"kind": PRODUCT, "name": product["name"], "details": details,
+                  "details_text": details_text(details), "updated_at": now()}
+    if product.get("tags"):
+        properties["tags"] = [str(tag) for tag in product["tags"]]
+    price = product.get("price")
+    if price is None and isinstance(details, dict):
+        price = details.get("price")
+    price = parse_price(price)
+    if price is not None:
+        properties["price"] = price
+    return properties
+
+
+def kind_of(properties):
+    """The object's kind; objects stored before `kind` existed are told apart by their fields."""
+    return properties.get("kind") or (PRODUCT if properties.get("name") else CHUNK)
+
+
+def matches(properties, filters):
+    """
+    True if an object's properties pass a retrieval filter dict with any of `kind`,
+    `tags` (any of), `price_min`, `price_max` and `updated_after`. Weaviate gets the
+    same filter through `vector_database.build_filter`.
+    """
+    if filters.get("kind") and kind_of(properties) != filters["kind"]:
+        return False
+    if filters.get("tags") and not set(filters["tags"]) & set(properties.get("tags") or ()):
+        return False
+    price = properties.get("price")
+    if filters.get("price_min") is not None and (price is None or price < filters["price_min"]):
+        return False
+    if filters.get("price_max") is not None and (price is None or price > filters["price_max"]):
+        return False
+    if filters.get("updated_after"):
+        updated_at = properties.get("updated_at")
+        if not updated_at or parse_time(updated_at) < parse_time(filters["updated_after"]):
+            return False
+    return True
@@ -0,0 +1,70 @@
+import threading
+import time
+
+from database.collection_registry import normalize_name
+
+
+class TenantLayout:
+    """
+    Maps the `{project_id}_{lang}` names used throughout the app onto Weaviate
+    multi-tenancy: one shared `{prefix}_{lang}` collection per language with one
+    tenant per project, so the schema grows with languages instead of projects.
+
+    It also records when each tenant was last used, so tenants this process has
+    used and that have since been idle for a while can be deactivated or offloaded
+    (Weaviate reactivates them on the next access). Tenants the process never
+    touched are left alone: other processes may be serving them. The layout is
+    shared by the sync and async clients.
+    """
+
+    def __init__(self, prefix="Projects"):
+        self.prefix = normalize_name(prefix)
+        self._last_used = {}
+        self._inactive = set()
+        self._lock = threading.Lock()
+        self._stats = {"deactivated": 0, "reactivated": 0}
+
+    def split(self, name):
+        """(shared collection, tenant) for a `{project_id}_{lang}` name."""
+        project_id, lang = name.rsplit("_", 1)
+        return f"{self.prefix}_{lang}", normalize_name(project_id)
+
+    def is_shared(self, collection_name):
+        return collection_name.startswith(f"{self.prefix}_")
+
+    def name(self, collection_name, tenant):
+        """Inverse of `split`: the normalized `{project_id}_{lang}` name of a tenant."""
+        return f"{tenant}_{collection_name[len(self.prefix) + 1:]}"
+
+    def touch(self, name):
+        name = normalize_name(name)
+        with self._lock:
+            self._last_used[name] = time.monotonic()
+            if name in self._inactive:
+                self._inactive.discard(name)
+                self._stats["reactivated"] += 1
+
+    def idle(self, names, idle_seconds):
+        """Names this process has used, still active here, and unused for `idle_seconds`."""
+        now = time.monotonic()
+        with self._lock:
+            return [
+                name for name in names
+                if name in self._last_used and name not in self._inactive
+                and now - self._last_used[name] >= idle_seconds
+            ]
+
+    def mark_inactive(self, names):
+        with self._lock:
+            self._inactive.update(names)
+            self._stats["deactivated"] += len(names)
+
+    def forget(self, name):
+        name = normalize_name(name)
+        with self._lock:
+            self._last_used.pop(name, None)
+            self._inactive.discard(name)
+
+    def metrics(self):
+        with self._lock:
+            return {**self._stats, "tracked": len(self._last_used), "inactive": len(self._inactive)}
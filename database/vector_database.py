@@ -1,243 +1,554 @@
+import threading
+import uuid
+
 import weaviate
-from weaviate.classes.config import Configure
+from weaviate.classes.config import Configure, DataType, Property, Tokenization
+from weaviate.classes.query import Filter
 import api_keys
+import settings
+from database.backend import VectorBackend
+from database.client_pool import WeaviateClientPool
+from database.collection_registry import CollectionRegistry, is_not_found, normalize_name
+from database.schema import PRODUCT, kind_of, parse_time, product_properties
+from database.tenancy import TenantLayout
 
-class WeaviateDatabase:
-    def __init__(self):
-        self.headers = {"X-VoyageAI-Api-Key": api_keys.VOYAGE_API_KEY}
+_shared_pools = {}
+_shared_pools_lock = threading.Lock()
 
-    def _create_client(self):
-        return weaviate.connect_to_local(host="weaviate", port=8080, headers=self.headers)
 
-    def delete_all_collections(self):
-        with self._create_client() as client:
-            client.collections.delete_all()
+def get_shared_pool(host=settings.WEAVIATE_HOST, port=settings.WEAVIATE_PORT):
+    """Returns the process-wide client pool for a Weaviate endpoint, creating it on first use."""
+    with _shared_pools_lock:
+        pool = _shared_pools.get((host, port))
+        if pool is None:
+            headers = {"X-VoyageAI-Api-Key": api_keys.VOYAGE_API_KEY}
+            pool = WeaviateClientPool(
+                connect=lambda: weaviate.connect_to_local(
+                    host=host, port=port, grpc_port=settings.WEAVIATE_GRPC_PORT, headers=headers
+                ),
+                max_size=settings.WEAVIATE_POOL_SIZE,
+                acquire_timeout=settings.WEAVIATE_POOL_TIMEOUT,
+                health_check_interval=settings.WEAVIATE_HEALTH_CHECK_INTERVAL,
+            )
+            _shared_pools[(host, port)] = pool
+        return pool
 
-    def initialize_and_insert_data(self, row_data, project_id: str):
-        
-        with self._create_client() as client:
-            for lang, chunks in row_data.items():
-                project_id_lang = f"{project_id}_{lang}"
-                self._ensure_collection_exists(client, project_id_lang)
 
-                collection = client.collections.get(project_id_lang)
+def collection_properties():
+    """
+    Typed schema for chunks (title, text, number) and products (name, details_text,
+    tags, price) in one collection, told apart by `kind`. Product `details` are left
+    to auto-schema since their shape varies by project.
+    """
+    return [
+        Property(name="kind", data_type=DataType.TEXT, tokenization=Tokenization.FIELD,
+                 index_searchable=False, skip_vectorization=True),
+        Property(name="title", data_type=DataType.TEXT),
+        Property(name="text", data_type=DataType.TEXT),
+        Property(name="number", data_type=DataType.INT, skip_vectorization=True),
+        Property(name="name", data_type=DataType.TEXT),
+        Property(name="details_text", data_type=DataType.TEXT),
+        Property(name="tags", data_type=DataType.TEXT_ARRAY, tokenization=Tokenization.FIELD,
+                 skip_vectorization=True),
+        Property(name="price", data_type=DataType.NUMBER, index_range_filters=True, skip_vectorization=True),
+        Property(name="updated_at", data_type=DataType.DATE, index_range_filters=True, skip_vectorization=True),
+    ]
 
-                with collection.batch.dynamic() as batch:
-                    for idx, chunk_data in enumerate(chunks.values()):
-                        batch.add_object(
-
-                            properties={
-                                "title": chunk_data["title"],
-                                "text": chunk_data["text"],
-                                "number": idx,
-                            }
-                        )
-
-                        if batch.number_errors > 10:
-                            print("Batch import stopped due to excessive errors.")
-                            break
-
-                print(f"Inserted data into collection '{project_id_lang}'.")
-
-                
-    def _ensure_collection_exists(self, client, project_id):
-        if not client.collections.exists(project_id):
-            client.collections.create(
-                project_id,
-                vectorizer_config=[
-                    Configure.NamedVectors.text2vec_voyageai(
-                        name="text_vector",
-                        source_properties=["text", "title"],
-                        model="voyage-3",
-                    ),
-                ]
-            )
-            print(f"Collection '{project_id}' created with VoyageAI vectorizer.")
+
+def collection_config(client_vectors=False, multi_tenant=False):
+    """
+    Keyword arguments shared by the sync and async clients when creating a collection.
+    With `client_vectors` the "text_vector" named vector has no vectorizer and is
+    supplied by the application on insert and query. `multi_tenant` creates a shared
+    per-language collection of the tenant layout; tenants are created explicitly and
+    reactivated automatically when an inactive one is accessed.
+    """
+    if client_vectors:
+        config = {"vectorizer_config": [Configure.NamedVectors.none(name="text_vector")]}
+    else:
+        config = {
+            "vectorizer_config": [
+                Configure.NamedVectors.text2vec_voyageai(
+                    name="text_vector",
+                    source_properties=["title", "text", "name", "details_text"],
+                    model="voyage-3",
+                ),
+            ]
+        }
+    config["properties"] = collection_properties()
+    if multi_tenant:
+        config["multi_tenancy_config"] = Configure.multi_tenancy(
+            enabled=True, auto_tenant_creation=False, auto_tenant_activation=True
+        )
+    return config
+
+
+def format_hits(objects):
+    """
+    Flattens Weaviate query objects into the dicts handed to the LLM: title and text
+    for chunks; name, details, tags and price for products.
+    """
+    hits = []
+    for obj in objects:
+        properties = obj.properties
+        kind = kind_of(properties)
+        if kind == PRODUCT:
+            hit = {'kind': kind, 'name': properties.get('name', ''), 'details': properties.get('details', '')}
+            for key in ('tags', 'price'):
+                if properties.get(key) is not None:
+                    hit[key] = properties[key]
         else:
-            print(f"Collection '{project_id}' already exists.")
-    
+            hit = {'kind': kind, 'title': properties.get('title', ''), 'text': properties.get('text', '')}
+        hit['id'] = obj.uuid
+        hits.append(hit)
+    return hits
+
+
+def build_filter(filters):
+    """
+    Weaviate filter for a retrieval filter dict (`kind`, `tags`, `price_min`,
+    `price_max`, `updated_after`; see database.schema.matches), or None.
+    """
+    if not filters:
+        return None
+    conditions = []
+    if filters.get("kind"):
+        conditions.append(Filter.by_property("kind").equal(filters["kind"]))
+    if filters.get("tags"):
+        conditions.append(Filter.by_property("tags").contains_any(list(filters["tags"])))
+    if filters.get("price_min") is not None:
+        conditions.append(Filter.by_property("price").greater_or_equal(float(filters["price_min"])))
+    if filters.get("price_max") is not None:
+        conditions.append(Filter.by_property("price").less_or_equal(float(filters["price_max"])))
+    if filters.get("updated_after"):
+        conditions.append(Filter.by_property("updated_at").greater_or_equal(parse_time(filters["updated_after"])))
+    if not conditions:
+        return None
+    return conditions[0] if len(conditions) == 1 else Filter.all_of(conditions)
+
+
+def kind_fallback(filters):
+    """
+    Splits `filters` for a collection created before the `kind` property existed,
+    which Weaviate cannot filter on: returns (filters without kind, kind), and the
+    kind is then checked on the hits with `keep_kind`.
+    """
+    return {**filters, "kind": None}, filters["kind"]
+
+
+def keep_kind(hits, kind, limit):
+    """The first `limit` formatted hits of `kind`, or all hits up to `limit` without one."""
+    return [hit for hit in hits if kind is None or hit["kind"] == kind][:limit]
+
+
+def invalid_ids(ids):
+    """{position: error} for ids that are not UUIDs; Weaviate would reject the whole batch or filter for them."""
+    errors = {}
+    for i, object_id in enumerate(ids):
+        try:
+            uuid.UUID(str(object_id))
+        except ValueError:
+            errors[i] = f"Invalid product ID '{object_id}': must be a UUID."
+    return errors
+
+
+def reciprocal_rank_fusion(queries, result_lists, limit=5, k=60):
+    """
+    Merges per-query hit lists with reciprocal-rank fusion, deduplicating by object id.
+
+    Each hit scores sum(1 / (k + rank)) over the lists it appears in. Returns the
+    top `limit` hits (each with an `rrf_score`) and per-query hit stats.
+    """
+    fused = {}
+    scores = {}
+    for hits in result_lists:
+        for rank, hit in enumerate(hits or [], start=1):
+            key = str(hit['id'])
+            fused.setdefault(key, hit)
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank)
+
+    ranked = sorted(fused, key=lambda key: scores[key], reverse=True)[:limit]
+    top = set(ranked)
+
+    stats = []
+    seen = set()
+    for query, hits in zip(queries, result_lists):
+        ids = [str(hit['id']) for hit in hits or []]
+        stats.append({
+            "query": query,
+            "hits": len(ids),
+            "new": len(set(ids) - seen),
+            "in_top_k": len(top.intersection(ids)),
+            "failed": hits is None,
+        })
+        seen.update(ids)
+
+    return [{**fused[key], 'rrf_score': scores[key]} for key in ranked], stats
+
+
+class WeaviateDatabase(VectorBackend):
+    def __init__(self, pool: WeaviateClientPool = None, vectorizer=None, registry: CollectionRegistry = None,
+                 layout: TenantLayout = None):
+        """
+        `vectorizer` (database.vectorizer.Vectorizer) switches to client-side embeddings;
+        `registry` caches which collections exist and may be shared with the async client.
+        With a `layout`, `{project_id}_{lang}` names address tenants of shared
+        per-language collections instead of collections of their own.
+        """
+        self.pool = pool or get_shared_pool()
+        self.vectorizer = vectorizer
+        self.registry = registry or CollectionRegistry(settings.COLLECTION_REGISTRY_TTL)
+        self.layout = layout
+        self._has_kind = {}  # collection -> whether its schema has `kind`
+
+    def _refresh_collections(self, client):
+        names = client.collections.list_all(simple=True).keys()
+        if self.layout is not None:
+            names = [
+                self.layout.name(shared, tenant)
+                for shared in names if self.layout.is_shared(shared)
+                for tenant in client.collections.get(shared).tenants.get()
+            ]
+        self.registry.load(names)
+
+    def _collection_exists(self, client, name):
+        """Existence check answered from the registry; only unknown names cost a round-trip."""
+        if self.registry.needs_refresh():
+            self._refresh_collections(client)
+        if self.registry.contains(name):
+            return True
+        if self._exists(client, name):
+            self.registry.add(name)
+            return True
+        return False
+
+    def _exists(self, client, name):
+        if self.layout is None:
+            return client.collections.exists(name)
+        shared, tenant = self.layout.split(name)
+        return client.collections.exists(shared) and client.collections.get(shared).tenants.exists(tenant)
+
+    def _collection(self, client, name):
+        """Handle for a `{project_id}_{lang}` name: its own collection, or its tenant of the shared one."""
+        if self.layout is None:
+            return client.collections.get(name)
+        shared, tenant = self.layout.split(name)
+        self.layout.touch(name)
+        return client.collections.get(shared).with_tenant(tenant)
+
+    def _query_filters(self, collection, name, filters):
+        """(filters for Weaviate, kind to check on the hits) for a query on `name`."""
+        if not (filters and filters.get("kind")):
+            return filters, None
+        key = normalize_name(self.layout.split(name)[0] if self.layout else name)
+        if key not in self._has_kind:
+            properties = collection.config.get(simple=True).properties
+            self._has_kind[key] = any(prop.name == "kind" for prop in properties)
+            if not self._has_kind[key]:
+                print(f"Collection '{key}' has no 'kind' property; filtering kind on the hits.")
+        return (filters, None) if self._has_kind[key] else kind_fallback(filters)
+
+    def _drop(self, client, name):
+        if self.layout is None:
+            client.collections.delete(name)
+        else:
+            shared, tenant = self.layout.split(name)
+            client.collections.get(shared).tenants.remove([tenant])
+            self.layout.forget(name)
+        self.registry.discard(name)
+
+    def _forget_if_missing(self, name, error):
+        if is_not_found(error):
+            self.registry.discard(name)
+
+    def _vectors(self, objects):
+        """Named vectors for a list of property dicts, or Nones when Weaviate vectorizes itself."""
+        if self.vectorizer is None:
+            return [None] * len(objects)
+        texts = [self.vectorizer.document_text(properties) for properties in objects]
+        return [self.vectorizer.named(vector) for vector in self.vectorizer.embed_documents_sync(texts)]
+
+    def _query_vectors(self, queries):
+        if self.vectorizer is None:
+            return [None] * len(queries)
+        return self.vectorizer.embed_queries_sync(queries)
+
+    def _connection(self):
+        return self.pool.connection()
+
+    def pool_metrics(self):
+        return self.pool.metrics()
+
+    def close(self):
+        self.pool.close()
+
+    def delete_all_collections(self):
+        with self._connection() as client:
+            client.collections.delete_all()
+            self.registry.load([])
+
     def delete_project(self, project_id: str, language: str = None):
-        
-        with self._create_client() as client:
-            collections = client.collections.list_all()
-            if not collections:
-                print("No collections found.")
-                return False
-            
+
+        with self._connection() as client:
             if language:
                 project_id = f"{project_id}_{language}"
-                if client.collections.exists(project_id):
-                    client.collections.delete(project_id)
+                if self._collection_exists(client, project_id):
+                    self._drop(client, project_id)
                     print(f"Collection '{project_id}' deleted.")
                     return True
                 print(f"Collection '{project_id}' does not exist.")
                 return False
             else:
+                # deleting by prefix must see collections created elsewhere, so reload first
+                self._refresh_collections(client)
+                prefix = normalize_name(f"{project_id}_")
                 deleted = False
-                for collection in collections:
-                    if collection.name.startswith(f"{project_id}_"):
-                        client.collections.delete(collection.name)
-                        print(f"Collection '{collection.name}' deleted.")
+                for name in self.registry.names():
+                    # the language suffix has no "_", so project "a" does not match "a_b_en"
+                    if name.startswith(prefix) and "_" not in name[len(prefix):]:
+                        self._drop(client, name)
+                        print(f"Collection '{name}' deleted.")
                         deleted = True
                 return deleted
-                
+
 
     def check_collection(self, project_id: str):
-        
-        with self._create_client() as client:
-            collections = client.collections.list_all()
-            if not collections:
-                print("No collections found.")
-                return False
-            for collection in collections:
-                if collection.name == project_id:
-                    print(f"Collection '{project_id}' exists.")
-                    return True
+
+        with self._connection() as client:
+            if self._collection_exists(client, project_id):
+                print(f"Collection '{project_id}' exists.")
+                return True
             print(f"Collection '{project_id}' does not exist.")
             return False
-    
+
 
     def add_product(self, project_id: str, details: dict):
         """Adds a product to the vector database."""
-        
-        with self._create_client() as client:
-            if not client.collections.exists(project_id):
-                print(f"Collection '{project_id}' does not exist.")
-                return False
+        try:
+            with self._connection() as client:
+                if not self._collection_exists(client, project_id):
+                    print(f"Collection '{project_id}' does not exist.")
+                    return False
 
-            try:
-                collection = client.collections.get(project_id)
+                collection = self._collection(client, project_id)
+                properties = product_properties(details)
                 with collection.batch.dynamic() as batch:
                     batch.add_object(
-                        properties={
-                            "name": details["name"],
-                            "details": details["details"]
-                        },
+                        properties=properties,
                         uuid=details["id"],
+                        vector=self._vectors([properties])[0],
                     )
                 print(f"Product added to collection '{project_id}'.")
                 return True
-            except Exception as e:
-                print(f"Error adding product: {e}")
-                return False
-            finally:
-                client.close()
-    
+        except Exception as e:
+            print(f"Error adding product: {e}")
+            self._forget_if_missing(project_id, e)
+            return False
+
     def get_product(self, project_id: str, product_id: str, ):
         """Retrieves a product from the vector database."""
-        
-        with self._create_client() as client:
-            if not client.collections.exists(project_id):
-                print(f"Collection '{project_id}' does not exist.")
-                return None
+        try:
+            with self._connection() as client:
+                if not self._collection_exists(client, project_id):
+                    print(f"Collection '{project_id}' does not exist.")
+                    return None
 
-            collection = client.collections.get(project_id)
-            try:
+                collection = self._collection(client, project_id)
                 response = collection.query.fetch_object_by_id(product_id)
                 if response:
                     return response.properties
                 else:
                     print(f"Product with ID '{product_id}' not found in collection '{project_id}'.")
                     return None
-            except Exception as e:
-                print(f"Error retrieving product: {e}")
-                return None
-            finally:
-                client.close()
+        except Exception as e:
+            print(f"Error retrieving product: {e}")
+            self._forget_if_missing(project_id, e)
+            return None
 
     def get_all_product(self, project_id: str):
         """Retrieves a product from the vector database."""
-        with self._create_client() as client:
-            if not client.collections.exists(project_id):
-                print(f"Collection '{project_id}' does not exist.")
-                return None
+        try:
+            with self._connection() as client:
+                if not self._collection_exists(client, project_id):
+                    print(f"Collection '{project_id}' does not exist.")
+                    return None
 
-            collection = client.collections.get(project_id)
-            try:
+                collection = self._collection(client, project_id)
                 all_products = []
                 for item in collection.iterator():
                     all_products.append(item.properties)
                 return all_products
-            except Exception as e:
-                print(f"Error retrieving products: {e}")
-                return None
-            finally:
-                client.close()
+        except Exception as e:
+            print(f"Error retrieving products: {e}")
+            self._forget_if_missing(project_id, e)
+            return None
 
-    
-    def update_product(self, project_id: str, details: dict):
-        """Updates a product in the vector database."""
 
-        with self._create_client() as client:
-            if not client.collections.exists(project_id):
+    def list_products(self, project_id: str, after: str = None, limit: int = 100, fields: list = None):
+        with self._connection() as client:
+            if not self._collection_exists(client, project_id):
                 print(f"Collection '{project_id}' does not exist.")
-                return False
+                return [], None
+
+            collection = self._collection(client, project_id)
+            response = collection.query.fetch_objects(
+                limit=limit,
+                after=after,
+                return_properties=fields,
+                include_vector=False,
+            )
+            page = [{"id": str(obj.uuid), **obj.properties} for obj in response.objects]
+            next_cursor = page[-1]["id"] if len(page) == limit else None
+            return page, next_cursor
+
+    def update_product(self, project_id: str, details: dict):
+        """Updates a product in the vector database."""
+        try:
+            with self._connection() as client:
+                if not self._collection_exists(client, project_id):
+                    print(f"Collection '{project_id}' does not exist.")
+                    return False
 
-            collection = client.collections.get(project_id)
-            try:
+                collection = self._collection(client, project_id)
+                properties = product_properties(details)
                 collection.data.update(
                     uuid=details['id'],
-                    properties={
-                        "name": details['name'],
-                        "details": details['details']
-                    },
+                    properties=properties,
+                    vector=self._vectors([properties])[0],
                 )
                 print(f"Product with ID '{details['id']}' updated in collection '{project_id}'.")
                 return True
-            except Exception as e:
-                print(f"Error updating product: {e}")
-                return False
-            finally:
-                client.close()
+        except Exception as e:
+            print(f"Error updating product: {e}")
+            self._forget_if_missing(project_id, e)
+            return False
+
+    def _existing_ids(self, collection, ids, chunk_size=1000):
+        existing = set()
+        for start in range(0, len(ids), chunk_size):
+            response = collection.query.fetch_objects(
+                filters=Filter.by_id().contains_any(ids[start:start + chunk_size]),
+                limit=chunk_size,
+                return_properties=[],
+            )
+            existing.update(str(obj.uuid) for obj in response.objects)
+        return existing
+
+    def bulk_upsert_products(self, project_id: str, products: list, update: bool = False):
+        """One batch session for all `products` of a collection; returns {position: error}."""
+        errors = {}
+        try:
+            with self._connection() as client:
+                if not self._collection_exists(client, project_id):
+                    return {i: f"Collection '{project_id}' does not exist." for i in range(len(products))}
+
+                collection = self._collection(client, project_id)
+                errors.update(invalid_ids([product["id"] for product in products]))
+                positions = [i for i in range(len(products)) if i not in errors]
+                if update:
+                    ids = {i: str(uuid.UUID(str(products[i]["id"]))) for i in positions}
+                    existing = self._existing_ids(collection, list(ids.values()))
+                    for i in positions:
+                        if ids[i] not in existing:
+                            errors[i] = f"Product with ID '{products[i]['id']}' not found."
+                    positions = [i for i in positions if i not in errors]
+
+                properties = [product_properties(products[i]) for i in positions]
+                by_uuid = {}
+                with collection.batch.dynamic() as batch:
+                    for i, props, vector in zip(positions, properties, self._vectors(properties)):
+                        try:
+                            object_uuid = batch.add_object(properties=props, uuid=products[i]["id"], vector=vector)
+                        except Exception as e:
+                            errors[i] = str(e)
+                            continue
+                        by_uuid[str(object_uuid)] = i
+                for failed in collection.batch.failed_objects:
+                    errors[by_uuid.get(str(failed.object_.uuid), -1)] = failed.message
+                errors.pop(-1, None)
+                print(f"Bulk wrote {len(positions) - len(errors)} product(s) to '{project_id}'.")
+                return errors
+        except Exception as e:
+            print(f"Error in bulk product write: {e}")
+            self._forget_if_missing(project_id, e)
+            # items rejected before the failure keep their own error
+            return {i: errors.get(i, str(e)) for i in range(len(products))}
+
+    def bulk_delete_products(self, project_id: str, product_ids: list, chunk_size=1000):
+        errors = {}
+        try:
+            with self._connection() as client:
+                if not self._collection_exists(client, project_id):
+                    return {i: f"Collection '{project_id}' does not exist." for i in range(len(product_ids))}
+
+                collection = self._collection(client, project_id)
+                errors.update(invalid_ids(product_ids))
+                valid = [str(uuid.UUID(str(product_id))) for i, product_id in enumerate(product_ids) if i not in errors]
+                status = {}
+                for start in range(0, len(valid), chunk_size):
+                    result = collection.data.delete_many(
+                        where=Filter.by_id().contains_any(valid[start:start + chunk_size]),
+                        verbose=True,
+                    )
+                    for obj in result.objects or []:
+                        status[str(obj.uuid)] = None if obj.successful else (obj.error or "delete failed")
+                for i, product_id in enumerate(product_ids):
+                    if i in errors:
+                        continue
+                    key = str(uuid.UUID(str(product_id)))
+                    if key not in status:
+                        errors[i] = f"Product with ID '{product_id}' not found."
+                    elif status[key]:
+                        errors[i] = status[key]
+                print(f"Bulk deleted {len(product_ids) - len(errors)} product(s) from '{project_id}'.")
+                return errors
+        except Exception as e:
+            print(f"Error in bulk product delete: {e}")
+            self._forget_if_missing(project_id, e)
+            return {i: errors.get(i, str(e)) for i in range(len(product_ids))}
 
     def delete_product(self, project_id: str, product_id: str):
         """Deletes a product from the vector database."""
-        
-        with self._create_client() as client:
-            if not client.collections.exists(project_id):
-                print(f"Collection '{project_id}' does not exist.")
-                return False
+        try:
+            with self._connection() as client:
+                if not self._collection_exists(client, project_id):
+                    print(f"Collection '{project_id}' does not exist.")
+                    return False
 
-            collection = client.collections.get(project_id)
-            try:
+                collection = self._collection(client, project_id)
                 collection.data.delete_by_id(product_id)
                 print(f"Product with ID '{product_id}' deleted from collection '{project_id}'.")
-            except Exception as e:
-                print(f"Error deleting product: {e}")
-                return False
-            finally:
-                client.close()
+        except Exception as e:
+            print(f"Error deleting product: {e}")
+            self._forget_if_missing(project_id, e)
+            return False
 
 
-    def hybrid_query(self, query: str, project_id, limit=3):
-        client = None
+    def hybrid_query(self, query: str, project_id, limit=3, filters=None):
+        """Hybrid search; `filters` (see build_filter) is applied by Weaviate before ranking."""
         try:
-            client = self._create_client()
-            if not client.collections.exists(project_id):
-                print(f"Collection '{project_id}' not found.")
-                return []
+            with self._connection() as client:
+                if not self._collection_exists(client, project_id):
+                    print(f"Collection '{project_id}' not found.")
+                    return []
 
-            collection = client.collections.get(project_id)
-            if isinstance(query, list): 
-                query = ' '.join(query)
+                collection = self._collection(client, project_id)
+                if isinstance(query, list):
+                    query = ' '.join(query)
 
-            response = collection.query.hybrid(
-                query=query,
-                limit=limit,
-                alpha=0.7,
-            )
-            return [{
-                'text': obj.properties.get('text', ''),
-                'title': obj.properties.get('title', ''),
-                'name': obj.properties.get('name', ''),
-                'details': obj.properties.get('details', ''),
-                'id': obj.uuid,
-            } for obj in response.objects]
+                filters, kind = self._query_filters(collection, project_id, filters)
+                response = collection.query.hybrid(
+                    query=query,
+                    vector=self._query_vectors([query])[0],
+                    # over-fetch when the kind is checked here rather than by Weaviate
+                    limit=limit * 4 if kind else limit,
+                    alpha=0.7,
+                    filters=build_filter(filters),
+                )
+                return keep_kind(format_hits(response.objects), kind, limit)
 
 
         except Exception as e:
             print(f"Error during query: {e}")
+            self._forget_if_missing(project_id, e)
             return []
-        finally:
-            if client:
-                client.close()
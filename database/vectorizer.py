@@ -0,0 +1,90 @@
+from collections import OrderedDict
+
+import numpy as np
+
+
+class Vectorizer:
+    """
+    Client-side embeddings for Weaviate collections created without a vectorizer.
+
+    `embedder` is any object with `embed_text_async(texts, input_type=None)` and a
+    blocking `embed_text(texts, input_type=None)` returning an (n, dim) array, e.g.
+    VoyageEmbeddings or a wrapper around a local model. Query embeddings are kept
+    in an LRU keyed on the normalized query text only, so the same reformulation
+    is embedded once for every language and every later question that repeats it.
+    """
+
+    def __init__(self, embedder, target_vector="text_vector", cache_size=4096):
+        self.embedder = embedder
+        self.target_vector = target_vector
+        self.cache_size = cache_size
+
+        self._queries = OrderedDict()  # normalized query -> vector
+        self._stats = {"query_hits": 0, "query_misses": 0, "documents": 0}
+
+    @staticmethod
+    def document_text(properties):
+        """Text embedded for an object: title + text for chunks, name + flattened details for products."""
+        parts = [properties.get(key) for key in ("title", "text", "name")]
+        parts.append(properties.get("details_text") or properties.get("details"))
+        return "\n".join(str(part) for part in parts if part)
+
+    def named(self, vector):
+        return {self.target_vector: np.asarray(vector, dtype=np.float32).tolist()}
+
+    async def embed_documents(self, texts):
+        self._stats["documents"] += len(texts)
+        return await self.embedder.embed_text_async(texts, input_type="document")
+
+    def embed_documents_sync(self, texts):
+        self._stats["documents"] += len(texts)
+        return self.embedder.embed_text(texts, input_type="document")
+
+    async def embed_queries(self, queries):
+        """Returns one vector per query; uncached queries are embedded together in one request."""
+        keys, hits, missing = self._lookup(queries)
+        vectors = await self.embedder.embed_text_async(missing, input_type="query") if missing else []
+        return self._resolve(keys, hits, missing, vectors)
+
+    def embed_queries_sync(self, queries):
+        keys, hits, missing = self._lookup(queries)
+        vectors = self.embedder.embed_text(missing, input_type="query") if missing else []
+        return self._resolve(keys, hits, missing, vectors)
+
+    @staticmethod
+    def _normalize(query):
+        return " ".join(query.split())
+
+    def _lookup(self, queries):
+        """
+        Returns (keys, hits, missing). Hit vectors are captured here because a
+        concurrent embed_queries may evict them before this call resolves.
+        """
+        keys = [self._normalize(query) for query in queries]
+        hits, missing = {}, []
+        for key in keys:
+            if key in self._queries:
+                self._queries.move_to_end(key)
+                hits[key] = self._queries[key]
+                self._stats["query_hits"] += 1
+            elif key not in missing:
+                missing.append(key)
+                self._stats["query_misses"] += 1
+        return keys, hits, missing
+
+    def _resolve(self, keys, hits, missing, vectors):
+        fresh = dict(zip(missing, vectors))
+        result = [fresh[key] if key in fresh else hits[key] for key in keys]
+        for key, vector in fresh.items():
+            self._queries[key] = vector
+        while len(self._queries) > self.cache_size:
+            self._queries.popitem(last=False)
+        return result
+
+    def metrics(self):
+        lookups = self._stats["query_hits"] + self._stats["query_misses"]
+        return {
+            **self._stats,
+            "query_cache_entries": len(self._queries),
+            "query_hit_rate": self._stats["query_hits"] / lookups if lookups else 0.0,
+        }
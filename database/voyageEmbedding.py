@@ -1,35 +1,146 @@
-import requests
-import math
+import asyncio
+import random
+import time
+
+import httpx
+import numpy as np
+
+from data_prep.tokenizer import approx_token_count
+from general.batch_scheduler import BatchScheduler, is_retryable
+
+
+class VoyageAPIError(RuntimeError):
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
+
 
 class VoyageEmbeddings:
-    def __init__(self, api_key,model, endpoint="https://api.voyageai.com/v1/embeddings",):
+    """
+    Voyage embeddings client.
+
+    Texts are grouped into requests of at most `max_batch_size` inputs and
+    `max_batch_tokens` estimated tokens. Up to `max_parallel` requests run at once
+    over one keep-alive connection pool, and 429/5xx/connection errors are retried
+    per batch with exponential backoff. Embeddings are returned as a contiguous
+    float32 array of shape (len(texts), dim).
+    """
+
+    def __init__(self, api_key, model, endpoint="https://api.voyageai.com/v1/embeddings", max_batch_size=128,
+                 max_batch_tokens=120_000, max_parallel=4, max_retries=5, timeout=30.0,
+                 token_counter=approx_token_count):
         self.api_key = api_key
         self.endpoint = endpoint
         self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_batch_tokens = max_batch_tokens
+        self.max_parallel = max_parallel
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.token_counter = token_counter
+
+        self.scheduler = BatchScheduler(max_in_flight=max_parallel, max_retries=max_retries)
+        self._client = None
+
+    def _new_client(self):
+        return httpx.AsyncClient(
+            headers=self._headers(),
+            timeout=self.timeout,
+            limits=httpx.Limits(max_connections=self.max_parallel, max_keepalive_connections=self.max_parallel),
+        )
+
+    def _headers(self):
+        return {"Authorization": f"Bearer {self.api_key}", "Content-Type": "application/json"}
+
+    def _batches(self, texts):
+        """Yields (start, end) index ranges within the count and token limits."""
+        start, tokens = 0, 0
+        for i, text in enumerate(texts):
+            text_tokens = self.token_counter(text)
+            if i > start and (i - start >= self.max_batch_size or tokens + text_tokens > self.max_batch_tokens):
+                yield start, i
+                start, tokens = i, 0
+            tokens += text_tokens
+        if start < len(texts):
+            yield start, len(texts)
+
+    def _payload(self, texts, input_type):
+        payload = {"input": texts, "model": self.model}
+        if input_type:
+            payload["input_type"] = input_type
+        return payload
+
+    async def _post(self, client, texts, input_type):
+        try:
+            response = await client.post(self.endpoint, json=self._payload(texts, input_type))
+        except httpx.TransportError as e:
+            raise ConnectionError(f"Voyage request failed: {e}") from e
+        return self._parse(response)
+
+    @staticmethod
+    def _parse(response):
+        if response.status_code != 200:
+            raise VoyageAPIError(f"Voyage returned {response.status_code}: {response.text[:200]}",
+                                 status_code=response.status_code)
+        data = sorted(response.json()["data"], key=lambda item: item["index"])
+        return np.asarray([item["embedding"] for item in data], dtype=np.float32)
+
+    async def _embed(self, texts, client, scheduler, input_type):
+        texts = list(texts)
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+        batches = list(self._batches(texts))
+
+        async def run(start, end):
+            try:
+                return await scheduler.submit(self._post, client, texts[start:end], input_type)
+            except Exception as e:
+                raise RuntimeError(f"Failed to retrieve embeddings for texts {start}-{end - 1}: {e}") from e
+
+        results = await asyncio.gather(*(run(start, end) for start, end in batches))
+        embeddings = np.empty((len(texts), results[0].shape[1]), dtype=np.float32)
+        for (start, end), vectors in zip(batches, results):
+            embeddings[start:end] = vectors
+        return embeddings
+
+    async def embed_text_async(self, texts, input_type=None):
+        if self._client is None:
+            self._client = self._new_client()
+        return await self._embed(texts, self._client, self.scheduler, input_type)
+
+    def embed_text(self, texts, input_type=None):
+        """
+        Blocking variant that sends the batches one after another, for synchronous
+        callers (it does not need or touch an event loop).
+        """
+        texts = list(texts)
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+        results = []
+        with httpx.Client(headers=self._headers(), timeout=self.timeout) as client:
+            for start, end in self._batches(texts):
+                results.append(self._post_sync(client, texts[start:end], input_type))
+        return np.ascontiguousarray(np.concatenate(results), dtype=np.float32)
 
-    def embed_text(self, texts, batch_size=10):
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json"
-        }
-
-        all_embeddings = []
-        num_batches = math.ceil(len(texts) / batch_size)
-
-        for i in range(num_batches):
-            batch_texts = texts[i * batch_size:(i + 1) * batch_size]
-            payload = {
-                "input": batch_texts,
-                "model": self.model
-            }
+    def _post_sync(self, client, texts, input_type, base_delay=1.0, max_delay=60.0):
+        attempt = 0
+        while True:
             try:
-                response = requests.post(self.endpoint, headers=headers, json=payload)
-                response.raise_for_status()
-                data = response.json()
+                try:
+                    response = client.post(self.endpoint, json=self._payload(texts, input_type))
+                except httpx.TransportError as e:
+                    raise ConnectionError(f"Voyage request failed: {e}") from e
+                return self._parse(response)
+            except Exception as e:
+                if attempt >= self.max_retries or not is_retryable(e):
+                    raise RuntimeError(f"Failed to retrieve embeddings: {e}") from e
+            attempt += 1
+            time.sleep(random.uniform(0, min(max_delay, base_delay * 2 ** attempt)))
 
-                for item in data['data']:
-                    all_embeddings.append(item['embedding'])
-            except requests.exceptions.RequestException as e:
-                raise RuntimeError(f"Failed to retrieve embeddings for batch {i + 1}: {e}")
+    def metrics(self):
+        return self.scheduler.metrics()
 
-        return all_embeddings
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
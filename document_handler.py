@@ -1,15 +1,76 @@
+import asyncio
+import json
 import logging
-from typing import Dict, Any, List, Optional, Union
+from typing import AsyncIterator, Dict, Any, List, Optional, Union
 import time
 
-from general.llm_request import contextualize_question, answer_question
+import api_keys
+import settings
+
+from general.llm_request import contextualize_question, answer_question, answer_question_stream
 from database.vector_database import WeaviateDatabase
-from data_prep.data_preparation import prepare_data
+from database.async_vector_database import AsyncWeaviateDatabase
+from database.collection_registry import CollectionRegistry
+from database.tenancy import TenantLayout
+from database.local_vector_database import AsyncLocalVectorDatabase, LocalVectorDatabase, LocalVectorStore
+from database.embedding_cache import CachedEmbeddings, EmbeddingCache
+from database.vectorizer import Vectorizer
+from database.voyageEmbedding import VoyageEmbeddings
+from data_prep.pipeline import ingest_stream, validate_upload
+from data_prep.ingestion_jobs import IngestionJobManager, JobProgress, JobStore
+from data_prep.manifest import ChunkManifest
+from data_prep.text_splitter import iter_split_text
+from data_prep.tokenizer import ChunkStats, approx_token_count
+from general.semantic_cache import SemanticCache
+from general import gemini_call
 
 class DocumentHandler:
-    def __init__(self, logger: Optional[logging.Logger] = None):
-        self.client = WeaviateDatabase()
+    def __init__(
+        self,
+        logger: Optional[logging.Logger] = None,
+        query_concurrency: int = settings.QUERY_CONCURRENCY,
+        query_timeout: float = settings.QUERY_TIMEOUT,
+        context_limit: int = settings.CONTEXT_LIMIT,
+        semantic_cache: Optional[SemanticCache] = None,
+    ):
+        self.embedder = VoyageEmbeddings(
+            api_keys.VOYAGE_API_KEY,
+            model="voyage-3",
+            max_batch_size=settings.VOYAGE_MAX_BATCH_SIZE,
+            max_batch_tokens=settings.VOYAGE_MAX_BATCH_TOKENS,
+            max_parallel=settings.VOYAGE_MAX_PARALLEL,
+            max_retries=settings.VOYAGE_MAX_RETRIES,
+        )
+        if settings.EMBEDDING_CACHE_ENABLED:
+            self.embedder = CachedEmbeddings(self.embedder, EmbeddingCache(
+                settings.EMBEDDING_CACHE_DIR, model=self.embedder.model,
+                max_entries=settings.EMBEDDING_CACHE_MAX_ENTRIES,
+            ))
+        # With client-side vectorization we embed chunks and queries ourselves instead of Weaviate.
+        self.vectorizer = Vectorizer(
+            self.embedder, cache_size=settings.QUERY_EMBEDDING_CACHE_SIZE
+        ) if settings.VECTORIZE_MODE == "client" else None
+        if settings.STORAGE_BACKEND == "local":
+            store = LocalVectorStore(settings.LOCAL_STORE_DIR)
+            self.client = LocalVectorDatabase(store, vectorizer=self.vectorizer)
+            self.async_client = AsyncLocalVectorDatabase(store, vectorizer=self.vectorizer)
+        else:
+            registry = CollectionRegistry(settings.COLLECTION_REGISTRY_TTL)
+            layout = TenantLayout(settings.TENANT_COLLECTION_PREFIX) if settings.STORAGE_LAYOUT == "tenants" else None
+            self.client = WeaviateDatabase(vectorizer=self.vectorizer, registry=registry, layout=layout)
+            self.async_client = AsyncWeaviateDatabase(vectorizer=self.vectorizer, registry=registry, layout=layout)
         self.logger = logger or self._create_default_logger()
+        self.query_concurrency = query_concurrency
+        self.query_timeout = query_timeout
+        self.context_limit = context_limit
+        self.semantic_cache = semantic_cache or self._create_default_semantic_cache()
+        self.manifest = ChunkManifest(settings.MANIFEST_DB_PATH)
+        self.jobs = IngestionJobManager(
+            self.data_upload, JobStore(settings.JOBS_DB_PATH), workers=settings.INGESTION_WORKERS,
+            max_attempts=settings.JOBS_MAX_ATTEMPTS, retention=settings.JOBS_RETENTION_SECONDS,
+            lease=settings.JOBS_LEASE_SECONDS,
+        )
+        self._offload_task = None
 
     def _create_default_logger(self) -> logging.Logger:
         logger = logging.getLogger(self.__class__.__name__)
@@ -19,16 +80,140 @@ class DocumentHandler:
         logger.addHandler(handler)
         return logger
 
-    async def data_upload(self, project_id: str, row_data: str, languages: List[str]) -> None:
+    def _create_default_semantic_cache(self) -> Optional[SemanticCache]:
+        if not settings.SEMANTIC_CACHE_ENABLED:
+            return None
+
+        async def embed(text: str):
+            if self.vectorizer:
+                # shares the query-embedding cache with retrieval
+                return (await self.vectorizer.embed_queries([text]))[0]
+            return (await self.embedder.embed_text_async([text], input_type="query"))[0]
+
+        return SemanticCache(
+            embed,
+            threshold=settings.SEMANTIC_CACHE_THRESHOLD,
+            ttl=settings.SEMANTIC_CACHE_TTL,
+            max_entries=settings.SEMANTIC_CACHE_MAX_ENTRIES,
+        )
+
+    def _invalidate_cache(self, project_id: str) -> None:
+        if self.semantic_cache:
+            self.semantic_cache.invalidate(project_id)
+
+    async def start(self) -> None:
+        """Warms the collection registry and starts the background ingestion and tenant offload workers."""
         try:
-            processed_data = await prepare_data(row_data, languages)
-            self.client.initialize_and_insert_data(processed_data, project_id=project_id)
+            await self.async_client.warm()
+        except Exception as e:
+            self.logger.warning(f"Could not warm collection registry: {e}")
+        await self.jobs.start()
+        if settings.TENANT_OFFLOAD_AFTER > 0:
+            self._offload_task = asyncio.create_task(self._offload_idle_tenants())
+
+    async def _offload_idle_tenants(self) -> None:
+        """Periodically deactivates (or offloads) tenants nobody has queried for TENANT_OFFLOAD_AFTER seconds."""
+        while True:
+            await asyncio.sleep(min(settings.TENANT_OFFLOAD_AFTER, 60))
+            try:
+                count = await self.async_client.offload_idle_tenants(
+                    settings.TENANT_OFFLOAD_AFTER, settings.TENANT_OFFLOAD_STATUS
+                )
+                if count:
+                    self.logger.info(f"Set {count} idle tenant(s) to {settings.TENANT_OFFLOAD_STATUS}")
+            except Exception as e:
+                self.logger.warning(f"Tenant offload failed: {e}")
+
+    async def close(self) -> None:
+        """Stops ingestion workers and releases database connections and provider-side cached prompts."""
+        if self._offload_task:
+            self._offload_task.cancel()
+            await asyncio.gather(self._offload_task, return_exceptions=True)
+        await self.jobs.stop()
+        self.manifest.close()
+        await self.async_client.close()
+        await self.embedder.close()
+        self.client.close()
+        await gemini_call.model_registry.close()
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "weaviate_pool": self.client.pool_metrics(),
+            "weaviate_async": self.async_client.metrics(),
+            "semantic_cache": self.semantic_cache.metrics() if self.semantic_cache else None,
+            "voyage": self.embedder.metrics(),
+            "vectorizer": self.vectorizer.metrics() if self.vectorizer else None,
+            "llm_cache": gemini_call.response_cache.metrics() if gemini_call.response_cache else None,
+            "gemini_models": gemini_call.model_registry.metrics(),
+            "gemini_scheduler": gemini_call.batch_scheduler.metrics(),
+        }
+
+    async def data_upload(self, project_id: str, row_data: str, languages: List[str],
+                          progress: Optional[JobProgress] = None, mode: Optional[str] = None,
+                          diff: bool = False) -> Dict[str, Any]:
+        """
+        Splits, normalizes and inserts `row_data` for every language as one streaming
+        pipeline, so inserts overlap with LLM normalization. `mode` is "per_language"
+        or "translate" (normalize once, then translate; defaults to INGESTION_MODE).
+        Chunks already ingested for a language are skipped; with `diff` the upload is
+        treated as the full document and chunks missing from it are deleted.
+        When a JobProgress is given, each stage reports its progress into it.
+        Returns per-language counts and timings plus a tokens-per-chunk summary.
+        """
+        try:
+            chunk_stats = ChunkStats()
+            stats = await ingest_stream(
+                chunk_stats.track(self._split(row_data)),
+                languages,
+                project_id,
+                self.async_client,
+                progress=progress,
+                workers=settings.INGESTION_CONCURRENCY,
+                queue_size=settings.INGESTION_QUEUE_SIZE,
+                insert_batch_size=settings.INGESTION_INSERT_BATCH_SIZE,
+                mode=mode or settings.INGESTION_MODE,
+                manifest=self.manifest,
+                diff=diff,
+            )
+            self._invalidate_cache(project_id)
             for lang in languages:
-                self.logger.info(f"Data inserted for project {project_id}_{lang}")
+                self.logger.info(
+                    f"Data inserted for project {project_id}_{lang}: {stats[lang]['inserted']} chunks, "
+                    f"{stats[lang]['skipped']} unchanged, {stats[lang]['deleted']} deleted, "
+                    f"{stats[lang]['failed']} failed, {stats[lang]['seconds']:.1f}s "
+                    f"({stats[lang]['llm_seconds']:.1f}s in LLM calls)"
+                )
+            summary = chunk_stats.summary()
+            if summary["chunks"]:
+                self.logger.info(
+                    f"Chunks for project {project_id}: {summary['chunks']} chunks, "
+                    f"{summary['mean']} tokens/chunk on average (p50 {summary['p50']}, p95 {summary['p95']}, "
+                    f"max {summary['max']})"
+                )
+            return {"languages": stats, "chunks": summary}
         except Exception as e:
             self.logger.error(f"Upload failed: {e}")
             raise
 
+    def _split(self, row_data: str):
+        """Chunks uploaded text by characters or, with CHUNK_UNIT=tokens, by approximate tokens."""
+        if settings.CHUNK_UNIT == "tokens":
+            return iter_split_text(row_data, settings.CHUNK_SIZE, token_counter=approx_token_count,
+                                   overlap_tokens=settings.CHUNK_OVERLAP)
+        return iter_split_text(row_data, settings.CHUNK_SIZE, settings.CHUNK_OVERLAP)
+
+    def submit_data_upload(self, project_id: str, row_data: str, languages: List[str], **options) -> str:
+        """
+        Queues a data upload as a background ingestion job and returns its id.
+        Raises ValueError for an empty language list or an unknown `mode`, so bad
+        requests are rejected up front instead of failing in the background.
+        """
+        validate_upload(languages, options.get("mode") or settings.INGESTION_MODE)
+        return self.jobs.submit(project_id, row_data, languages, **options)
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return self.jobs.get(job_id)
+
 
     def create_product(self, details: Dict[str, Any], project_id: str, lang: str) -> Dict[str, Any]:
         """
@@ -41,9 +226,12 @@ class DocumentHandler:
             "name": details["name"],
             "details": details["details"],
             "id": details["id"],
+            "tags": details.get("tags"),
+            "price": details.get("price"),
         }
         try:
             self.client.add_product(f"{project_id}_{lang}", product)
+            self._invalidate_cache(project_id)
             self.logger.info(f"Product created for {project_id}_{lang}")
         except Exception as e:
             self.logger.error(f"Product insert failed for {project_id}_{lang}: {e}")
@@ -71,6 +259,19 @@ class DocumentHandler:
 
         return "Products not found"
 
+    def list_products(self, project_id: str, lang: str, after: Optional[str] = None, limit: int = 100,
+                      fields: Optional[List[str]] = None) -> Dict[str, Any]:
+        """One page of products of a language collection; pass `next_cursor` back as `after`."""
+        products, next_cursor = self.client.list_products(
+            f"{project_id}_{lang}", after=after, limit=limit, fields=fields
+        )
+        return {"products": products, "next_cursor": next_cursor}
+
+    def iter_products(self, project_id: str, lang: str, fields: Optional[List[str]] = None):
+        """Yields all products of a language collection page by page, for streaming responses."""
+        return self.client.iter_products(f"{project_id}_{lang}", fields=fields,
+                                         page_size=settings.PRODUCT_PAGE_SIZE)
+
     def update_product(self, project_id: str, details: Dict[str, Any], lang: str) -> None:
         """
         Updates a product for a single language.
@@ -79,9 +280,12 @@ class DocumentHandler:
             "name": details["name"],
             "details": details["details"],
             "id": details["id"],
+            "tags": details.get("tags"),
+            "price": details.get("price"),
         }
         try:
             self.client.update_product(project_id=f"{project_id}_{lang}", details=updated)
+            self._invalidate_cache(project_id)
             self.logger.info(f"Product updated for {project_id}_{lang}")
         except Exception as e:
             self.logger.error(f"Update failed for {project_id}_{lang}: {e}")
@@ -89,22 +293,90 @@ class DocumentHandler:
     def delete_product(self, project_id: str, product_id: str, lang: str) -> bool:
         try:
             self.client.delete_product(f"{project_id}_{lang}", product_id)
+            self._invalidate_cache(project_id)
             return True
         except Exception as e:
             self.logger.error(f"Delete failed for {project_id}_{lang}: {e}")
             return False
 
-    def query_core_data(self, project_id: str, query: str, lang: str) -> Union[Any, str]:
+    def bulk_products(self, action: str, items: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Creates, updates or deletes many products across projects and languages.
+        `items` are dicts with project_id, lang and id (plus name, details and optional
+        tags and price unless deleting). Each `{project_id}_{lang}` collection is written in one batch;
+        returns a per-item status list and the throughput in objects/s.
+        """
+        started = time.perf_counter()
+        results = [{"index": i, "id": item.get("id"), "status": "ok"} for i, item in enumerate(items)]
+        groups = {}
+        for i, item in enumerate(items):
+            groups.setdefault((item["project_id"], item["lang"]), []).append(i)
+
+        for (project_id, lang), positions in groups.items():
+            collection = f"{project_id}_{lang}"
+            try:
+                if action == "delete":
+                    errors = self.client.bulk_delete_products(collection, [items[i]["id"] for i in positions])
+                else:
+                    errors = self.client.bulk_upsert_products(
+                        collection, [items[i] for i in positions], update=action == "update"
+                    )
+            except Exception as e:
+                errors = {position: str(e) for position in range(len(positions))}
+            for position, error in errors.items():
+                results[positions[position]].update(status="error", error=error)
+            self._invalidate_cache(project_id)
+
+        seconds = time.perf_counter() - started
+        succeeded = sum(1 for result in results if result["status"] == "ok")
+        self.logger.info(
+            f"Bulk {action}: {succeeded}/{len(items)} products in {len(groups)} collection(s), {seconds:.2f}s"
+        )
+        return {
+            "results": results,
+            "succeeded": succeeded,
+            "failed": len(items) - succeeded,
+            "seconds": round(seconds, 3),
+            "objects_per_second": round(len(items) / seconds, 1) if seconds > 0 else None,
+        }
+
+    async def gather_context(self, project_id: str, queries: List[str], lang: str,
+                             filters: Optional[Dict[str, Any]] = None) -> List[Any]:
+        """
+        Retrieves context for all queries in one multi-query call. Queries run
+        concurrently, at most `query_concurrency` at a time; a query that exceeds
+        `query_timeout` is dropped and the others are kept. Results are fused with
+        reciprocal-rank fusion and deduplicated, so each chunk reaches the prompt once.
+        `filters` (kind, tags, price_min, price_max, updated_after) restrict the search.
+        """
         try:
-            results = self.client.hybrid_query(query=query, project_id=f"{project_id}_{lang}")
-            return results if results else "No relevant data found."
+            hits, stats = await self.async_client.multi_hybrid_query(
+                queries=queries,
+                project_id=f"{project_id}_{lang}",
+                limit=self.context_limit,
+                concurrency=self.query_concurrency,
+                timeout=self.query_timeout,
+                filters=filters,
+            )
         except Exception as e:
             self.logger.error(f"Query error: {e}")
-            return "Query failed"
+            return []
+
+        for stat in stats:
+            self.logger.info(
+                f"Query '{stat['query']}': {stat['hits']} hits, {stat['new']} new, "
+                f"{stat['in_top_k']} in top-{self.context_limit}{' (failed)' if stat['failed'] else ''}"
+            )
+        return hits
 
     def delete_project(self, project_id: str, lang: str) -> bool:
         try:
             self.client.delete_project(project_id=project_id, language=lang)
+            if lang:
+                self.manifest.drop(collection=f"{project_id}_{lang}")
+            else:
+                self.manifest.drop(prefix=f"{project_id}_")
+            self._invalidate_cache(project_id)
             return True
         except Exception as e:
             self.logger.error(f"Project delete failed for {project_id}_{lang}: {e}")
@@ -113,50 +385,125 @@ class DocumentHandler:
     def delete_all(self) -> bool:
         try:
             self.client.delete_all_collections()
+            self.manifest.drop()
+            if self.semantic_cache:
+                self.semantic_cache.clear()
             self.logger.info("All data deleted successfully.")
             return True
         except Exception as e:
             self.logger.error(f"Failed to delete all data: {e}")
             return False
 
-    async def ask_question(self, question_details: Dict[str, Any]) -> Dict[str, Any]:
-        start = time.time()
+    def _missing_question_key(self, question_details: Dict[str, Any]) -> Optional[str]:
         required_keys = ["history", "user_question", "project_id", "lang", "company_data", "project_name"]
         for key in required_keys:
             if key not in question_details:
-                return {"error": f"Missing key: {key}"}
+                return key
+        return None
 
-        try:
-            q_texts = await contextualize_question(
-                chat_history=question_details["history"],
-                latest_question=question_details["user_question"],
-                project_name=question_details["project_name"],
-                lang=question_details["lang"],
-                agent_type=question_details["service_type"]
-            )
-            q_texts.append(question_details["user_question"])
-            context = [
-                self.query_core_data(
-                    query=q,
-                    lang=question_details["lang"],
-                    project_id=question_details["project_id"]
-                ) for q in q_texts if q
-            ]
-
-            response = await answer_question({
-                "context": context,
-                "reformulations": q_texts,
-                "user_question": question_details["user_question"],
-                "project_id": question_details["project_id"],
-                "project_name": question_details["project_name"],
-                "lang": question_details["lang"],
-                "history": question_details["history"],
-                "company_data": question_details["company_data"],
-                "service_type": question_details["service_type"]
-            })
+    async def _lookup_answer(self, question_details: Dict[str, Any]):
+        """
+        Returns (cache_scope, cache_vector, cached_answer, generation) for a question.
+        `generation` is read before the lookup, so an answer built while the project
+        was being changed is not stored afterwards.
+        """
+        # Answers depend on the conversation, so only first-turn questions are cached.
+        if not self.semantic_cache or question_details["history"]:
+            return None, None, None, None
+        service_type = question_details["service_type"]
+        filters = question_details.get("filters")
+        cache_scope = (
+            question_details["project_id"],
+            question_details["lang"],
+            getattr(service_type, "value", service_type),
+            json.dumps(filters, sort_keys=True, default=str) if filters else "",
+        )
+        generation = self.semantic_cache.generation(question_details["project_id"])
+        cached, cache_vector = await self.semantic_cache.lookup(cache_scope, question_details["user_question"])
+        return cache_scope, cache_vector, cached, generation
+
+    def _store_answer(self, cache_scope, cache_vector, generation, question_details: Dict[str, Any],
+                      response: Any) -> None:
+        if cache_scope and isinstance(response, dict) and "error" not in response:
+            self.semantic_cache.store(cache_scope, question_details["user_question"], cache_vector, response,
+                                      generation=generation)
+
+    async def _answer_request(self, question_details: Dict[str, Any]) -> Dict[str, Any]:
+        """Reformulates the question and retrieves context for the answering agent."""
+        q_texts = await contextualize_question(
+            chat_history=question_details["history"],
+            latest_question=question_details["user_question"],
+            project_name=question_details["project_name"],
+            lang=question_details["lang"],
+            agent_type=question_details["service_type"]
+        )
+        q_texts.append(question_details["user_question"])
+        context = await self.gather_context(
+            project_id=question_details["project_id"],
+            queries=[q for q in q_texts if q],
+            lang=question_details["lang"],
+            filters=question_details.get("filters"),
+        )
+
+        return {
+            "context": context,
+            "reformulations": q_texts,
+            "user_question": question_details["user_question"],
+            "project_id": question_details["project_id"],
+            "project_name": question_details["project_name"],
+            "lang": question_details["lang"],
+            "history": question_details["history"],
+            "company_data": question_details["company_data"],
+            "service_type": question_details["service_type"]
+        }
 
+    async def ask_question(self, question_details: Dict[str, Any]) -> Dict[str, Any]:
+        start = time.time()
+        missing = self._missing_question_key(question_details)
+        if missing:
+            return {"error": f"Missing key: {missing}"}
+
+        cache_scope, cache_vector, cached, generation = await self._lookup_answer(question_details)
+        if cached is not None:
+            return dict(cached)
+
+        try:
+            response = await answer_question(await self._answer_request(question_details))
+            self._store_answer(cache_scope, cache_vector, generation, question_details, response)
             return response
 
         except Exception as e:
             self.logger.error(f"QA failed: {e}")
             return {"error": str(e), "processing_time": time.time() - start}
+
+    async def ask_question_stream(self, question_details: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Streaming variant of ask_question. Yields {"event": "token", "data": {"delta": ...}}
+        for each piece of the answer's "response" text as it is generated, then one
+        {"event": "done", "data": <answer>} carrying `is_fully_resolved`, or an
+        {"event": "error", ...} if the question could not be answered.
+        """
+        start = time.time()
+        missing = self._missing_question_key(question_details)
+        if missing:
+            yield {"event": "error", "data": {"error": f"Missing key: {missing}"}}
+            return
+
+        cache_scope, cache_vector, cached, generation = await self._lookup_answer(question_details)
+        if cached is not None:
+            yield {"event": "token", "data": {"delta": cached.get("response", "")}}
+            yield {"event": "done", "data": dict(cached)}
+            return
+
+        try:
+            answer_request = await self._answer_request(question_details)
+            async for kind, payload in answer_question_stream(answer_request):
+                if kind == "delta":
+                    yield {"event": "token", "data": {"delta": payload}}
+                else:
+                    self._store_answer(cache_scope, cache_vector, generation, question_details, payload)
+                    yield {"event": "done", "data": payload}
+
+        except Exception as e:
+            self.logger.error(f"QA stream failed: {e}")
+            yield {"event": "error", "data": {"error": str(e), "processing_time": time.time() - start}}
@@ -307,3 +307,12 @@ def get_sys_prompt(lang):
   Ensure the title is specific and descriptive, capturing the essence of the text without altering its content. 
   RESPONSE HAVE TO BE TRANSLATED INTO THE {language[lang]}.
   """
+
+def get_translation_prompt(lang):
+  return f"""
+  You are an AI assistant tasked with translating an already titled text. The input is a JSON object 
+  with a "title" (string) and "text" (string). Translate both fields into the {language[lang]}, 
+  keeping the meaning, names, numbers, prices and links unchanged. Do not summarize, shorten or add content. 
+  Format the response as a JSON object following this structure: {{"title": str, "text": str}}. 
+  RESPONSE HAVE TO BE TRANSLATED INTO THE {language[lang]}.
+  """
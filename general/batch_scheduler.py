@@ -0,0 +1,133 @@
+import asyncio
+import random
+import time
+
+from google.api_core import exceptions as google_exceptions
+
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+RETRYABLE_EXCEPTIONS = (
+    google_exceptions.TooManyRequests,
+    google_exceptions.ResourceExhausted,
+    google_exceptions.InternalServerError,
+    google_exceptions.BadGateway,
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.GatewayTimeout,
+    google_exceptions.DeadlineExceeded,
+    asyncio.TimeoutError,
+    ConnectionError,
+)
+
+
+def is_retryable(error):
+    """True for rate-limit (429), transient 5xx and connection errors."""
+    if isinstance(error, RETRYABLE_EXCEPTIONS):
+        return True
+    status = getattr(error, "status_code", None) or getattr(error, "code", None)
+    return isinstance(status, int) and status in RETRYABLE_STATUS_CODES
+
+
+class TokenBucket:
+    """Async token bucket refilled continuously at `per_minute` units per minute."""
+
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = None
+
+    async def acquire(self, amount=1):
+        amount = min(float(amount), self.capacity)
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= amount:
+                    self._tokens -= amount
+                    return
+                await asyncio.sleep((amount - self._tokens) / self.rate)
+
+
+class BatchScheduler:
+    """
+    Runs async calls with bounded concurrency under optional requests-per-minute and
+    tokens-per-minute budgets. Retryable failures are retried per item with
+    exponential backoff and full jitter, so a 429 on one item never re-runs the
+    items that already succeeded.
+
+    One scheduler can be shared by many batches to give them a common budget.
+    """
+
+    def __init__(self, max_in_flight=16, rpm=None, tpm=None, max_retries=5, base_delay=1.0, max_delay=60.0):
+        self.max_in_flight = max_in_flight
+        self.rpm = TokenBucket(rpm) if rpm else None
+        self.tpm = TokenBucket(tpm) if tpm else None
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+        self._semaphore = None
+        self._stats = {"calls": 0, "succeeded": 0, "failed": 0, "retries": 0, "in_flight": 0}
+
+    async def submit(self, fn, *args, tokens=0, **kwargs):
+        """Runs `await fn(*args, **kwargs)` under the budgets, retrying retryable errors."""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_in_flight)
+
+        attempt = 0
+        while True:
+            if self.rpm:
+                await self.rpm.acquire(1)
+            if self.tpm and tokens:
+                await self.tpm.acquire(tokens)
+
+            async with self._semaphore:
+                self._stats["calls"] += 1
+                self._stats["in_flight"] += 1
+                try:
+                    result = await fn(*args, **kwargs)
+                    self._stats["succeeded"] += 1
+                    return result
+                except Exception as e:
+                    if attempt >= self.max_retries or not is_retryable(e):
+                        self._stats["failed"] += 1
+                        raise
+                    error = e
+                finally:
+                    self._stats["in_flight"] -= 1
+
+            attempt += 1
+            self._stats["retries"] += 1
+            delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+            print(f"Retrying after {type(error).__name__} (attempt {attempt}/{self.max_retries}) in {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+    async def run(self, items, fn, estimate_tokens=None, on_progress=None):
+        """
+        Calls `fn(*item)` for every item and returns results in order. Items that
+        still fail after retries yield {"error": ...}. `on_progress(done, total, failed)`
+        is called after every finished item.
+        """
+        total = len(items)
+        done = failed = 0
+
+        async def run_one(item):
+            nonlocal done, failed
+            tokens = estimate_tokens(*item) if estimate_tokens else 0
+            try:
+                return await self.submit(fn, *item, tokens=tokens)
+            except Exception as e:
+                failed += 1
+                return {"error": str(e)}
+            finally:
+                done += 1
+                if on_progress:
+                    on_progress(done, total, failed)
+
+        return await asyncio.gather(*(run_one(item) for item in items))
+
+    def metrics(self):
+        return {**self._stats, "max_in_flight": self.max_in_flight}
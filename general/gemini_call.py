@@ -1,36 +1,248 @@
 import asyncio
+import datetime
+import hashlib
+import time
+from collections import OrderedDict
+
 import google.generativeai as genai
+from google.generativeai import caching
 import api_keys
+import settings
+from general.batch_scheduler import BatchScheduler
+from general.llm_cache import create_response_cache, make_cache_key
 
-async def call_gemini_async(messages, system_instruction):
+DEFAULT_MODEL = "gemini-2.0-flash"
+DEFAULT_TEMPERATURE = 0.3
 
-    genai.configure(api_key=api_keys.GEMINI_API_KEY)
-    model = genai.GenerativeModel(
-        model_name="gemini-2.0-flash",
-        system_instruction=system_instruction
+response_cache = None
+if settings.LLM_CACHE_BACKEND != "none":
+    response_cache = create_response_cache(
+        backend=settings.LLM_CACHE_BACKEND,
+        path=settings.LLM_CACHE_PATH,
+        max_bytes=settings.LLM_CACHE_MAX_BYTES,
+        ttl=settings.LLM_CACHE_TTL,
     )
 
-    def _sync_call():
-        return model.generate_content(
-            contents=[messages],
-            generation_config=genai.types.GenerationConfig(temperature=0.3),
-        )
+_configured = False
+
+
+def configure():
+    """
+    Configures the Gemini SDK once per process. Requests go through the SDK's
+    native async client, which multiplexes them over one shared gRPC (HTTP/2)
+    channel instead of a worker thread per call. GEMINI_API_ENDPOINT points it at
+    another host, e.g. a local fake server for load tests.
+    """
+    global _configured
+    if not _configured:
+        client_options = {"api_endpoint": settings.GEMINI_API_ENDPOINT} if settings.GEMINI_API_ENDPOINT else None
+        genai.configure(api_key=api_keys.GEMINI_API_KEY, client_options=client_options)
+        _configured = True
+
+
+class ModelRegistry:
+    """
+    Bounded LRU of GenerativeModel instances keyed by (model, system instruction).
+
+    System instructions longer than `context_cache_min_tokens` (estimated) are
+    registered as Gemini cached content, so the prompt is stored provider-side
+    once and not re-sent and re-billed on every request. If the provider rejects
+    caching for a model, that model falls back to plain system instructions.
+    """
+
+    def __init__(self, max_size=64, context_cache_enabled=True, context_cache_min_tokens=4096,
+                 context_cache_ttl=3600):
+        self.max_size = max_size
+        self.context_cache_enabled = context_cache_enabled
+        self.context_cache_min_tokens = context_cache_min_tokens
+        self.context_cache_ttl = context_cache_ttl
+
+        self._models = OrderedDict()  # key -> (model, cached_content, expires_at)
+        self._lock = None
+        self._cache_unsupported = set()
+        self._stats = {"hits": 0, "builds": 0, "evictions": 0, "context_caches": 0, "context_cache_errors": 0}
+
+    async def get(self, model_name, system_instruction):
+        key = (model_name, hashlib.sha256(system_instruction.encode("utf-8")).hexdigest())
+        model = self._lookup(key)
+        if model is not None:
+            return model
+
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            model = self._lookup(key)
+            if model is not None:
+                return model
+            configure()
+            model, cached_content = await self._build(model_name, system_instruction)
+            expires_at = time.monotonic() + self.context_cache_ttl * 0.9 if cached_content else float("inf")
+            self._models[key] = (model, cached_content, expires_at)
+            self._stats["builds"] += 1
+            while len(self._models) > self.max_size:
+                _, (_, evicted_cache, _) = self._models.popitem(last=False)
+                self._stats["evictions"] += 1
+                await self._delete_cached_content(evicted_cache)
+            return model
+
+    def _lookup(self, key):
+        entry = self._models.get(key)
+        if entry is None:
+            return None
+        model, cached_content, expires_at = entry
+        if expires_at <= time.monotonic():
+            del self._models[key]
+            return None
+        self._models.move_to_end(key)
+        self._stats["hits"] += 1
+        return model
+
+    async def _build(self, model_name, system_instruction):
+        if (self.context_cache_enabled and model_name not in self._cache_unsupported
+                and len(system_instruction) // 4 >= self.context_cache_min_tokens):
+            try:
+                cached_content = await asyncio.to_thread(
+                    caching.CachedContent.create,
+                    model=model_name,
+                    system_instruction=system_instruction,
+                    ttl=datetime.timedelta(seconds=self.context_cache_ttl),
+                )
+                self._stats["context_caches"] += 1
+                return genai.GenerativeModel.from_cached_content(cached_content=cached_content), cached_content
+            except Exception as e:
+                print(f"Context caching unavailable for {model_name}: {e}")
+                self._stats["context_cache_errors"] += 1
+                self._cache_unsupported.add(model_name)
+
+        return genai.GenerativeModel(model_name=model_name, system_instruction=system_instruction), None
+
+    @staticmethod
+    async def _delete_cached_content(cached_content):
+        if cached_content is None:
+            return
+        try:
+            await asyncio.to_thread(cached_content.delete)
+        except Exception as e:
+            print(f"Error deleting cached content: {e}")
+
+    def metrics(self):
+        return {**self._stats, "models": len(self._models), "max_size": self.max_size}
+
+    async def close(self):
+        entries, self._models = list(self._models.values()), OrderedDict()
+        for _, cached_content, _ in entries:
+            await self._delete_cached_content(cached_content)
+
+
+model_registry = ModelRegistry(
+    max_size=settings.GEMINI_MODEL_REGISTRY_SIZE,
+    context_cache_enabled=settings.GEMINI_CONTEXT_CACHE_ENABLED,
+    context_cache_min_tokens=settings.GEMINI_CONTEXT_CACHE_MIN_TOKENS,
+    context_cache_ttl=settings.GEMINI_CONTEXT_CACHE_TTL,
+)
+
+batch_scheduler = BatchScheduler(
+    max_in_flight=settings.GEMINI_MAX_IN_FLIGHT,
+    rpm=settings.GEMINI_RPM,
+    tpm=settings.GEMINI_TPM,
+    max_retries=settings.GEMINI_MAX_RETRIES,
+)
 
+
+async def call_gemini_async(messages, system_instruction, model=DEFAULT_MODEL,
+                            temperature=DEFAULT_TEMPERATURE, use_cache=True):
+    """
+    Returns the text of a Gemini completion, or {"error": ...} on failure.
+    Identical (system_instruction, messages, model, temperature) requests are served
+    from `response_cache` unless the caller passes use_cache=False.
+    """
     try:
-        response = await asyncio.to_thread(_sync_call)
-        if response.candidates and response.candidates[0].content.parts:
-            return response.candidates[0].content.parts[0].text
-        else:
-            return {"error": "No content found in the response."}
+        return await generate_gemini(messages, system_instruction, model, temperature, use_cache)
     except Exception as e:
         return {"error": str(e)}
-    
-async def batch_gemini_requests(list_of_message_instruction_pairs):
-    tasks = [
-        call_gemini_async(messages, sys_instr)
-        for messages, sys_instr in list_of_message_instruction_pairs
-    ]
-    results = await asyncio.gather(*tasks)
-    return results
 
 
+async def generate_gemini(messages, system_instruction, model=DEFAULT_MODEL,
+                          temperature=DEFAULT_TEMPERATURE, use_cache=True):
+    """Like call_gemini_async, but raises on failure so callers can retry."""
+    if use_cache and response_cache is not None:
+        key = make_cache_key(
+            system_instruction=system_instruction, messages=messages, model=model, temperature=temperature
+        )
+        return await response_cache.get_or_call(
+            key, lambda: _generate(messages, system_instruction, model, temperature)
+        )
+    return await _generate(messages, system_instruction, model, temperature)
+
+
+async def _generate(messages, system_instruction, model_name, temperature):
+    model = await model_registry.get(model_name, system_instruction)
+    response = await model.generate_content_async(
+        contents=[messages],
+        generation_config=genai.types.GenerationConfig(temperature=temperature),
+    )
+    if response.candidates and response.candidates[0].content.parts:
+        return response.candidates[0].content.parts[0].text
+    raise RuntimeError("No content found in the response.")
+
+
+async def stream_gemini_async(messages, system_instruction, model=DEFAULT_MODEL,
+                             temperature=DEFAULT_TEMPERATURE, use_cache=True):
+    """
+    Yields the completion text incrementally as Gemini streams it. A cached
+    response is yielded in one piece; a fully streamed one is added to the cache.
+    Raises on failure.
+    """
+    key = None
+    if use_cache and response_cache is not None:
+        key = make_cache_key(
+            system_instruction=system_instruction, messages=messages, model=model, temperature=temperature
+        )
+        cached = response_cache.get(key)
+        if cached is not None:
+            yield cached
+            return
+
+    gemini_model = await model_registry.get(model, system_instruction)
+    response = await gemini_model.generate_content_async(
+        contents=[messages],
+        generation_config=genai.types.GenerationConfig(temperature=temperature),
+        stream=True,
+    )
+    parts = []
+    async for chunk in response:
+        if chunk.candidates and chunk.candidates[0].content.parts:
+            text = chunk.candidates[0].content.parts[0].text
+            if text:
+                parts.append(text)
+                yield text
+
+    if not parts:
+        raise RuntimeError("No content found in the response.")
+    if key is not None:
+        response_cache.put(key, "".join(parts))
+
+
+def estimate_request_tokens(messages, system_instruction):
+    """Rough input + output token estimate (~4 characters per token) for TPM budgeting."""
+    return (len(system_instruction) + 2 * len(messages)) // 4 + 1
+
+
+async def batch_gemini_requests(list_of_message_instruction_pairs, use_cache=True, scheduler=None,
+                                on_progress=None):
+    """
+    Runs every (messages, system_instruction) pair through `scheduler`, which caps
+    requests in flight, enforces the RPM/TPM budgets and retries 429/5xx responses.
+    Returns texts in input order; items that fail after retries yield {"error": ...}.
+    """
+    scheduler = scheduler or batch_scheduler
+
+    async def call(messages, sys_instr):
+        return await generate_gemini(messages, sys_instr, use_cache=use_cache)
+
+    return await scheduler.run(
+        list(list_of_message_instruction_pairs),
+        call,
+        estimate_tokens=estimate_request_tokens,
+        on_progress=on_progress,
+    )
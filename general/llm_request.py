@@ -1,6 +1,7 @@
-from general.gemini_call import call_gemini_async
+from general.gemini_call import call_gemini_async, stream_gemini_async
 import general.agent_prompts as prompts
 import json
+import re
 
 
 async def contextualize_question(latest_question, chat_history, project_name=str, agent_type=str, lang=str) -> list:
@@ -22,7 +23,17 @@ async def contextualize_question(latest_question, chat_history, project_name=str
    return result
 
 
-async def answer_question(question_details: dict) -> str:
+def compact_context(context: list) -> list:
+   """Drops empty fields and retrieval bookkeeping from hits before they go into the prompt."""
+   return [
+      {key: value for key, value in hit.items() if value and key not in ("id", "rrf_score")}
+      if isinstance(hit, dict) else hit
+      for hit in context
+   ]
+
+
+def _answer_request(question_details: dict) -> tuple:
+   """Builds the (system_instruction, messages) pair for the answering agent."""
    chat_history = question_details["history"] or []
    agent_prompts = {
       "sales": prompts.sales_agent_prompt,
@@ -44,14 +55,103 @@ async def answer_question(question_details: dict) -> str:
    
    
 
-   messages = f'*Company Data*: {question_details["context"]}\n*Documentary questions*: {question_details["reformulations"]}, *Main question*: {question_details["user_question"]}, *Chat history*: {chat_history}.'
+   messages = f'*Company Data*: {compact_context(question_details["context"])}\n*Documentary questions*: {question_details["reformulations"]}, *Main question*: {question_details["user_question"]}, *Chat history*: {chat_history}.'
+   return system_instruction, messages
+
+
+def parse_answer(response: str) -> dict:
+   cleaned_response = response.strip().replace('```json', '').replace('```', '').replace('\n', '')
+   return json.loads(cleaned_response)
+
+
+async def answer_question(question_details: dict) -> str:
+   system_instruction, messages = _answer_request(question_details)
 
    response = await call_gemini_async(
        messages=messages,
        system_instruction=system_instruction
    )
 
-   cleaned_response = response.strip().replace('```json', '').replace('```', '').replace('\n', '')
-   json_data = json.loads(cleaned_response)
-
-   return json_data
+   return parse_answer(response)
+
+
+class ResponseFieldParser:
+   """
+   Incrementally extracts the "response" string from a streamed answer JSON.
+
+   `feed` takes the next raw chunk of model output and returns the newly decoded
+   part of the "response" value, so tokens can be forwarded before the JSON is
+   complete. Escape sequences split across chunks are held back until complete.
+   """
+
+   _KEY = re.compile(r'"response"\s*:\s*"')
+
+   def __init__(self):
+      self.buffer = ""
+      self.pos = 0
+      self.state = "seek"  # seek -> string -> done
+
+   def feed(self, text: str) -> str:
+      self.buffer += text
+      if self.state == "seek":
+         match = self._KEY.search(self.buffer, self.pos)
+         if not match:
+            # keep a tail so a key split across chunks is still found
+            self.pos = max(0, len(self.buffer) - 32)
+            return ""
+         self.pos = match.end()
+         self.state = "string"
+      if self.state != "string":
+         return ""
+
+      out = []
+      buffer, i = self.buffer, self.pos
+      while i < len(buffer):
+         char = buffer[i]
+         if char == '"':
+            self.state = "done"
+            i += 1
+            break
+         if char != "\\":
+            out.append(char)
+            i += 1
+            continue
+         escape = self._escape_length(buffer, i)
+         if escape is None:
+            break
+         out.append(json.loads(f'"{buffer[i:i + escape]}"'))
+         i += escape
+      self.pos = i
+      return "".join(out)
+
+   @staticmethod
+   def _escape_length(buffer: str, i: int):
+      """Length of the escape at buffer[i], or None if it is not complete yet."""
+      if i + 1 >= len(buffer):
+         return None
+      if buffer[i + 1] != "u":
+         return 2
+      if i + 6 > len(buffer):
+         return None
+      if 0xD800 <= int(buffer[i + 2:i + 6], 16) <= 0xDBFF:
+         # high surrogate: decode together with the following low surrogate
+         return 12 if i + 12 <= len(buffer) else None
+      return 6
+
+
+async def answer_question_stream(question_details: dict):
+   """
+   Streams an answer as ("delta", text) items for the "response" field as it is
+   generated, followed by one ("final", answer_dict) item with the parsed JSON.
+   """
+   system_instruction, messages = _answer_request(question_details)
+   parser = ResponseFieldParser()
+   parts = []
+
+   async for text in stream_gemini_async(messages=messages, system_instruction=system_instruction):
+      parts.append(text)
+      delta = parser.feed(text)
+      if delta:
+         yield "delta", delta
+
+   yield "final", parse_answer("".join(parts))
@@ -0,0 +1,168 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+import numpy as np
+
+
+class SemanticCache:
+    """
+    In-memory cache of answers keyed on question embeddings.
+
+    Entries are scoped (e.g. per project/lang/service type) and a lookup returns a
+    cached answer when a stored question in the same scope has cosine similarity of
+    at least `threshold` to the new one. Entries expire after `ttl` seconds and the
+    least recently used entry is evicted once `max_entries` is reached.
+
+    `embed` is an async callable mapping a string to a vector, so tests can pass a
+    fake embedder instead of a remote API. Entries are guarded by a lock, since
+    product edits invalidate them from worker threads while the event loop reads
+    them.
+
+    Each project has a generation that `invalidate` advances. An answer computed
+    while the project's data changed would be stale, so `store` drops it when the
+    generation passed in (read with `generation` before answering) is outdated.
+    """
+
+    def __init__(self, embed, threshold=0.92, ttl=3600, max_entries=2048):
+        self.embed = embed
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # entry_id -> entry
+        self._scopes = {}  # scope -> {entry_id}
+        self._generations = {}  # project_id -> invalidation count
+        self._clears = 0
+        self._stats = {"hits": 0, "exact_hits": 0, "misses": 0, "stores": 0,
+                       "evictions": 0, "expirations": 0, "invalidations": 0, "stale_stores": 0, "errors": 0}
+
+    @staticmethod
+    def _normalize_question(question):
+        return " ".join(question.lower().split())
+
+    async def lookup(self, scope, question):
+        """
+        Returns `(answer, vector)`. `answer` is None on a miss; `vector` is the
+        question embedding to hand back to `store` (None if embedding failed or an
+        exact match made it unnecessary).
+        """
+        normalized = self._normalize_question(question)
+        with self._lock:
+            for entry_id, entry in self._live_entries(scope):
+                if entry["question"] == normalized:
+                    self._hit(entry_id, exact=True)
+                    return entry["answer"], None
+
+        try:
+            vector = self._unit(await self.embed(question))
+        except Exception as e:
+            print(f"Semantic cache embedding failed: {e}")
+            with self._lock:
+                self._stats["errors"] += 1
+                self._stats["misses"] += 1
+            return None, None
+
+        with self._lock:
+            # entries may have changed while the question was embedded
+            entries = self._live_entries(scope)
+            if entries:
+                matrix = np.stack([entry["vector"] for _, entry in entries])
+                similarities = matrix @ vector
+                best = int(np.argmax(similarities))
+                if similarities[best] >= self.threshold:
+                    entry_id, entry = entries[best]
+                    self._hit(entry_id)
+                    return entry["answer"], vector
+
+            self._stats["misses"] += 1
+        return None, vector
+
+    def generation(self, project_id):
+        """Token that changes whenever `project_id`'s entries are invalidated."""
+        with self._lock:
+            return self._clears, self._generations.get(project_id, 0)
+
+    def store(self, scope, question, vector, answer, generation=None):
+        """Caches an answer; skipped if scope[0]'s generation is no longer `generation`."""
+        if vector is None:
+            return
+        entry = {
+            "scope": scope,
+            "question": self._normalize_question(question),
+            "vector": self._unit(vector),
+            "answer": answer,
+            "expires_at": time.monotonic() + self.ttl,
+        }
+        with self._lock:
+            if generation is not None and generation != (self._clears, self._generations.get(scope[0], 0)):
+                self._stats["stale_stores"] += 1
+                return
+            while len(self._entries) >= self.max_entries:
+                entry_id, _ = next(iter(self._entries.items()))
+                self._remove(entry_id)
+                self._stats["evictions"] += 1
+
+            entry_id = uuid.uuid4().hex
+            self._entries[entry_id] = entry
+            self._scopes.setdefault(scope, set()).add(entry_id)
+            self._stats["stores"] += 1
+
+    def invalidate(self, project_id):
+        """Drops every entry whose scope belongs to `project_id`."""
+        with self._lock:
+            for scope in [s for s in self._scopes if s[0] == project_id]:
+                for entry_id in list(self._scopes.get(scope, ())):
+                    self._remove(entry_id)
+            self._generations[project_id] = self._generations.get(project_id, 0) + 1
+            self._stats["invalidations"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._scopes.clear()
+            self._clears += 1
+            self._stats["invalidations"] += 1
+
+    def metrics(self):
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                **self._stats,
+                "entries": len(self._entries),
+                "hit_rate": self._stats["hits"] / lookups if lookups else 0.0,
+            }
+
+    def _live_entries(self, scope):
+        now = time.monotonic()
+        live = []
+        for entry_id in list(self._scopes.get(scope, ())):
+            entry = self._entries[entry_id]
+            if entry["expires_at"] <= now:
+                self._remove(entry_id)
+                self._stats["expirations"] += 1
+            else:
+                live.append((entry_id, entry))
+        return live
+
+    def _hit(self, entry_id, exact=False):
+        self._entries.move_to_end(entry_id)
+        self._stats["hits"] += 1
+        if exact:
+            self._stats["exact_hits"] += 1
+
+    def _remove(self, entry_id):
+        entry = self._entries.pop(entry_id)
+        ids = self._scopes.get(entry["scope"])
+        if ids is not None:
+            ids.discard(entry_id)
+            if not ids:
+                del self._scopes[entry["scope"]]
+
+    @staticmethod
+    def _unit(vector):
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
@@ -0,0 +1,74 @@
+from dotenv import load_dotenv
+load_dotenv()
+import os
+
+PRODUCT_PAGE_SIZE = int(os.getenv("PRODUCT_PAGE_SIZE", "500"))
+BULK_MAX_ITEMS = int(os.getenv("BULK_MAX_ITEMS", "20000"))
+
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "weaviate")  # weaviate | local
+LOCAL_STORE_DIR = os.getenv("LOCAL_STORE_DIR", "data/vectors")
+
+WEAVIATE_HOST = os.getenv("WEAVIATE_HOST", "weaviate")
+WEAVIATE_PORT = int(os.getenv("WEAVIATE_PORT", "8080"))
+WEAVIATE_GRPC_PORT = int(os.getenv("WEAVIATE_GRPC_PORT", "50051"))
+WEAVIATE_POOL_SIZE = int(os.getenv("WEAVIATE_POOL_SIZE", "4"))
+WEAVIATE_POOL_TIMEOUT = float(os.getenv("WEAVIATE_POOL_TIMEOUT", "10"))
+WEAVIATE_HEALTH_CHECK_INTERVAL = float(os.getenv("WEAVIATE_HEALTH_CHECK_INTERVAL", "30"))
+COLLECTION_REGISTRY_TTL = float(os.getenv("COLLECTION_REGISTRY_TTL", "300"))
+# "collections": a collection per {project_id}_{lang}; "tenants": a tenant per project in a collection per language
+STORAGE_LAYOUT = os.getenv("STORAGE_LAYOUT", "collections")
+TENANT_COLLECTION_PREFIX = os.getenv("TENANT_COLLECTION_PREFIX", "Projects")
+TENANT_OFFLOAD_AFTER = float(os.getenv("TENANT_OFFLOAD_AFTER", "0"))  # idle seconds; 0 disables
+TENANT_OFFLOAD_STATUS = os.getenv("TENANT_OFFLOAD_STATUS", "inactive")  # inactive | offloaded
+
+QUERY_CONCURRENCY = int(os.getenv("QUERY_CONCURRENCY", "4"))
+QUERY_TIMEOUT = float(os.getenv("QUERY_TIMEOUT", "5"))
+CONTEXT_LIMIT = int(os.getenv("CONTEXT_LIMIT", "6"))
+
+VOYAGE_MAX_BATCH_SIZE = int(os.getenv("VOYAGE_MAX_BATCH_SIZE", "128"))
+VOYAGE_MAX_BATCH_TOKENS = int(os.getenv("VOYAGE_MAX_BATCH_TOKENS", "120000"))
+VOYAGE_MAX_PARALLEL = int(os.getenv("VOYAGE_MAX_PARALLEL", "4"))
+VOYAGE_MAX_RETRIES = int(os.getenv("VOYAGE_MAX_RETRIES", "5"))
+# "server": Weaviate's text2vec-voyageai module embeds; "client": we embed and pass vectors
+VECTORIZE_MODE = os.getenv("VECTORIZE_MODE", "server")
+QUERY_EMBEDDING_CACHE_SIZE = int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", "4096"))
+EMBEDDING_CACHE_ENABLED = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() == "true"
+EMBEDDING_CACHE_DIR = os.getenv("EMBEDDING_CACHE_DIR", "cache/embeddings")
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "200000"))
+
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "true").lower() == "true"
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92"))
+SEMANTIC_CACHE_TTL = float(os.getenv("SEMANTIC_CACHE_TTL", "3600"))
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "2048"))
+
+LLM_CACHE_BACKEND = os.getenv("LLM_CACHE_BACKEND", "memory")  # memory | sqlite | none
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "cache/llm_responses.sqlite")
+LLM_CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", str(24 * 3600)))
+
+GEMINI_MODEL_REGISTRY_SIZE = int(os.getenv("GEMINI_MODEL_REGISTRY_SIZE", "64"))
+GEMINI_CONTEXT_CACHE_ENABLED = os.getenv("GEMINI_CONTEXT_CACHE_ENABLED", "true").lower() == "true"
+GEMINI_CONTEXT_CACHE_MIN_TOKENS = int(os.getenv("GEMINI_CONTEXT_CACHE_MIN_TOKENS", "4096"))
+GEMINI_CONTEXT_CACHE_TTL = float(os.getenv("GEMINI_CONTEXT_CACHE_TTL", "3600"))
+GEMINI_API_ENDPOINT = os.getenv("GEMINI_API_ENDPOINT")
+
+GEMINI_MAX_IN_FLIGHT = int(os.getenv("GEMINI_MAX_IN_FLIGHT", "16"))
+GEMINI_RPM = int(os.getenv("GEMINI_RPM", "2000"))
+GEMINI_TPM = int(os.getenv("GEMINI_TPM", "4000000"))
+GEMINI_MAX_RETRIES = int(os.getenv("GEMINI_MAX_RETRIES", "5"))
+
+JOBS_DB_PATH = os.getenv("JOBS_DB_PATH", "data/jobs.sqlite")
+JOBS_MAX_ATTEMPTS = int(os.getenv("JOBS_MAX_ATTEMPTS", "3"))
+JOBS_RETENTION_SECONDS = float(os.getenv("JOBS_RETENTION_SECONDS", str(7 * 86400)))
+JOBS_LEASE_SECONDS = float(os.getenv("JOBS_LEASE_SECONDS", "60"))
+INGESTION_WORKERS = int(os.getenv("INGESTION_WORKERS", "2"))
+INGESTION_CONCURRENCY = int(os.getenv("INGESTION_CONCURRENCY", os.getenv("GEMINI_MAX_IN_FLIGHT", "16")))
+INGESTION_QUEUE_SIZE = int(os.getenv("INGESTION_QUEUE_SIZE", "64"))
+INGESTION_INSERT_BATCH_SIZE = int(os.getenv("INGESTION_INSERT_BATCH_SIZE", "50"))
+INGESTION_MODE = os.getenv("INGESTION_MODE", "per_language")  # per_language | translate
+MANIFEST_DB_PATH = os.getenv("MANIFEST_DB_PATH", "data/manifest.sqlite")
+
+CHUNK_UNIT = os.getenv("CHUNK_UNIT", "chars")  # chars | tokens
+CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", "2000" if CHUNK_UNIT == "chars" else "512"))
+# sentences in "chars" mode, tokens in "tokens" mode
+CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", "10" if CHUNK_UNIT == "chars" else "64"))
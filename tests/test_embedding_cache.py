@@ -0,0 +1,62 @@
+import numpy as np
+
+from database.embedding_cache import EmbeddingCache
+
+
+def vectors_for(keys):
+    return np.array([[float(key[1:]), 1.0] for key in keys], dtype=np.float32)
+
+
+def test_caches_sharing_a_directory_never_share_rows(tmp_path):
+    # two instances on one directory stand in for two worker processes
+    first = EmbeddingCache(str(tmp_path), "model", initial_rows=2)
+    second = EmbeddingCache(str(tmp_path), "model", initial_rows=2)
+    first_keys, second_keys = [f"k{i}" for i in range(0, 10)], [f"k{i}" for i in range(10, 20)]
+
+    for start in range(0, 10, 2):
+        first.put_many(first_keys[start:start + 2], vectors_for(first_keys[start:start + 2]))
+        second.put_many(second_keys[start:start + 2], vectors_for(second_keys[start:start + 2]))
+
+    rows = [row for (row,) in first._conn.execute("SELECT row FROM entries").fetchall()]
+    assert sorted(rows) == list(range(20))
+    for cache in (first, second):
+        found = cache.get_many(first_keys + second_keys)
+        assert {key: vector.tolist() for key, vector in found.items()} == {
+            key: [float(key[1:]), 1.0] for key in first_keys + second_keys
+        }
+    first.close()
+    second.close()
+
+
+def test_eviction_reuses_rows_without_duplicates(tmp_path):
+    first = EmbeddingCache(str(tmp_path), "model", max_entries=8)
+    second = EmbeddingCache(str(tmp_path), "model", max_entries=8)
+    for i in range(0, 40, 4):
+        cache = first if i % 8 else second
+        keys = [f"k{j}" for j in range(i, i + 4)]
+        cache.put_many(keys, vectors_for(keys))
+
+    entries = dict(first._conn.execute("SELECT hash, row FROM entries").fetchall())
+    assert len(set(entries.values())) == len(entries) <= 8
+    assert all(0 <= row < 8 for row in entries.values())
+    latest = [f"k{j}" for j in range(36, 40)]
+    assert {key: vector.tolist() for key, vector in first.get_many(latest).items()} == {
+        key: [float(key[1:]), 1.0] for key in latest
+    }
+    first.close()
+    second.close()
+
+
+def test_caches_without_a_row_counter_continue_after_their_last_row(tmp_path):
+    cache = EmbeddingCache(str(tmp_path), "model")
+    cache.put_many(["k0", "k1", "k2"], vectors_for(["k0", "k1", "k2"]))
+    cache._conn.execute("DELETE FROM meta WHERE key = 'next_row'")
+    cache._conn.commit()
+    cache.close()
+
+    reopened = EmbeddingCache(str(tmp_path), "model")
+    reopened.put_many(["k3"], vectors_for(["k3"]))
+
+    rows = dict(reopened._conn.execute("SELECT hash, row FROM entries").fetchall())
+    assert rows == {"k0": 0, "k1": 1, "k2": 2, "k3": 3}
+    reopened.close()
@@ -0,0 +1,106 @@
+import asyncio
+import time
+
+from data_prep.ingestion_jobs import IngestionJobManager, JobStore
+
+
+def run_jobs(manager, job_ids):
+    async def main():
+        await manager.start()
+        while any(manager.store.get(job_id)["status"] in ("queued", "running") for job_id in job_ids):
+            await asyncio.sleep(0.01)
+        await manager.stop()
+
+    asyncio.run(main())
+
+
+def test_finished_jobs_drop_row_data(tmp_path):
+    async def run_job(project_id, row_data, languages, progress, **options):
+        if row_data == "boom":
+            raise ValueError("bad upload")
+        return {"chars": len(row_data), **options}
+
+    store = JobStore(str(tmp_path / "jobs.sqlite"))
+    manager = IngestionJobManager(run_job, store, workers=1)
+    ok = manager.submit("example", "hello", ["en"], diff=True)
+    bad = manager.submit("example", "boom", ["en"])
+    run_jobs(manager, [ok, bad])
+
+    store = JobStore(str(tmp_path / "jobs.sqlite"))
+    assert store.get(ok)["status"] == "succeeded"
+    assert store.get(ok)["result"] == {"chars": 5, "diff": True}
+    assert store.get(ok, include_data=True)["row_data"] == ""
+    assert store.get(bad)["status"] == "failed"
+    assert store.get(bad)["error"] == "bad upload"
+    assert store.get(bad, include_data=True)["row_data"] == ""
+
+
+def test_interrupted_job_fails_after_max_attempts(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.sqlite"))
+    job_id = store.create("example", "data", ["en"])
+    for attempt in range(1, 3):
+        assert store.claim_next()["attempts"] == attempt  # the worker "crashes" while running it
+        assert store.requeue_interrupted(max_attempts=2) == ((1, 0) if attempt < 2 else (0, 1))
+
+    job = store.get(job_id, include_data=True)
+    assert job["status"] == "failed"
+    assert "Interrupted 2 time(s)" in job["error"]
+    assert job["row_data"] == ""
+    assert store.claim_next() is None
+
+
+def test_purge_keeps_recent_and_unfinished_jobs(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.sqlite"))
+    old = store.create("example", "a", ["en"])
+    recent = store.create("example", "b", ["en"])
+    queued = store.create("example", "c", ["en"])
+    store.finish(old, "succeeded")
+    store.update(old, finished_at=time.time() - 3600)
+    store.finish(recent, "failed", error="x")
+
+    assert store.purge_finished(older_than=60) == 1
+    assert store.get(old) is None
+    assert store.get(recent)["status"] == "failed"
+    assert store.get(queued)["status"] == "queued"
+
+
+def test_a_job_is_claimed_once_across_processes(tmp_path):
+    first = JobStore(str(tmp_path / "jobs.sqlite"))
+    second = JobStore(str(tmp_path / "jobs.sqlite"))
+    older = first.create("example", "a", ["en"])
+    newer = first.create("example", "b", ["en"])
+
+    class RacingConnection:
+        """The other process claims the oldest job between this one's SELECT and UPDATE."""
+
+        def __init__(self, conn):
+            self.conn = conn
+            self.raced = False
+
+        def __getattr__(self, name):
+            return getattr(self.conn, name)
+
+        def execute(self, sql, *args):
+            if sql.startswith("UPDATE") and not self.raced:
+                self.raced = True
+                assert second.claim_next()["id"] == older
+            return self.conn.execute(sql, *args)
+
+    first._conn = RacingConnection(first._conn)
+    assert first.claim_next()["id"] == newer
+    assert first.get(older)["attempts"] == 1
+
+
+def test_only_jobs_without_a_recent_heartbeat_are_requeued(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.sqlite"))
+    live = store.create("example", "a", ["en"])
+    dead = store.create("example", "b", ["en"])
+    store.claim_next()
+    store.claim_next()
+    store.update(dead, heartbeat_at=time.time() - 120)
+    store.update(live, heartbeat_at=time.time() - 120)
+    store.heartbeat([live])  # still running in another process
+
+    assert store.requeue_interrupted(max_attempts=3, stale_after=60) == (1, 0)
+    assert store.get(live)["status"] == "running"
+    assert store.get(dead)["status"] == "queued"
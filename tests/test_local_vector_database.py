@@ -0,0 +1,131 @@
+import asyncio
+import json
+import os
+
+import numpy as np
+import pytest
+
+from database.local_vector_database import AsyncLocalVectorDatabase, LocalVectorDatabase, LocalVectorStore
+
+
+def test_upsert_query_delete_to_empty_and_reload(tmp_path):
+    store = LocalVectorStore(str(tmp_path))
+    store.upsert("demo_en", [
+        ("00000000-0000-0000-0000-000000000001", {"title": "Prices", "text": "delivery is free"}, [1.0, 0.0]),
+        ("00000000-0000-0000-0000-000000000002", {"title": "Hours", "text": "open every day"}, [0.0, 1.0]),
+    ])
+
+    hits = store.hybrid("demo_en", "free delivery", [1.0, 0.1], limit=1)
+    assert [hit.uuid for hit in hits] == ["00000000-0000-0000-0000-000000000001"]
+
+    assert store.delete_objects("demo_en", ["00000000-0000-0000-0000-000000000001",
+                                            "00000000-0000-0000-0000-000000000002"]) == 2
+    assert store.hybrid("demo_en", "free delivery", [1.0, 0.0], limit=3) == []
+
+    reloaded = LocalVectorStore(str(tmp_path))
+    collection = reloaded.collection("demo_en")
+    assert collection.uuids == [] and collection.vectors.shape == (0, 2)
+    assert reloaded.hybrid("demo_en", "free delivery", [1.0, 0.0], limit=3) == []
+
+    reloaded.upsert("demo_en", [("00000000-0000-0000-0000-000000000003", {"text": "back again"}, [0.5, 0.5])])
+    again = LocalVectorStore(str(tmp_path))
+    assert [hit.uuid for hit in again.hybrid("demo_en", "back", [0.5, 0.5], limit=3)] == [
+        "00000000-0000-0000-0000-000000000003"
+    ]
+
+
+def test_names_outside_the_store_are_refused(tmp_path):
+    outside = tmp_path / "outside_en"
+    outside.mkdir()
+    (outside / "keep.txt").write_text("data")
+    store = LocalVectorStore(str(tmp_path / "store"))
+    database = LocalVectorDatabase(store)
+
+    for call in (lambda: database.delete_project("../outside", "en"),
+                 lambda: store.upsert("../outside_en", [(None, {"text": "x"}, None)]),
+                 lambda: store.exists("../outside_en"),
+                 lambda: store.hybrid("/tmp/x_en", "query", None, 3)):
+        with pytest.raises(ValueError):
+            call()
+
+    assert (outside / "keep.txt").read_text() == "data"
+    assert not database.delete_project("..")
+
+
+def test_batches_append_and_reload_with_updates_and_deletes(tmp_path):
+    store = LocalVectorStore(str(tmp_path))
+    for batch in range(4):
+        store.upsert("demo_en", [(f"00000000-0000-0000-0000-00000000{batch}{i:03d}", {"text": f"chunk {batch} {i}"},
+                                  [float(batch), float(i)]) for i in range(5)])
+    snapshot = (tmp_path / "demo_en" / "objects.json").stat().st_mtime_ns
+    store.upsert("demo_en", [("00000000-0000-0000-0000-000000001000", {"text": "updated"}, [9.0, 9.0])])
+    # appending a batch leaves the snapshot alone
+    assert (tmp_path / "demo_en" / "objects.json").stat().st_mtime_ns == snapshot
+
+    collection = LocalVectorStore(str(tmp_path)).collection("demo_en")
+    assert len(collection.uuids) == 20
+    assert collection.get("00000000-0000-0000-0000-000000001000") == {"text": "updated"}
+    assert collection.vectors[collection.uuids.index("00000000-0000-0000-0000-000000001000")].tolist() == [9.0, 9.0]
+    assert collection.vectors[collection.uuids.index("00000000-0000-0000-0000-000000003004")].tolist() == [3.0, 4.0]
+
+    store.delete_objects("demo_en", [f"00000000-0000-0000-0000-000000002{i:03d}" for i in range(5)])
+    store.upsert("demo_en", [("00000000-0000-0000-0000-000000009000", {"text": "after delete"}, [7.0, 7.0])])
+    reloaded = LocalVectorStore(str(tmp_path)).collection("demo_en")
+    assert len(reloaded.uuids) == 16
+    assert {row.tolist()[0] for row in reloaded.vectors} == {0.0, 1.0, 3.0, 7.0, 9.0}
+    assert sorted(os.listdir(tmp_path / "demo_en")) == ["objects.2.log", "objects.json", "vectors.2.f32"]
+
+
+def test_vectors_arriving_after_rows_without_them(tmp_path):
+    store = LocalVectorStore(str(tmp_path))
+    store.upsert("demo_en", [("00000000-0000-0000-0000-000000000001", {"text": "no vector"}, None)])
+    store.upsert("demo_en", [("00000000-0000-0000-0000-000000000002", {"text": "vector"}, [1.0, 2.0])])
+
+    collection = LocalVectorStore(str(tmp_path)).collection("demo_en")
+    assert collection.vectors.tolist() == [[0.0, 0.0], [1.0, 2.0]]
+
+
+def test_a_torn_log_line_is_ignored(tmp_path):
+    store = LocalVectorStore(str(tmp_path))
+    store.upsert("demo_en", [("00000000-0000-0000-0000-000000000001", {"text": "one"}, [1.0, 0.0])])
+    store.upsert("demo_en", [("00000000-0000-0000-0000-000000000002", {"text": "two"}, [0.0, 1.0])])
+    log = next((tmp_path / "demo_en").glob("objects.*.log"))
+    with open(log, "a", encoding="utf-8") as f:
+        f.write('{"uuid": "00000000-0000-0000-0000-000000000003", "prop')
+
+    collection = LocalVectorStore(str(tmp_path)).collection("demo_en")
+    assert collection.uuids == ["00000000-0000-0000-0000-000000000001", "00000000-0000-0000-0000-000000000002"]
+
+
+def test_stores_in_the_previous_format_still_load(tmp_path):
+    directory = tmp_path / "demo_en"
+    directory.mkdir()
+    np.array([[1.0, 0.0]], dtype=np.float32).tofile(directory / "vectors.f32")
+    (directory / "objects.json").write_text(json.dumps(
+        {"uuids": ["00000000-0000-0000-0000-000000000001"], "properties": [{"text": "old"}], "dim": 2}
+    ))
+
+    store = LocalVectorStore(str(tmp_path))
+    assert store.collection("demo_en").vectors.tolist() == [[1.0, 0.0]]
+    store.upsert("demo_en", [("00000000-0000-0000-0000-000000000002", {"text": "new"}, [0.0, 1.0])])
+    assert LocalVectorStore(str(tmp_path)).collection("demo_en").vectors.tolist() == [[1.0, 0.0], [0.0, 1.0]]
+
+
+def test_multi_query_falls_back_to_keyword_search_when_embedding_fails(tmp_path):
+    class BrokenVectorizer:
+        @staticmethod
+        def document_text(properties):
+            return properties["text"]
+
+        async def embed_documents(self, texts):
+            return [[1.0, 0.0] for _ in texts]
+
+        async def embed_queries(self, queries):
+            raise RuntimeError("provider down")
+
+    database = AsyncLocalVectorDatabase(LocalVectorStore(str(tmp_path)), vectorizer=BrokenVectorizer())
+    asyncio.run(database.insert_chunks("demo_en", [{"title": "a", "text": "returns policy", "number": 0},
+                                                   {"title": "b", "text": "delivery times", "number": 1}]))
+
+    hits, _ = asyncio.run(database.multi_hybrid_query(["delivery"], "demo_en", limit=2))
+    assert [hit["text"] for hit in hits] == ["delivery times"]
@@ -0,0 +1,14 @@
+from data_prep.manifest import ChunkManifest
+
+
+def test_drop_prefix_only_matches_the_exact_project(tmp_path):
+    manifest = ChunkManifest(str(tmp_path / "manifest.db"))
+    for collection in ("a_en", "a_ru", "a_b_en", "ab_en"):
+        manifest.add(collection, [("hash", "uuid")])
+
+    manifest.drop(prefix="a_")
+
+    assert manifest.known("a_en") == {} and manifest.known("a_ru") == {}
+    assert manifest.known("a_b_en") == {"hash": "uuid"}
+    assert manifest.known("ab_en") == {"hash": "uuid"}
+    manifest.close()
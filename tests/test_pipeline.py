@@ -0,0 +1,33 @@
+import asyncio
+import json
+import shutil
+
+from data_prep.manifest import ChunkManifest
+from data_prep.pipeline import ingest_stream
+from database.local_vector_database import AsyncLocalVectorDatabase, LocalVectorStore
+
+
+class EchoScheduler:
+    """Stands in for the LLM: every chunk normalizes to itself."""
+
+    async def submit(self, fn, text, prompt, tokens=None):
+        return json.dumps({"title": text, "text": text})
+
+
+def ingest(directory, manifest, chunks):
+    database = AsyncLocalVectorDatabase(LocalVectorStore(str(directory)))
+    return asyncio.run(ingest_stream(chunks, ["en"], "shop", database, scheduler=EchoScheduler(),
+                                     manifest=manifest, diff=True, insert_linger=0.01))["en"]
+
+
+def test_manifest_is_dropped_when_the_store_lost_the_collection(tmp_path):
+    manifest = ChunkManifest(str(tmp_path / "manifest.sqlite"))
+    assert ingest(tmp_path / "store", manifest, ["one", "two"])["inserted"] == 2
+    assert ingest(tmp_path / "store", manifest, ["one", "two"])["skipped"] == 2
+
+    # e.g. the data directory was wiped or STORAGE_BACKEND points at another store
+    shutil.rmtree(tmp_path / "store")
+    stats = ingest(tmp_path / "store", manifest, ["one", "two"])
+    assert (stats["skipped"], stats["inserted"]) == (0, 2)
+    assert len(LocalVectorStore(str(tmp_path / "store")).collection("shop_en").uuids) == 2
+    manifest.close()
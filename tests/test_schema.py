@@ -0,0 +1,30 @@
+import pytest
+
+from database.schema import parse_price
+
+
+@pytest.mark.parametrize("value, expected", [
+    (1500, 1500.0),
+    (12.5, 12.5),
+    ("1 000 000 sum", 1_000_000.0),
+    ("1 000 000 so'm", 1_000_000.0),
+    ("1.000.000 so'm", 1_000_000.0),
+    ("1,000,000 UZS", 1_000_000.0),
+    ("1,5 $", 1.5),
+    ("$12.50", 12.5),
+    ("1,500", 1500.0),
+    ("1.500 so'm", 1500.0),
+    ("0.125 kg", 0.125),
+    ("1.234,56 €", 1234.56),
+    ("1,234,567.89", 1_234_567.89),
+    ("1'250'000", 1_250_000.0),
+    ("price: 99", 99.0),
+    ("12.", 12.0),
+])
+def test_parse_price(value, expected):
+    assert parse_price(value) == pytest.approx(expected)
+
+
+@pytest.mark.parametrize("value", [None, "", "call us", True, ["100"]])
+def test_parse_price_without_a_number(value):
+    assert parse_price(value) is None
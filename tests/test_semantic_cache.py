@@ -0,0 +1,181 @@
+import asyncio
+import threading
+
+import numpy as np
+import pytest
+
+from general import semantic_cache
+from general.semantic_cache import SemanticCache
+
+SCOPE = ("example", "en", "support")
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(semantic_cache, "time", clock)
+    return clock
+
+
+def fake_embedder(vectors):
+    """Async embedder returning the vector registered for each question."""
+    calls = []
+
+    async def embed(text):
+        calls.append(text)
+        return np.asarray(vectors[text], dtype=np.float32)
+
+    embed.calls = calls
+    return embed
+
+
+def lookup(cache, scope, question):
+    return asyncio.run(cache.lookup(scope, question))
+
+
+def remember(cache, scope, question, answer):
+    _, vector = lookup(cache, scope, question)
+    cache.store(scope, question, vector, answer)
+
+
+def test_hit_at_threshold_and_miss_below(clock):
+    # cos(stored, at) == 0.9 exactly; cos(stored, below) ~ 0.89
+    cache = SemanticCache(fake_embedder({
+        "stored": [1.0, 0.0],
+        "at": [0.9, np.sqrt(1 - 0.81)],
+        "below": [0.89, np.sqrt(1 - 0.89 ** 2)],
+    }), threshold=0.9 - 1e-6)
+    remember(cache, SCOPE, "stored", {"response": "A"})
+
+    assert lookup(cache, SCOPE, "at")[0] == {"response": "A"}
+    assert lookup(cache, SCOPE, "below")[0] is None
+    assert cache.metrics()["hits"] == 1
+
+
+def test_exact_question_skips_embedding(clock):
+    embed = fake_embedder({"What is it?": [1.0, 0.0]})
+    cache = SemanticCache(embed)
+    remember(cache, SCOPE, "What is it?", "A")
+
+    answer, vector = lookup(cache, SCOPE, "  what IS it? ")
+    assert answer == "A" and vector is None
+    assert embed.calls == ["What is it?"]
+    assert cache.metrics()["exact_hits"] == 1
+
+
+def test_scopes_are_isolated(clock):
+    cache = SemanticCache(fake_embedder({"q": [1.0, 0.0]}))
+    remember(cache, SCOPE, "q", "A")
+
+    assert lookup(cache, ("example", "ru", "support"), "q")[0] is None
+
+
+def test_entries_expire_after_ttl(clock):
+    cache = SemanticCache(fake_embedder({"q": [1.0, 0.0]}), ttl=60)
+    remember(cache, SCOPE, "q", "A")
+
+    clock.now += 59
+    assert lookup(cache, SCOPE, "q")[0] == "A"
+    clock.now += 1
+    assert lookup(cache, SCOPE, "q")[0] is None
+    assert cache.metrics()["expirations"] == 1
+
+
+def test_least_recently_used_entry_is_evicted(clock):
+    cache = SemanticCache(fake_embedder({
+        "a": [1.0, 0.0, 0.0], "b": [0.0, 1.0, 0.0], "c": [0.0, 0.0, 1.0],
+    }), max_entries=2)
+    remember(cache, SCOPE, "a", "A")
+    remember(cache, SCOPE, "b", "B")
+    assert lookup(cache, SCOPE, "a")[0] == "A"  # "b" is now least recently used
+
+    remember(cache, SCOPE, "c", "C")
+    assert lookup(cache, SCOPE, "b")[0] is None
+    assert lookup(cache, SCOPE, "a")[0] == "A"
+    assert lookup(cache, SCOPE, "c")[0] == "C"
+    assert cache.metrics()["evictions"] == 1
+
+
+def test_invalidate_drops_only_that_project(clock):
+    cache = SemanticCache(fake_embedder({"q": [1.0, 0.0]}))
+    remember(cache, ("example", "en", "support"), "q", "A")
+    remember(cache, ("example", "ru", "sales"), "q", "B")
+    remember(cache, ("other", "en", "support"), "q", "C")
+
+    cache.invalidate("example")
+    assert lookup(cache, ("example", "en", "support"), "q")[0] is None
+    assert lookup(cache, ("example", "ru", "sales"), "q")[0] is None
+    assert lookup(cache, ("other", "en", "support"), "q")[0] == "C"
+
+
+def test_answer_computed_across_an_invalidation_is_not_stored(clock):
+    cache = SemanticCache(fake_embedder({"q": [1.0, 0.0]}))
+    generation = cache.generation("example")
+    _, vector = lookup(cache, SCOPE, "q")
+    cache.invalidate("other")
+    cache.store(SCOPE, "q", vector, "fresh", generation=generation)
+    assert lookup(cache, SCOPE, "q")[0] == "fresh"
+
+    cache.invalidate("example")
+    generation_before = generation
+    generation = cache.generation("example")
+    _, vector = lookup(cache, SCOPE, "q")
+    cache.invalidate("example")
+    cache.store(SCOPE, "q", vector, "stale", generation=generation)
+    assert lookup(cache, SCOPE, "q")[0] is None
+    cache.store(SCOPE, "q", vector, "older", generation=generation_before)
+    assert lookup(cache, SCOPE, "q")[0] is None
+    assert cache.metrics()["stale_stores"] == 2
+
+    generation = cache.generation("example")
+    cache.clear()
+    cache.store(SCOPE, "q", vector, "stale", generation=generation)
+    assert lookup(cache, SCOPE, "q")[0] is None
+
+
+def test_embedding_failure_is_a_miss(clock):
+    async def broken(text):
+        raise RuntimeError("provider down")
+
+    cache = SemanticCache(broken)
+    assert lookup(cache, SCOPE, "q") == (None, None)
+    assert cache.metrics()["errors"] == 1
+
+
+def test_invalidation_from_another_thread_while_the_loop_uses_the_cache():
+    rng = np.random.default_rng(0)
+    questions = [f"question {i}" for i in range(50)]
+    cache = SemanticCache(fake_embedder({q: rng.standard_normal(16) for q in questions}),
+                          threshold=0.99, ttl=3600, max_entries=5000)
+    stop = threading.Event()
+    errors = []
+
+    def invalidate():
+        while not stop.is_set():
+            try:
+                cache.invalidate("shop")
+            except Exception as e:
+                errors.append(e)
+
+    async def main():
+        for i in range(5000):
+            scope = ("shop", "en", "qa")
+            _, vector = await cache.lookup(scope, questions[i % 50])
+            cache.store(scope, questions[i % 50], vector if vector is not None else np.ones(16), f"answer {i}")
+
+    worker = threading.Thread(target=invalidate)
+    worker.start()
+    try:
+        asyncio.run(main())
+    finally:
+        stop.set()
+        worker.join()
+    assert errors == []
@@ -0,0 +1,89 @@
+import asyncio
+import time
+
+from database import tenancy
+from database.async_vector_database import AsyncWeaviateDatabase
+from database.collection_registry import CollectionRegistry
+from database.tenancy import TenantLayout
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+class FakeTenants:
+    """Records tenant updates; updating a tenant in `missing` fails, and so does any call including one."""
+
+    def __init__(self, missing=()):
+        self.missing = set(missing)
+        self.calls = []
+
+    async def update(self, tenants):
+        tenants = tenants if isinstance(tenants, list) else [tenants]
+        self.calls.append([tenant.name for tenant in tenants])
+        if any(tenant.name in self.missing for tenant in tenants):
+            raise RuntimeError("tenant not found")
+
+
+class FakeCollections:
+    def __init__(self, tenants):
+        self._tenants = tenants
+
+    def get(self, name):
+        return type("Collection", (), {"tenants": self._tenants[name]})()
+
+
+class FakeClient:
+    def __init__(self, tenants):
+        self.collections = FakeCollections(tenants)
+
+    def is_connected(self):
+        return True
+
+
+def layout_with_clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(tenancy, "time", clock)
+    return TenantLayout(), clock
+
+
+def test_only_tenants_used_here_go_idle(monkeypatch):
+    layout, clock = layout_with_clock(monkeypatch)
+    names = ["Shop_en", "Shop_ru", "Other_en"]
+    layout.touch("shop_en")
+    layout.touch("Shop_ru")
+
+    clock.now += 30
+    layout.touch("Shop_ru")
+    clock.now += 40
+
+    assert layout.idle(names, 60) == ["Shop_en"]
+    layout.mark_inactive(["Shop_en"])
+    assert layout.idle(names, 60) == []
+    clock.now += 100
+    assert layout.idle(names, 60) == ["Shop_ru"]
+
+
+def test_offload_survives_a_tenant_that_no_longer_exists(monkeypatch):
+    layout, clock = layout_with_clock(monkeypatch)
+    registry = CollectionRegistry(ttl=3600)
+    registry.load(["A_en", "B_en", "Gone_en", "A_ru", "Untouched_en"])
+    for name in ("A_en", "B_en", "Gone_en", "A_ru"):
+        layout.touch(name)
+    clock.now += 120
+
+    tenants = {"Projects_en": FakeTenants(missing={"Gone"}), "Projects_ru": FakeTenants()}
+    database = AsyncWeaviateDatabase(registry=registry, layout=layout)
+    database._client = FakeClient(tenants)
+    database._last_checked = time.monotonic()
+
+    assert asyncio.run(database.offload_idle_tenants(60)) == 3
+    assert tenants["Projects_en"].calls == [["A", "B", "Gone"], ["A"], ["B"], ["Gone"]]
+    assert tenants["Projects_ru"].calls == [["A"]]
+    assert layout.metrics() == {"deactivated": 3, "reactivated": 0, "tracked": 3, "inactive": 3}
+    # nothing is left to offload, and the missing tenant is not retried
+    assert asyncio.run(database.offload_idle_tenants(60)) == 0
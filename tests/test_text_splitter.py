@@ -0,0 +1,86 @@
+import random
+
+from data_prep.text_splitter import iter_split_text, split_text
+
+SEPARATORS = ['\n\n', '.\n', ':\n', '\n', '.']
+
+
+def reference_split_text(text, chunk_size=1000, overlap_sentences=1, separators=SEPARATORS):
+    """The original quadratic split_text, kept as the reference the single-pass version must match."""
+    chunks = []
+    for paragraph in text.split('\n\n'):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if len(paragraph) <= chunk_size:
+            chunks.append(paragraph)
+            continue
+
+        sentences = []
+        start = 0
+        while start < len(paragraph):
+            split_idx, split_sep = -1, None
+            for sep in separators:
+                idx = paragraph.find(sep, start)
+                if idx != -1 and (split_idx == -1 or idx < split_idx):
+                    split_idx, split_sep = idx, sep
+            if split_idx == -1:
+                sentences.append(paragraph[start:])
+                break
+            end = split_idx + len(split_sep)
+            sentences.append(paragraph[start:end])
+            start = end
+
+        i = 0
+        while i < len(sentences):
+            chunk, total_len, j = [], 0, i
+            while j < len(sentences) and total_len + len(sentences[j]) <= chunk_size:
+                chunk.append(sentences[j])
+                total_len += len(sentences[j])
+                j += 1
+            if chunk:
+                chunks.append(''.join(chunk))
+            if j == i:
+                chunks.append(sentences[j])
+                j += 1
+            i = max(j - overlap_sentences, i + 1)
+    return chunks
+
+
+def random_text(rng):
+    # mostly words, with separators dense enough to hit every split and overlap case
+    tokens = ["word", "ab", "x", " ", " ", ".", "\n", "\n\n", ":\n", ".\n", "\n\n\n", "  \n"]
+    weights = [8, 6, 4, 8, 4, 3, 3, 2, 1, 1, 1, 1]
+    return "".join(rng.choices(tokens, weights, k=rng.randint(0, 400)))
+
+
+def random_pieces(rng, text):
+    pieces, start = [], 0
+    while start < len(text):
+        end = start + rng.randint(1, 20)
+        pieces.append(text[start:end])
+        start = end
+    return pieces
+
+
+def test_split_text_matches_the_original_algorithm():
+    rng = random.Random(15)
+    for _ in range(2000):
+        text = random_text(rng)
+        chunk_size = rng.choice([1, 5, 20, 60, 200, 1000])
+        overlap = rng.randint(0, 3)
+        expected = reference_split_text(text, chunk_size, overlap)
+
+        assert split_text(text, chunk_size, overlap) == expected, (text, chunk_size, overlap)
+        # streamed input, with "\n\n" separators split across pieces
+        assert list(iter_split_text(random_pieces(rng, text), chunk_size, overlap)) == expected, (text, chunk_size)
+
+
+def test_split_text_matches_with_custom_separators():
+    rng = random.Random(16)
+    for _ in range(500):
+        text = random_text(rng)
+        separators = rng.sample(SEPARATORS + [" ", "word"], rng.randint(1, 4))
+        chunk_size = rng.choice([3, 30, 100])
+
+        assert split_text(text, chunk_size, 1, separators) == reference_split_text(text, chunk_size, 1, separators)
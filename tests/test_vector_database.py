@@ -0,0 +1,86 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+from database.async_vector_database import AsyncWeaviateDatabase
+from database.collection_registry import CollectionRegistry
+
+
+class FakeCollection:
+    def __init__(self, properties, objects):
+        self.calls = []
+        self._properties = [SimpleNamespace(name=name) for name in properties]
+        self._objects = objects
+        self.config = SimpleNamespace(get=self._config)
+        self.query = SimpleNamespace(hybrid=self._hybrid)
+
+    async def _config(self, simple=False):
+        return SimpleNamespace(properties=self._properties)
+
+    async def _hybrid(self, query, vector, limit, alpha, filters):
+        self.calls.append({"limit": limit, "filters": filters})
+        return SimpleNamespace(objects=self._objects[:limit])
+
+
+def database_with(collection):
+    registry = CollectionRegistry(ttl=3600)
+    registry.load(["Shop_en"])
+    database = AsyncWeaviateDatabase(registry=registry)
+    database._client = SimpleNamespace(is_connected=lambda: True,
+                                       collections=SimpleNamespace(get=lambda name: collection))
+    database._last_checked = time.monotonic()
+    return database
+
+
+def legacy_objects():
+    # stored before `kind` existed: products are told apart by their name
+    return [SimpleNamespace(uuid=f"id{i}", properties={"name": f"p{i}", "details": "d"} if i % 2 else
+                            {"title": f"t{i}", "text": "x"}) for i in range(10)]
+
+
+def test_kind_filter_on_a_collection_without_kind_is_checked_on_the_hits():
+    collection = FakeCollection(["title", "text", "name", "details"], legacy_objects())
+    database = database_with(collection)
+
+    hits = asyncio.run(database.hybrid_query("shoes", "shop_en", limit=3, filters={"kind": "product"}))
+
+    assert [hit["id"] for hit in hits] == ["id1", "id3", "id5"]
+    assert collection.calls == [{"limit": 12, "filters": None}]
+
+    hits, _ = asyncio.run(database.multi_hybrid_query(["a", "b"], "shop_en", limit=2, per_query_limit=2,
+                                                      filters={"kind": "chunk"}))
+    assert [hit["id"] for hit in hits] == ["id0", "id2"]
+    assert all(call["filters"] is None for call in collection.calls)
+
+
+def test_kind_filter_is_pushed_down_when_the_schema_has_kind():
+    collection = FakeCollection(["kind", "title", "text"], legacy_objects())
+    database = database_with(collection)
+
+    asyncio.run(database.hybrid_query("shoes", "shop_en", limit=3, filters={"kind": "chunk"}))
+
+    assert collection.calls[0]["limit"] == 3 and collection.calls[0]["filters"] is not None
+
+
+class BrokenVectorizer:
+    async def embed_queries(self, queries):
+        raise RuntimeError("provider down")
+
+
+def test_queries_fall_back_to_keyword_search_when_embedding_fails():
+    collection = FakeCollection(["kind", "title", "text"], legacy_objects())
+    database = database_with(collection)
+    database.vectorizer = BrokenVectorizer()
+    alphas = []
+    hybrid = collection.query.hybrid
+
+    async def record(query, vector, limit, alpha, filters):
+        alphas.append((vector, alpha))
+        return await hybrid(query, vector, limit, alpha, filters)
+
+    collection.query.hybrid = record
+
+    hits, _ = asyncio.run(database.multi_hybrid_query(["a", "b"], "shop_en", limit=2, per_query_limit=2))
+
+    assert [hit["id"] for hit in hits] == ["id0", "id1"]
+    assert alphas == [(None, 0.0), (None, 0.0)]
@@ -0,0 +1,40 @@
+import asyncio
+
+import numpy as np
+
+from database.vectorizer import Vectorizer
+
+
+class SlowEmbedder:
+    """Embeds "q<n>" as [n]; `gate` holds requests back until the test releases them."""
+
+    def __init__(self):
+        self.gate = asyncio.Event()
+
+    async def embed_text_async(self, texts, input_type=None):
+        await self.gate.wait()
+        return np.array([[float(text[1:])] for text in texts], dtype=np.float32)
+
+    def embed_text(self, texts, input_type=None):
+        return np.array([[float(text[1:])] for text in texts], dtype=np.float32)
+
+
+def test_hits_survive_eviction_by_a_concurrent_call():
+    vectorizer = Vectorizer(SlowEmbedder(), cache_size=2)
+    vectorizer.embed_queries_sync(["q1", "q2"])
+
+    async def main():
+        # q1 is a hit for the pending call, which then waits on the embedder for q3;
+        # a second call caches q4 and q5 meanwhile and evicts q1
+        pending = asyncio.create_task(vectorizer.embed_queries(["q1", "q3"]))
+        await asyncio.sleep(0)
+        second = vectorizer.embed_queries_sync(["q4", "q5"])
+        assert "q1" not in vectorizer._queries
+        vectorizer.embedder.gate.set()
+        return await pending, second
+
+    first, second = asyncio.run(main())
+
+    assert [vector.tolist() for vector in first] == [[1.0], [3.0]]
+    assert [vector.tolist() for vector in second] == [[4.0], [5.0]]
+    assert len(vectorizer._queries) == 2
@@ -0,0 +1,132 @@
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pytest
+
+from database.voyageEmbedding import VoyageEmbeddings
+from general.batch_scheduler import BatchScheduler
+
+
+class FakeVoyage:
+    """
+    Local embedding server. Text "t<n>" embeds as [n, n + 0.5]; items come back in
+    reverse `index` order. `fail` maps an input text to how many times the batch
+    containing it gets a 429 before succeeding.
+    """
+
+    def __init__(self):
+        self.requests = []
+        self.fail = {}
+        self._lock = threading.Lock()
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                texts = payload["input"]
+                with fake._lock:
+                    fake.requests.append(texts)
+                    failing = [text for text in texts if fake.fail.get(text)]
+                    for text in failing:
+                        fake.fail[text] -= 1
+                if failing:
+                    return self._reply(429, {"detail": "rate limited"})
+                data = [{"index": i, "embedding": [float(text[1:]), float(text[1:]) + 0.5]}
+                        for i, text in enumerate(texts)]
+                self._reply(200, {"data": data[::-1]})
+
+            def _reply(self, status, body):
+                body = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.endpoint = f"http://127.0.0.1:{self.server.server_port}/v1/embeddings"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def fake():
+    server = FakeVoyage()
+    yield server
+    server.close()
+
+
+def client(fake, **options):
+    # 1-3 "tokens" per text, so batches hit the token limit before the count limit
+    voyage = VoyageEmbeddings("key", "voyage-test", endpoint=fake.endpoint,
+                              token_counter=lambda text: 1 + int(text[1:]) % 3, **options)
+    voyage.scheduler = BatchScheduler(max_in_flight=voyage.max_parallel, max_retries=voyage.max_retries,
+                                      base_delay=0.001, max_delay=0.01)
+    return voyage
+
+
+def embed(voyage, texts):
+    async def main():
+        try:
+            return await voyage.embed_text_async(texts)
+        finally:
+            await voyage.close()
+
+    return asyncio.run(main())
+
+
+def test_batches_respect_count_and_token_limits(fake):
+    voyage = client(fake, max_batch_size=4, max_batch_tokens=6)
+    texts = [f"t{i}" for i in range(30)]
+
+    embed(voyage, texts)
+
+    assert sorted(text for batch in fake.requests for text in batch) == sorted(texts)
+    for batch in fake.requests:
+        assert len(batch) <= 4
+        assert sum(voyage.token_counter(text) for text in batch) <= 6
+    # batches are greedy: each one but the last is full by count or by tokens
+    ordered = sorted(fake.requests, key=lambda batch: int(batch[0][1:]))
+    short = 0
+    for batch, following in zip(ordered, ordered[1:]):
+        tokens = sum(voyage.token_counter(text) for text in batch)
+        assert len(batch) == 4 or tokens + voyage.token_counter(following[0]) > 6
+        short += len(batch) < 4
+    assert short > 0
+
+
+def test_a_429_retries_only_the_failed_batch(fake):
+    voyage = client(fake, max_batch_size=5, max_batch_tokens=1000, max_parallel=2)
+    texts = [f"t{i}" for i in range(20)]
+    fake.fail["t7"] = 2
+
+    embeddings = embed(voyage, texts)
+
+    attempts = {tuple(batch): fake.requests.count(batch) for batch in fake.requests}
+    assert attempts[("t5", "t6", "t7", "t8", "t9")] == 3
+    assert all(count == 1 for batch, count in attempts.items() if "t7" not in batch)
+    assert len(attempts) == 4
+    assert embeddings[:, 0].tolist() == list(range(20))
+
+
+def test_output_is_float32_in_input_order(fake):
+    voyage = client(fake, max_batch_size=3, max_parallel=4)
+    texts = [f"t{i}" for i in (9, 2, 14, 0, 7, 7, 11, 3, 5, 1)]
+
+    embeddings = embed(voyage, texts)
+
+    assert embeddings.dtype == np.float32 and embeddings.flags["C_CONTIGUOUS"]
+    assert embeddings.shape == (len(texts), 2)
+    expected = np.array([[int(text[1:]), int(text[1:]) + 0.5] for text in texts], dtype=np.float32)
+    np.testing.assert_array_equal(embeddings, expected)
+    # the blocking variant gives the same result
+    np.testing.assert_array_equal(client(fake, max_batch_size=3).embed_text(texts), expected)